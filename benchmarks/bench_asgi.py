@@ -0,0 +1,100 @@
+"""
+WSGI vs ASGI concurrency benchmark for the read-only catalog/profile pages.
+
+Each mode runs in its own process (the URLconf picks sync or async views at
+import time). WSGI mode models a threaded worker: requests wait for one of
+--threads worker threads. ASGI mode keeps every request in flight on one event
+loop and lets the async views hand ORM/template work to the thread pool.
+
+    python benchmarks/bench_asgi.py --concurrency 64 --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+
+def _paths(companies, services, customers):
+    paths = ["/services/", "/services/most-requested/", "/services/electricity/"]
+    paths += [f"/services/{service.id}" for service in services[:10]]
+    paths += [f"/company/{company.user.username}" for company in companies[:5]]
+    paths += [f"/customer/{customer.user.username}" for customer in customers[:5]]
+    return paths
+
+
+def run_mode(mode, concurrency, rounds, threads):
+    os.environ["NETFIX_ASYNC_VIEWS"] = "1" if mode == "asgi" else "0"
+    from benchmarks.harness import Timer, seed, setup_django, summarize
+
+    setup_django()
+    paths = _paths(*seed())
+    batch = [paths[i % len(paths)] for i in range(concurrency)]
+    timer = Timer()
+
+    if mode == "wsgi":
+        from django.test import Client
+
+        def fetch(path):
+            start = time.perf_counter()
+            response = Client().get(path)
+            assert response.status_code == 200, (path, response.status_code)
+            return (time.perf_counter() - start) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for _ in range(rounds):
+                for ms in pool.map(fetch, batch):
+                    timer.record(ms)
+        elapsed = time.perf_counter() - started
+        label = f"WSGI ({threads} threads, {concurrency} concurrent)"
+    else:
+        from django.test import AsyncClient
+
+        async def fetch(path):
+            start = time.perf_counter()
+            response = await AsyncClient().get(path)
+            assert response.status_code == 200, (path, response.status_code)
+            return (time.perf_counter() - start) * 1000
+
+        async def main():
+            for _ in range(rounds):
+                for ms in await asyncio.gather(*(fetch(path) for path in batch)):
+                    timer.record(ms)
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        label = f"ASGI (1 loop, {concurrency} concurrent)"
+
+    print(summarize(label, timer.samples, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], help="run a single mode in-process")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=4, help="WSGI worker threads")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.concurrency, args.rounds, args.threads)
+        return
+
+    for mode in ("wsgi", "asgi"):
+        subprocess.run([
+            sys.executable, __file__, "--mode", mode,
+            "--concurrency", str(args.concurrency), "--rounds", str(args.rounds),
+            "--threads", str(args.threads),
+        ], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Autocomplete latency: in-process prefix index vs a LIKE query per keystroke.
+
+Replays every prefix of a set of service names (what a user typing produces)
+against the bisect index, the LIKE 'abc%' query it replaces, and the full
+/services/autocomplete/ endpoint. Also reports the index build time and
+approximate memory. Exits non-zero if a target is missed.
+
+    python benchmarks/bench_autocomplete.py --services-per-company 200
+
+Targets (p99): index lookup < 1 ms, endpoint < 10 ms.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+INDEX_P99_TARGET_MS = 1.0
+ENDPOINT_P99_TARGET_MS = 10.0
+
+
+def p99(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--companies", type=int, default=100)
+    parser.add_argument("--services-per-company", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200, help="service names whose prefixes are typed")
+    args = parser.parse_args()
+
+    from benchmarks.harness import Timer, seed, setup_django, summarize
+
+    setup_django()
+    _, services, _ = seed(companies=args.companies, services_per_company=args.services_per_company,
+                          customers=10, requests=0)
+
+    from django.test import Client
+    from services.autocomplete import PrefixIndex
+    from services.models import Service
+
+    tracemalloc.start()
+    index = PrefixIndex(max_services=len(services))
+    started = time.perf_counter()
+    index.rebuild()
+    build_ms = (time.perf_counter() - started) * 1000
+    memory_kb = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    print(f"Index of {len(index)} services built in {build_ms:.1f} ms, ~{memory_kb:.0f} KiB")
+
+    prefixes = [service.name.lower()[:length] for service in services[:args.queries]
+                for length in range(1, min(len(service.name), 12) + 1)]
+
+    index_timer, like_timer, endpoint_timer = Timer(), Timer(), Timer()
+    for prefix in prefixes:
+        with index_timer:
+            index.suggest(prefix)
+    for prefix in prefixes:
+        with like_timer:
+            list(Service.objects.filter(name__istartswith=prefix).values_list("id", "name", "category")[:8])
+    client = Client()
+    for prefix in prefixes:
+        with endpoint_timer:
+            client.get("/services/autocomplete/", {"q": prefix})
+
+    print(summarize("prefix index lookup", index_timer.samples))
+    print(summarize("LIKE 'abc%' query", like_timer.samples))
+    print(summarize("/services/autocomplete/ endpoint", endpoint_timer.samples))
+
+    missed = []
+    if p99(index_timer.samples) > INDEX_P99_TARGET_MS:
+        missed.append(f"index p99 above {INDEX_P99_TARGET_MS} ms")
+    if p99(endpoint_timer.samples) > ENDPOINT_P99_TARGET_MS:
+        missed.append(f"endpoint p99 above {ENDPOINT_P99_TARGET_MS} ms")
+    if missed:
+        print("MISSED: " + "; ".join(missed))
+        sys.exit(1)
+    print("All latency targets met")
+
+
+if __name__ == "__main__":
+    main()
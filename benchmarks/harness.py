@@ -0,0 +1,113 @@
+"""
+Shared setup for the NetFix benchmarks.
+
+Each benchmark builds a throwaway in-memory test database, seeds it with a
+catalog of companies, services, customers and requests, and then drives the
+real URL stack through Django's test clients - db.sqlite3 is never touched.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "netfix.settings")
+
+
+def setup_django():
+    """Configures Django and creates the in-memory benchmark database"""
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def seed(companies=50, services_per_company=4, customers=200, requests=5000, seed_value=42):
+    """Bulk-loads a catalog; returns (companies, services, customers) lists"""
+    from services.models import Category, Service, ServiceRequest
+    from users.models import User, Company, Customer
+
+    rng = random.Random(seed_value)
+    fields = [category.name for category in Category.service_categories()]
+
+    # bulk_create doesn't hand back primary keys on SQLite, so each level is re-read
+    User.objects.bulk_create([
+        User(username=f"company{i}", email=f"company{i}@bench.test", is_company=True)
+        for i in range(companies)
+    ])
+    Company.objects.bulk_create([
+        Company(user=user, field_of_work=fields[i % len(fields)])
+        for i, user in enumerate(User.objects.filter(is_company=True).order_by("id"))
+    ])
+    company_rows = list(Company.objects.select_related("user"))
+    Service.objects.bulk_create([
+        Service(
+            company=company, name=f"{company.field_of_work} {j}",
+            description="Benchmark service " * 5,
+            price_hour=Decimal(rng.randint(500, 5000)) / 100,
+            field=company.field_of_work,
+        )
+        for company in company_rows for j in range(services_per_company)
+    ])
+    service_rows = list(Service.objects.all())
+
+    User.objects.bulk_create([
+        User(username=f"customer{i}", email=f"customer{i}@bench.test", is_customer=True)
+        for i in range(customers)
+    ])
+    Customer.objects.bulk_create([
+        Customer(user=user) for user in User.objects.filter(is_customer=True).order_by("id")
+    ])
+    customer_rows = list(Customer.objects.select_related("user"))
+    ServiceRequest.objects.bulk_create([
+        ServiceRequest(
+            customer=rng.choice(customer_rows), service=rng.choice(service_rows),
+            address=f"{i} Bench Street", hours_needed=rng.randint(1, 8),
+        )
+        for i in range(requests)
+    ], batch_size=500)
+
+    return company_rows, service_rows, customer_rows
+
+
+class Timer:
+    """Collects per-call latencies in milliseconds"""
+
+    def __init__(self):
+        self.samples = []
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append((time.perf_counter() - self._start) * 1000)
+
+    def record(self, ms):
+        self.samples.append(ms)
+
+
+def summarize(label, samples, elapsed=None):
+    """Formats p50/p95/p99 (ms) and throughput for a set of latency samples"""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    line = (
+        f"{label:<40} n={len(ordered):<6} p50={pct(0.50):8.3f}ms "
+        f"p95={pct(0.95):8.3f}ms p99={pct(0.99):8.3f}ms mean={statistics.mean(ordered):8.3f}ms"
+    )
+    if elapsed:
+        line += f" throughput={len(ordered) / elapsed:9.1f}/s"
+    return line
@@ -1,3 +1,19 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "task", "status", "attempts", "max_attempts", "run_at", "locked_by", "created_at")
+    list_filter = ("status", "task")
+    actions = ["retry_jobs"]
+
+    def retry_jobs(self, request, queryset):
+        """Puts dead or stuck jobs back on the queue with a fresh set of attempts"""
+        count = queryset.update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), locked_by="", locked_until=None, finished_at=None
+        )
+        self.message_user(request, f"Requeued {count} job(s).")
+    retry_jobs.short_description = "Retry selected jobs"
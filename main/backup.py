@@ -0,0 +1,119 @@
+"""
+Online SQLite backups.
+
+Copying db.sqlite3 while the site is live can catch a half-written page, and
+a single big read locks out request_service writes until it finishes. These
+helpers use SQLite's online backup API instead. It copies `pages` pages per
+step, and the source is only locked during a step, so writers get in between
+steps. The pause between steps is taken in the progress callback, because
+Python's backup() only sleeps on its own when the source is busy.
+
+A write from another connection makes SQLite restart the copy at its next
+step, so the result is always a consistent snapshot. If writes keep
+restarting it (more than `max_restarts` times), the last attempt copies
+everything in one step. That blocks writers for one full pass but always
+finishes.
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+
+class BackupRestarted(Exception):
+    pass
+
+
+def _read_only(path):
+    return sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def copy_database(source_path, target_path, pages=256, pause=0.05, max_restarts=5, progress=None):
+    """
+    Snapshots `source_path` into a new SQLite file at `target_path`
+    Returns the number of restarts caused by concurrent writes
+    """
+    restarts = 0
+    source = _read_only(source_path)
+    try:
+        while True:
+            stepwise = restarts <= max_restarts
+            state = {"remaining": None}
+
+            def step(status, remaining, total):
+                if state["remaining"] is not None and remaining >= state["remaining"]:
+                    raise BackupRestarted()  # No progress: a writer made SQLite start the copy over
+                state["remaining"] = remaining
+                if progress:
+                    progress(total - remaining, total)
+                if remaining and pause:
+                    time.sleep(pause)  # No lock is held here - this is the writers' window
+
+            target = sqlite3.connect(target_path)
+            try:
+                source.backup(target, pages=pages if stepwise else -1, progress=step if stepwise else None)
+                return restarts
+            except BackupRestarted:
+                restarts += 1
+            finally:
+                target.close()
+    finally:
+        source.close()
+
+
+def compress(path, level=6):
+    """Gzips `path` to `path`.gz and removes the original"""
+    with open(path, "rb") as raw, gzip.open(f"{path}.gz", "wb", compresslevel=level) as packed:
+        shutil.copyfileobj(raw, packed, 1024 * 1024)
+    os.remove(path)
+    return f"{path}.gz"
+
+
+def table_counts(connection):
+    tables = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+    return {table: connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+
+def verify(backup_path, source_path=None):
+    """
+    Restores `backup_path` (gzipped or not) into a scratch file, runs SQLite's
+    integrity check and compares its tables with `source_path`'s
+    Returns (problems, row counts per table) - no problems means it restores cleanly
+    """
+    problems = []
+    with tempfile.TemporaryDirectory() as scratch:
+        restored = os.path.join(scratch, "restored.sqlite3")
+        opener = gzip.open if backup_path.endswith(".gz") else open
+        try:
+            with opener(backup_path, "rb") as packed, open(restored, "wb") as raw:
+                shutil.copyfileobj(packed, raw, 1024 * 1024)
+        except (OSError, EOFError) as error:
+            return [f"cannot read backup: {error}"], {}
+
+        connection = sqlite3.connect(restored)
+        try:
+            result = connection.execute("PRAGMA integrity_check").fetchall()
+            if result != [("ok",)]:
+                problems.extend(f"integrity: {row[0]}" for row in result)
+                return problems, {}
+            counts = table_counts(connection)
+        except sqlite3.DatabaseError as error:
+            return [f"not a database: {error}"], {}
+        finally:
+            connection.close()
+
+    if source_path:
+        source = _read_only(source_path)
+        try:
+            missing = set(table_counts(source)) - set(counts)
+            if missing:
+                problems.append(f"missing tables: {', '.join(sorted(missing))}")
+        finally:
+            source.close()
+    return problems, counts
@@ -0,0 +1,188 @@
+"""
+Database-backed background jobs.
+
+Tasks are plain functions registered with ``@task`` in an app's ``tasks.py``.
+``enqueue()`` inserts a Job row on the current connection, so calling it inside
+``transaction.atomic()`` commits (or rolls back) the job together with the
+write that produced it. Workers (``manage.py run_worker``) claim due jobs with
+a conditional UPDATE that only one worker can win, run them, and either mark
+them done, schedule a retry with exponential backoff, or dead-letter them.
+
+A claim counts as an attempt, so a job that kills its worker still runs out
+of attempts and is dead-lettered when its lease expires. Leases are not
+renewed while a task runs: the lease (``run_worker --lease``) must be longer
+than the slowest task, or the job is reclaimed and runs twice. The first
+worker's result is then discarded - outcomes are only written by the worker
+that still holds the lease.
+"""
+
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 60
+RETRY_BASE_SECONDS = 5
+
+_registry = {}
+
+
+def task(name=None, max_attempts=3):
+    """Registers a function as a background task, e.g. ``@task()`` or ``@task("stats.rebuild")``"""
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        func.task_name = task_name
+        func.max_attempts = max_attempts
+        _registry[task_name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def autodiscover():
+    """Imports every installed app's tasks.py so their @task functions register"""
+    autodiscover_modules("tasks")
+
+
+def enqueue(func_or_name, payload=None, run_at=None, max_attempts=None):
+    """Adds a job to the queue - joins the caller's transaction if there is one"""
+    if callable(func_or_name):
+        name = func_or_name.task_name
+        max_attempts = max_attempts or func_or_name.max_attempts
+    else:
+        name = func_or_name
+        max_attempts = max_attempts or (_registry[name].max_attempts if name in _registry else 3)
+    return Job.objects.create(
+        task=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def _claimable(now):
+    """Due queued jobs, plus running jobs whose worker lost its lease and that have attempts left"""
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(
+        status=Job.RUNNING, locked_until__lt=now, attempts__lt=F("max_attempts")
+    )
+
+
+def dead_letter_expired(now=None):
+    """Dead-letters jobs whose last attempt lost its lease (e.g. the task killed its worker)"""
+    now = now or timezone.now()
+    dead = Job.objects.filter(status=Job.RUNNING, locked_until__lt=now, attempts__gte=F("max_attempts")).update(
+        status=Job.DEAD,
+        locked_by="",
+        locked_until=None,
+        finished_at=now,
+        last_error="Lease expired on the last attempt - the worker died or the task outlived its lease",
+    )
+    if dead:
+        logger.error("Dead-lettered %s job(s) whose last attempt never finished", dead)
+    return dead
+
+
+def claim(worker_id, limit=1, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Claims up to ``limit`` jobs for ``worker_id``. Candidates are selected
+    first, then each is taken with an UPDATE guarded by the same condition, so
+    two workers racing for one row can't both win it (no SELECT ... FOR UPDATE
+    needed, which SQLite lacks).
+    """
+    now = timezone.now()
+    dead_letter_expired(now)
+    candidates = list(
+        Job.objects.filter(_claimable(now)).order_by("run_at", "id").values_list("id", flat=True)[:limit * 2]
+    )
+    claimed = []
+    for job_id in candidates:
+        if len(claimed) >= limit:
+            break
+        won = Job.objects.filter(_claimable(now), id=job_id).update(
+            status=Job.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease_seconds),
+            attempts=F("attempts") + 1,  # Counted now, in case the attempt never gets to record its outcome
+        )
+        if won:
+            claimed.append(job_id)
+    return list(Job.objects.filter(id__in=claimed, locked_by=worker_id).order_by("run_at", "id"))
+
+
+def run_job(job):
+    """Runs one claimed job and records the outcome; returns the final status"""
+    owner = job.locked_by
+    try:
+        func = get_task(job.task)
+        func(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        job.locked_by = ""
+        job.locked_until = None
+        if job.attempts >= job.max_attempts:
+            job.status = Job.DEAD
+            job.finished_at = timezone.now()
+            logger.error("Job %s dead-lettered after %s attempts", job, job.attempts)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+            logger.warning("Job %s failed, retrying at %s", job, job.run_at)
+    else:
+        job.status = Job.DONE
+        job.last_error = ""
+        job.locked_by = ""
+        job.locked_until = None
+        job.finished_at = timezone.now()
+    written = Job.objects.filter(id=job.id, status=Job.RUNNING, locked_by=owner).update(
+        status=job.status, last_error=job.last_error, locked_by=job.locked_by, locked_until=job.locked_until,
+        run_at=job.run_at, finished_at=job.finished_at,
+    )
+    if not written:
+        # The lease expired mid-run and another worker owns the job now - its outcome wins
+        logger.warning("Job %s outlived its lease; discarding this run's outcome", job)
+    return job.status
+
+
+def run_pending(worker_id=None, limit=100, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Claims and runs due jobs until none are left (or ``limit`` ran); returns the count"""
+    worker_id = worker_id or new_worker_id()
+    ran = 0
+    while ran < limit:
+        jobs = claim(worker_id, limit=1, lease_seconds=lease_seconds)
+        if not jobs:
+            break
+        run_job(jobs[0])
+        ran += 1
+    return ran
+
+
+def new_worker_id():
+    return uuid.uuid4().hex[:12]
+
+
+def worker_loop(worker_id, stop_event, poll_interval=1.0, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Body of one worker thread - polls, runs, sleeps when the queue is empty"""
+    while not stop_event.is_set():
+        close_old_connections()
+        try:
+            jobs = claim(worker_id, limit=1, lease_seconds=lease_seconds)
+            for job in jobs:
+                run_job(job)
+        except Exception:
+            logger.exception("Worker %s failed to claim jobs", worker_id)
+            jobs = []
+        if not jobs:
+            stop_event.wait(poll_interval)
+    close_old_connections()
@@ -0,0 +1,53 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+class Command(BaseCommand):
+    help = "Reports where manage.py / WSGI startup time goes (imports by package and setup phases)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", choices=["wsgi", "manage"], default="wsgi")
+        parser.add_argument("--top", type=int, default=10, help="Number of slowest modules to list")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "netfix.settings"))
+        started = time.perf_counter()
+        probe = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "main.startup_probe", options["target"]],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        wall = time.perf_counter() - started
+        phases = json.loads(probe.stdout.strip().splitlines()[-1])
+
+        by_package = defaultdict(int)
+        modules = []
+        for line in probe.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, _, module = match.groups()
+            by_package[module.split(".")[0]] += int(self_us)
+            modules.append((int(cumulative_us), module))
+
+        self.stdout.write(f"Startup profile ({options['target']}): {wall * 1000:.1f} ms wall, including interpreter start")
+        self.stdout.write("\nPhases:")
+        for name, seconds in phases:
+            self.stdout.write(f"  {name:<50} {seconds * 1000:8.1f} ms")
+
+        self.stdout.write("\nImport time by top-level package (self time):")
+        for package, micros in sorted(by_package.items(), key=lambda item: -item[1])[:options["top"]]:
+            self.stdout.write(f"  {package:<50} {micros / 1000:8.1f} ms")
+
+        self.stdout.write("\nSlowest imports (cumulative):")
+        for micros, module in sorted(modules, reverse=True)[:options["top"]]:
+            self.stdout.write(f"  {module:<50} {micros / 1000:8.1f} ms")
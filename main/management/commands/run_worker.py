@@ -0,0 +1,45 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import jobs
+
+
+class Command(BaseCommand):
+    help = "Runs background jobs from the database queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2, help="Number of worker threads")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--lease", type=int, default=jobs.DEFAULT_LEASE_SECONDS, help="Seconds a claimed job stays locked - longer than the slowest task")
+        parser.add_argument("--once", action="store_true", help="Drain due jobs and exit instead of polling forever")
+
+    def handle(self, *args, **options):
+        jobs.autodiscover()
+
+        if options["once"]:
+            ran = jobs.run_pending(lease_seconds=options["lease"], limit=10 ** 9)
+            self.stdout.write(f"Ran {ran} job{'s' if ran != 1 else ''}")
+            return
+
+        stop = threading.Event()
+        threads = [
+            threading.Thread(
+                target=jobs.worker_loop,
+                args=(f"{jobs.new_worker_id()}-{i}", stop, options["poll_interval"], options["lease"]),
+                daemon=True,
+            )
+            for i in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Started {len(threads)} worker thread(s); Ctrl-C to stop")
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
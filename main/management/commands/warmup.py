@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main import warmup
+
+
+class Command(BaseCommand):
+    help = "Pre-compiles templates, resolves URL patterns and fills the catalog caches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("steps", nargs="*", help="Only run these steps (default: all)")
+
+    def handle(self, *args, **options):
+        for name, result, seconds in warmup.run(options["steps"]):
+            self.stdout.write(f"{name:<12} {result:>6}  {seconds * 1000:8.1f} ms")
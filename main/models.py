@@ -1,3 +1,41 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Job(models.Model):
+    """
+    Background Job Queue - Deferred work stored in the project database
+    Enqueued in the same transaction as the write that needs it, claimed by
+    workers with a lease, retried with backoff and dead-lettered when exhausted
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    DEAD = "dead"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (DEAD, "Dead"),  # Retries exhausted - kept for inspection / manual retry
+    ]
+
+    task = models.CharField(max_length=100)  # Registered task name
+    payload = models.JSONField(default=dict, blank=True)  # Keyword arguments for the task
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)  # Earliest time the job may run
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    locked_by = models.CharField(max_length=64, blank=True)  # Worker holding the lease
+    locked_until = models.DateTimeField(null=True, blank=True)  # Lease expiry - reclaimable after this
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"]),  # Claim query for due jobs
+            models.Index(fields=["status", "locked_until"]),  # Claim query for expired leases
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,58 @@
+"""
+Phase timer for ``manage.py profile_startup``.
+
+Run in a fresh interpreter (``python -X importtime -m main.startup_probe
+wsgi|manage``) so nothing is imported or cached yet; prints the duration of
+each startup phase as JSON on stdout.
+"""
+
+import json
+import os
+import sys
+import time
+
+
+def main(target):
+    phases = []
+    mark = time.perf_counter()
+
+    def phase(name):
+        nonlocal mark
+        now = time.perf_counter()
+        phases.append((name, now - mark))
+        mark = now
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "netfix.settings")
+    import django
+    phase("import django")
+
+    from django.conf import settings
+    settings.INSTALLED_APPS
+    phase("settings")
+
+    if target == "manage":
+        from django.core.management import get_commands
+        django.setup()
+        phase("django.setup (apps, models)")
+        get_commands()
+        phase("management command discovery")
+    else:
+        from django.core.wsgi import get_wsgi_application
+        get_wsgi_application()
+        phase("get_wsgi_application (apps, models, middleware)")
+
+    from main import warmup
+    warmup.resolve_urls()
+    phase("URLconf import + resolver")
+    warmup.compile_templates()
+    phase("template compilation")
+
+    from django.db import connection
+    connection.ensure_connection()
+    phase("first DB connection")
+
+    print(json.dumps(phases))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "wsgi")
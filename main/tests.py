@@ -1,9 +1,40 @@
-from django.test import TestCase, Client
+import asyncio
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.templatetags.static import static
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, AsyncRequestFactory, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from django.db.models import Count
 from decimal import Decimal
+from unittest.mock import patch
 from users.models import User, Customer, Company
-from services.models import Service, ServiceRequest
+from services import autocomplete, facets
+from services.models import Category, Service, ServiceRequest
+from main import backup, jobs, warmup
+from main.models import Job
+from netfix import access_log, metrics, microcache, page_cache, throttle
+from netfix.async_utils import database_sync_to_async
+from netfix.staticfiles import StaticFilesMiddleware
 
 class IntegrationTests(TestCase):
     """Integration tests for complete user workflows"""
@@ -139,7 +170,7 @@ class IntegrationTests(TestCase):
 
         # Check each category was created
         for category in service_categories:
-            self.assertTrue(services.filter(field=category).exists())
+            self.assertTrue(services.filter(category__name=category).exists())
 
     def test_most_requested_services_functionality(self):
         """Test most requested services page updates correctly"""
@@ -213,3 +244,631 @@ class HomePageTests(TestCase):
         self.assertEqual(response.status_code, 200)
         # Check if service appears on home page (if implemented)
         # self.assertContains(response, 'Test Service')
+
+calls = []
+
+
+@jobs.task("tests.record")
+def record_task(value):
+    calls.append(value)
+
+
+@jobs.task("tests.explode", max_attempts=2)
+def explode_task():
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    """Test the database-backed job queue"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Test a queued job runs once and is marked done"""
+        job = jobs.enqueue(record_task, {'value': 7})
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(calls, [7])
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_enqueue_rolls_back_with_transaction(self):
+        """Test a job enqueued inside a failed transaction is discarded with the write"""
+        try:
+            with transaction.atomic():
+                jobs.enqueue('tests.record', {'value': 1})
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+    def test_future_jobs_wait(self):
+        """Test jobs scheduled in the future are not claimed early"""
+        jobs.enqueue(record_task, {'value': 1}, run_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(jobs.claim('w1'), [])
+
+    def test_claim_is_exclusive(self):
+        """Test a claimed job cannot be claimed by another worker while its lease holds"""
+        jobs.enqueue(record_task, {'value': 1})
+        self.assertEqual(len(jobs.claim('w1')), 1)
+        self.assertEqual(jobs.claim('w2'), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        """Test a job whose worker died is picked up after the lease expires"""
+        job = jobs.enqueue(record_task, {'value': 1})
+        jobs.claim('w1')
+        Job.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = jobs.claim('w2')
+        self.assertEqual([j.id for j in reclaimed], [job.id])
+        self.assertEqual(reclaimed[0].locked_by, 'w2')
+
+    def test_retry_then_dead_letter(self):
+        """Test failing jobs are retried with backoff, then dead-lettered"""
+        job = jobs.enqueue(explode_task)
+        self.assertEqual(jobs.run_job(jobs.claim('w1')[0]), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertEqual(jobs.run_job(jobs.claim('w1')[0]), Job.DEAD)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_claim_counts_attempt(self):
+        """Test a claim is an attempt even if the worker never records an outcome"""
+        job = jobs.enqueue(record_task, {'value': 1})
+        self.assertEqual(jobs.claim('w1')[0].attempts, 1)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+
+    def test_job_killing_its_worker_is_dead_lettered(self):
+        """Test a job whose every attempt lost its lease ends up dead instead of reclaimed forever"""
+        job = jobs.enqueue(explode_task)  # max_attempts=2
+        for worker in ('w1', 'w2'):
+            self.assertEqual(len(jobs.claim(worker)), 1)
+            Job.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.claim('w3'), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DEAD, 2))
+        self.assertIn('Lease expired', job.last_error)
+
+    def test_worker_that_lost_its_lease_keeps_hands_off(self):
+        """Test a slow worker's outcome doesn't overwrite the worker that reclaimed the job"""
+        job = jobs.enqueue(record_task, {'value': 1})
+        slow = jobs.claim('w1')[0]
+        Job.objects.filter(id=job.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        jobs.claim('w2')
+        jobs.run_job(slow)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.RUNNING, 'w2', 2))
+
+    def test_worker_command_once(self):
+        """Test run_worker --once drains due jobs"""
+        jobs.enqueue(record_task, {'value': 3})
+        out = StringIO()
+        call_command('run_worker', '--once', stdout=out)
+        self.assertIn('Ran 1 job', out.getvalue())
+        self.assertEqual(calls, [3])
+
+class WarmupTests(TestCase):
+    """Test worker warm-up and startup profiling"""
+
+    def test_template_names_cover_project_templates(self):
+        """Test every project template is found, and contrib templates are skipped"""
+        names = warmup.template_names()
+        self.assertIn('users/company_profile.html', names)
+        self.assertIn('services/list.html', names)
+        self.assertFalse(any(name.startswith('admin/') for name in names))
+
+    def test_run_all_steps(self):
+        """Test warm-up compiles templates, resolves URLs and primes the catalog"""
+        report = {name: result for name, result, _ in warmup.run()}
+        self.assertEqual(report['templates'], len(warmup.template_names()))
+        self.assertGreater(report['urls'], 10)
+        self.assertIn('catalog', report)
+
+    def test_catalog_caches_are_filled(self):
+        """Test the services steps leave the category cache, facet cube and autocomplete index loaded"""
+        cache.clear()
+        autocomplete.index.reset()
+        Category._by_id = {}
+        warmup.run(['categories', 'facets', 'autocomplete'])
+        self.assertTrue(Category._by_id)
+        self.assertIsNotNone(cache.get(facets.CUBE_CACHE_KEY))
+        with self.assertNumQueries(0):
+            facets.counts({})
+            autocomplete.index.suggest('plumb')
+            Category.by_slug('plumbing')
+
+    def test_warmup_command(self):
+        """Test manage.py warmup runs only the requested steps"""
+        out = StringIO()
+        call_command('warmup', 'urls', stdout=out)
+        self.assertIn('urls', out.getvalue())
+        self.assertNotIn('templates', out.getvalue())
+
+    def test_profile_startup_command(self):
+        """Test manage.py profile_startup reports phases and import breakdown"""
+        out = StringIO()
+        call_command('profile_startup', '--top', '3', stdout=out)
+        self.assertIn('get_wsgi_application', out.getvalue())
+        self.assertIn('Import time by top-level package', out.getvalue())
+
+class StaticPipelineTests(TestCase):
+    """Test hashed, pre-compressed static files and the WSGI static middleware"""
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        self.settings_override = override_settings(STATIC_ROOT=self.static_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.middleware = StaticFilesMiddleware(lambda environ, start_response: [b'django'])
+
+    def hashed_css_url(self):
+        return static('css/style.css')
+
+    def get(self, path, **environ):
+        result = {}
+
+        def start_response(status, headers):
+            result['status'] = status
+            result['headers'] = dict(headers)
+
+        body = b''.join(self.middleware(dict({'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}, **environ), start_response))
+        return result.get('status'), result.get('headers', {}), body
+
+    def test_collectstatic_writes_hashed_and_gzip_files(self):
+        """Test collectstatic produces a content-hashed stylesheet with a .gz sibling"""
+        url = self.hashed_css_url()
+        self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, url[len('/static/'):] + '.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, 'css', 'logo.png.gz')))
+
+    def test_hashed_file_is_immutable_and_negotiated(self):
+        """Test hashed files are served compressed only when the client accepts it"""
+        status, headers, body = self.get(self.hashed_css_url(), HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertIn(b'body', gzip.decompress(body))
+
+        status, headers, body = self.get(self.hashed_css_url(), HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(int(headers['Content-Length']), len(body))
+
+    def test_refused_encoding_wins_over_wildcard(self):
+        """Test gzip;q=0 keeps gzip out even when * accepts everything else"""
+        status, headers, body = self.get(self.hashed_css_url(), HTTP_ACCEPT_ENCODING='gzip;q=0, *')
+        self.assertEqual(status, '200 OK')
+        self.assertNotEqual(headers.get('Content-Encoding'), 'gzip')
+        status, headers, body = self.get(self.hashed_css_url(), HTTP_ACCEPT_ENCODING='br;q=0, *')
+        self.assertEqual(headers.get('Content-Encoding'), 'gzip')
+
+    def test_unhashed_file_revalidates_and_etag_304(self):
+        """Test unhashed names get a short max-age and If-None-Match answers 304"""
+        status, headers, _ = self.get('/static/css/style.css')
+        self.assertEqual(headers['Cache-Control'], 'public, max-age=60')
+        status, _, body = self.get('/static/css/style.css', HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+
+    def test_body_closes_its_file(self):
+        """Test the served body closes the file when the server closes it, without wsgi.file_wrapper"""
+        body = self.middleware({'PATH_INFO': '/static/css/style.css', 'REQUEST_METHOD': 'GET'}, lambda *args: None)
+        self.assertIn(b'body', b''.join(body))
+        body.close()
+        self.assertTrue(body.filelike.closed)
+
+    def test_other_paths_reach_django(self):
+        """Test non-static paths pass through to the wrapped application"""
+        self.assertEqual(self.get('/services/')[2], b'django')
+        self.assertEqual(self.get('/static/missing.css')[2], b'django')
+
+
+class ThrottleTests(TestCase):
+    """Token-bucket throttling of write endpoints and load shedding"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', email='buyer@test.com', password='testpass123',
+                                             is_customer=True)
+        Customer.objects.create(user=self.user, date_of_birth='1990-01-01')
+
+    def test_bucket_refills(self):
+        """Tokens run out after the burst and come back at the refill rate"""
+        self.assertEqual(throttle.take_token('t', 2, 60, now=100), 0)
+        self.assertEqual(throttle.take_token('t', 2, 60, now=100), 0)
+        self.assertAlmostEqual(throttle.take_token('t', 2, 60, now=100), 1.0)
+        self.assertEqual(throttle.take_token('t', 2, 60, now=101.5), 0)
+
+    @override_settings(THROTTLE_RULES={'login': (2, 1)})
+    def test_ip_limit_rejects_without_queries(self):
+        """Past the burst, login POSTs get 429 + Retry-After before any database work"""
+        for _ in range(2):
+            self.client.post(reverse('login'), {'email': 'x@test.com', 'password': 'wrong'})
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('login'), {'email': 'x@test.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(self.client.get(reverse('login')).status_code, 200)  # Reads aren't throttled
+
+    @override_settings(THROTTLE_RULES={'request_service': (100, 60)})
+    def test_user_limit_applies_across_addresses(self):
+        """The per-user bucket catches one account spread over many IPs"""
+        company_user = User.objects.create_user(username='co', email='co@test.com', password='testpass123',
+                                                is_company=True)
+        service = Service.objects.create(company=Company.objects.create(user=company_user, field_of_work='Plumbing'),
+                                         name='Fix', description='d', field='Plumbing', price_hour=Decimal('10'))
+        self.client.login(username='buyer', password='testpass123')
+        cache.set(f'throttle:user:request_service:{self.user.pk}', (0, time.time()))
+        response = self.client.post(reverse('request_service', args=[service.id]),
+                                    {'address': '1 Road', 'hours_needed': 2}, REMOTE_ADDR='10.9.9.9')
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(ServiceRequest.objects.exists())
+
+    @override_settings(MAX_CONCURRENT_REQUESTS=1, CONCURRENCY_QUEUE_TIMEOUT=0)
+    def test_sheds_load_when_full(self):
+        """With every slot busy the request is turned away with 503 + Retry-After"""
+        middleware = throttle.ThrottleMiddleware(lambda request: HttpResponse('ok'))
+        self.assertTrue(middleware.limiter.acquire(0))  # Another request holds the only slot
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '2')
+        middleware.limiter.release()
+        self.assertEqual(middleware(RequestFactory().get('/')).status_code, 200)
+
+    @override_settings(MAX_CONCURRENT_REQUESTS=1, CONCURRENCY_QUEUE_TIMEOUT=0)
+    def test_streamed_response_holds_slot_until_closed(self):
+        """A streamed body does its work while being sent, so its slot is only freed on close"""
+        middleware = throttle.ThrottleMiddleware(lambda request: StreamingHttpResponse(iter([b'rows'])))
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(middleware(RequestFactory().get('/')).status_code, 503)
+        self.assertEqual(b''.join(response.streaming_content), b'rows')
+        response.close()
+        self.assertTrue(middleware.limiter.acquire(0))
+        middleware.limiter.release()
+
+
+    def test_async_requests_run_concurrently_through_the_middleware(self):
+        """Under ASGI the middleware chain stays async, so slow async views overlap instead of queueing"""
+        async def slow_view(handler, request):
+            await asyncio.sleep(0.3)
+            return HttpResponse('ok')
+
+        with patch.object(BaseHandler, '_get_response_async', slow_view):
+            handler = ASGIHandler()
+
+        async def serve(count):
+            requests = [AsyncRequestFactory().get('/services/') for _ in range(count)]
+            return await asyncio.gather(*(handler.get_response_async(request) for request in requests))
+
+        started = time.perf_counter()
+        responses = async_to_sync(serve)(4)
+        self.assertEqual([response.status_code for response in responses], [200] * 4)
+        self.assertLess(time.perf_counter() - started, 0.9)  # Four 0.3 s views one after another take 1.2 s
+
+
+class MicrocacheTests(TransactionTestCase):
+    """Seconds-long response cache with single-flight rendering for hot anonymous pages"""
+    serialized_rollback = True  # Page versions move when writes commit; restores the migrated categories
+
+    def setUp(self):
+        cache.clear()
+        microcache.stats.clear()
+        user = User.objects.create_user(username='microco', email='microco@test.com', password='testpass123',
+                                        is_company=True)
+        self.company = Company.objects.create(user=user, field_of_work='Plumbing')
+        Service.objects.create(company=self.company, name='Pipe Fix', description='d', field='Plumbing',
+                               price_hour=Decimal('20'))
+
+    def get(self, path='/services/', client=None):
+        response = (client or self.client).get(path)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.get('X-Microcache'), body.decode()
+
+    def entry_key(self, name='services_list', path='/services/'):
+        return f"microcache:{page_cache.version(name)}:{path}"
+
+    def test_miss_then_hit(self):
+        """The first render is cached and repeated visits are served from it"""
+        self.assertEqual(self.get()[0], 'MISS')
+        with self.assertNumQueries(0):
+            outcome, body = self.get()
+        self.assertEqual(outcome, 'HIT')
+        self.assertIn('Pipe Fix', body)
+        self.assertEqual(microcache.stats[('services_list', 'hit')], 1)
+
+    def test_logged_in_and_uncached_pages_bypass(self):
+        """Logged-in visitors and pages without a TTL never touch the microcache"""
+        client = Client()
+        client.login(username='microco', password='testpass123')
+        self.assertIsNone(self.get(client=client)[0])
+        self.assertIsNone(self.get('/services/plumbing/')[0])
+
+    def test_write_retires_cached_copy(self):
+        """A new service shows up immediately instead of after the TTL"""
+        self.get()
+        Service.objects.create(company=self.company, name='Tap Swap', description='d', field='Plumbing',
+                               price_hour=Decimal('15'))
+        outcome, body = self.get()
+        self.assertEqual(outcome, 'MISS')
+        self.assertIn('Tap Swap', body)
+
+    def test_stale_copy_served_while_refreshing(self):
+        """While one request re-renders an expired page, others get the old copy"""
+        self.get()
+        key = self.entry_key()
+        entry = cache.get(key)
+        entry['fresh_until'] = time.time() - 1
+        cache.set(key, entry)
+        cache.add(f'{key}:lock', 1)  # Another worker is refreshing
+        self.assertEqual(self.get()[0], 'STALE')
+        cache.delete(f'{key}:lock')
+        self.assertEqual(self.get()[0], 'MISS')
+
+    @override_settings(MICROCACHE_WAIT=0.5)
+    def test_concurrent_miss_waits_for_render(self):
+        """A miss during someone else's render waits for their copy, or renders itself if it never comes"""
+        key = self.entry_key()
+        cache.add(f'{key}:lock', 1)
+        entry = microcache.freeze(HttpResponse(), b'rendered elsewhere', 5)
+        threading.Timer(0.1, cache.set, (key, entry)).start()
+        self.assertEqual(self.get(), ('COALESCED', 'rendered elsewhere'))
+
+        cache.delete(key)
+        with override_settings(MICROCACHE_WAIT=0.05):
+            outcome, body = self.get()
+        self.assertEqual(outcome, 'MISS')
+        self.assertIn('Pipe Fix', body)
+
+
+class MetricsTests(TransactionTestCase):
+    """Prometheus /metrics summed over worker processes"""
+    serialized_rollback = True  # Restores the migrated categories after each flush
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.settings_override = override_settings(METRICS_DIR=directory)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.directory = directory
+        metrics._values.clear()
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode().splitlines()
+
+    def test_request_counts_latency_and_queries(self):
+        """Each request is counted by view and status with its latency and query totals"""
+        self.client.get('/services/')
+        self.client.get('/services/no-such-category/')
+        lines = self.scrape()
+        self.assertIn('netfix_http_requests_total{method="GET",status="200",view="services_list"} 1', lines)
+        self.assertIn('netfix_http_requests_total{method="GET",status="404",view="services_field"} 1', lines)
+        self.assertIn('netfix_http_request_duration_seconds_bucket{view="services_list",le="+Inf"} 1', lines)
+        self.assertIn('netfix_http_request_duration_seconds_count{view="services_list"} 1', lines)
+        self.assertTrue(any(line.startswith('netfix_db_queries_total{view="services_list"}') for line in lines))
+        self.assertIn('# TYPE netfix_http_request_duration_seconds histogram', lines)
+        self.assertIn('netfix_cache_lookups_total{cache="microcache",result="miss"} 1', lines)
+
+    def test_streamed_page_measured_to_last_chunk(self):
+        """A streamed page's queries and latency are recorded when its body is done, not when it starts"""
+        user = User.objects.create_user(username='streamco', email='streamco@test.com', password='testpass123',
+                                        is_company=True)
+        company = Company.objects.create(user=user, field_of_work='Plumbing')
+        Service.objects.create(company=company, name='Pipe Fix', description='d', field='Plumbing',
+                               price_hour=Decimal('20'))
+        metrics._values.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/services/')
+            self.assertTrue(response.streaming)
+            self.assertFalse([key for key in metrics._values if key[0] == 'netfix_http_requests_total'])  # Still pending
+            b''.join(response.streaming_content)
+        count = metrics._values[('netfix_db_queries_total', '', (('view', 'services_list'),))]
+        self.assertEqual(count, len(queries))
+        self.assertTrue(any('FROM "services_service"' in query['sql'] for query in queries))
+        self.assertEqual(metrics._values[('netfix_http_request_duration_seconds', '_count',
+                                          (('view', 'services_list'),))], 1)
+
+    def test_business_counters(self):
+        """Created services and submitted requests are counted per field once committed"""
+        user = User.objects.create_user(username='metricco', email='metricco@test.com', password='testpass123',
+                                        is_company=True)
+        company = Company.objects.create(user=user, field_of_work='Plumbing')
+        service = Service.objects.create(company=company, name='Pipe Fix', description='d', field='Plumbing',
+                                         price_hour=Decimal('20'))
+        customer_user = User.objects.create_user(username='metriccust', email='metriccust@test.com',
+                                                 password='testpass123', is_customer=True)
+        customer = Customer.objects.create(user=customer_user, date_of_birth='1990-01-01')
+        ServiceRequest.objects.create(customer=customer, service=service, address='1 Road', hours_needed=2)
+        lines = self.scrape()
+        self.assertIn('netfix_services_created_total{field="Plumbing"} 1', lines)
+        self.assertIn('netfix_service_requests_submitted_total{field="Plumbing"} 1', lines)
+
+    def test_other_workers_files_are_added(self):
+        """Totals from other processes' files are summed with this process's live counts"""
+        metrics.SERVICES_CREATED.inc(field='Painting')
+        with open(os.path.join(self.directory, '99999.json'), 'w') as handle:
+            json.dump([['netfix_services_created_total', '', [['field', 'Painting']], 2]], handle)
+        with open(os.path.join(self.directory, '99998.json'), 'w') as handle:
+            handle.write('{"truncat')  # Unreadable files are skipped
+        self.assertIn('netfix_services_created_total{field="Painting"} 3', self.scrape())
+
+    def test_flush_writes_this_process_file(self):
+        """A flush leaves a whole JSON file named after the process"""
+        metrics.SERVICES_CREATED.inc(field='Locks')
+        metrics.flush(force=True)
+        with open(os.path.join(self.directory, f'{os.getpid()}.json')) as handle:
+            self.assertIn(['netfix_services_created_total', '', [['field', 'Locks']], 1], json.load(handle))
+
+    def test_concurrent_flushes_publish_whole_files(self):
+        """Threads flushing at once never interleave their writes or rename each other's file away"""
+        for field in range(200):
+            metrics.SERVICES_CREATED.inc(field=str(field))
+        errors = []
+
+        def flush_repeatedly():
+            try:
+                for _ in range(20):
+                    metrics.flush(force=True)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=flush_repeatedly) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with open(os.path.join(self.directory, f'{os.getpid()}.json')) as handle:
+            self.assertEqual(len(json.load(handle)), 200)
+
+    def test_async_view_queries_are_counted(self):
+        """Queries an async view runs in the database thread pool count toward its request"""
+        count_services = database_sync_to_async(lambda: Service.objects.count())
+
+        async def view(request):
+            await count_services()
+            return HttpResponse('ok')
+
+        middleware = metrics.MetricsMiddleware(view)
+        async_to_sync(middleware)(AsyncRequestFactory().get('/'))
+        self.assertEqual(metrics._values[('netfix_db_queries_total', '', (('view', 'unmatched'),))], 1)
+
+
+class AccessLogTests(TestCase):
+    """Sampled JSON access log written by a background thread"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def logged(self, status=200, elapsed=0.01, route='services_list'):
+        request = self.factory.get('/services/')
+        request.user = AnonymousUser()
+        with self.assertLogs('netfix.access', 'INFO') as logs:
+            access_log.logger.info('marker')  # assertLogs needs at least one record
+            access_log.log_request(request, HttpResponse(status=status), route, elapsed, 3)
+        return [record.access for record in logs.records if hasattr(record, 'access')]
+
+    @override_settings(ACCESS_LOG_SAMPLE_RATES={'services_list': 0}, ACCESS_LOG_SLOW_SECONDS=0.5)
+    def test_failed_and_slow_requests_bypass_sampling(self):
+        """A route sampled at 0 still logs its errors and slow requests"""
+        self.assertEqual(self.logged(), [])
+        self.assertEqual(self.logged(status=500)[0]['reason'], 'error')
+        slow = self.logged(elapsed=0.75)[0]
+        self.assertEqual((slow['reason'], slow['latency_ms'], slow['queries']), ('slow', 750.0, 3))
+
+    @override_settings(ACCESS_LOG_SAMPLE_RATES={}, ACCESS_LOG_DEFAULT_SAMPLE_RATE=1.0)
+    def test_requests_logged_with_route_and_user_type(self):
+        """The middleware logs the route name, user type, status and query count"""
+        user = User.objects.create_user(username='logco', email='logco@test.com', password='testpass123',
+                                        is_company=True)
+        Company.objects.create(user=user, field_of_work='Plumbing')
+        self.client.login(username='logco', password='testpass123')
+        with self.assertLogs('netfix.access', 'INFO') as logs:
+            self.client.get('/services/most-requested/')
+        entry = logs.records[-1].access
+        self.assertEqual((entry['route'], entry['user_type'], entry['status']),
+                         ('most_requested_services', 'company', 200))
+        self.assertGreater(entry['queries'], 0)
+
+    def test_background_handler_writes_json_lines(self):
+        """Records are written as JSON by the listener thread; a full queue drops instead of blocking"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        handler = access_log.BackgroundHandler(os.path.join(directory, 'access.log'))
+        record = logging.LogRecord('netfix.access', logging.INFO, __file__, 1, 'access', None, None)
+        record.access = {'route': 'home', 'status': 200}
+        handler.handle(record)
+        handler.close()  # Waits for the queue to drain
+        with open(os.path.join(directory, 'access.log')) as handle:
+            line = json.loads(handle.read())
+        self.assertEqual((line['route'], line['status']), ('home', 200))
+        self.assertIn('ts', line)
+
+        full = access_log.BackgroundHandler(os.path.join(directory, 'full.log'), maxsize=1)
+        full.listener.stop()  # Nothing drains the queue now
+        full.handle(record)
+        full.handle(record)
+        self.assertEqual(full.dropped, 1)
+        full.close()
+
+
+class BackupTests(TestCase):
+    """Online SQLite backups that let writers in between steps"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.source = os.path.join(self.directory, 'live.sqlite3')
+        db = sqlite3.connect(self.source)
+        db.execute('CREATE TABLE bookings (id INTEGER PRIMARY KEY, note TEXT)')
+        db.executemany('INSERT INTO bookings (note) VALUES (?)', [('x' * 500,) for _ in range(400)])
+        db.commit()
+        db.close()
+
+    def write(self, note='during backup'):
+        db = sqlite3.connect(self.source)
+        db.execute('INSERT INTO bookings (note) VALUES (?)', (note,))
+        db.commit()
+        db.close()
+
+    def rows(self, path):
+        db = sqlite3.connect(path)
+        try:
+            return db.execute('SELECT COUNT(*) FROM bookings').fetchone()[0]
+        finally:
+            db.close()
+
+    def test_writer_gets_in_between_steps(self):
+        """A write between steps succeeds and the copy restarts to include it"""
+        target = os.path.join(self.directory, 'copy.sqlite3')
+        writes = []
+
+        def progress(done, total):
+            if not writes:
+                self.write()  # Would raise "database is locked" if the backup held its lock here
+                writes.append(done)
+
+        restarts = backup.copy_database(self.source, target, pages=10, pause=0, progress=progress)
+        self.assertEqual(restarts, 1)
+        self.assertEqual(self.rows(target), 401)
+
+    def test_constant_writes_finish_in_one_pass(self):
+        """Once writes have restarted the copy too often, it finishes in a single step"""
+        target = os.path.join(self.directory, 'copy.sqlite3')
+        restarts = backup.copy_database(self.source, target, pages=10, pause=0, max_restarts=2,
+                                        progress=lambda done, total: self.write())
+        self.assertEqual(restarts, 3)
+        self.assertEqual(self.rows(target), 403)
+
+    def test_command_compresses_and_verifies(self):
+        """backup_db writes a gzipped snapshot that restores cleanly"""
+        output = os.path.join(self.directory, 'out', 'snapshot.sqlite3')
+        out = StringIO()
+        with patch.dict(connections['default'].settings_dict, {'NAME': self.source}):
+            call_command('backup_db', '--output', output, '--compress', '--verify', '--pages', '20', '--pause', '0',
+                         stdout=out)
+        self.assertTrue(os.path.exists(output + '.gz'))
+        self.assertFalse(os.path.exists(output))
+        self.assertIn('Verified: 1 tables, 400 rows', out.getvalue())
+        problems, counts = backup.verify(output + '.gz', self.source)
+        self.assertEqual((problems, counts), ([], {'bookings': 400}))
+
+    def test_verify_rejects_damaged_backup(self):
+        """A truncated or corrupt file fails verification"""
+        damaged = os.path.join(self.directory, 'damaged.sqlite3.gz')
+        with open(damaged, 'wb') as handle:
+            handle.write(gzip.compress(b'SQLite format 3\x00' + b'\x00' * 100)[:40])
+        problems, _ = backup.verify(damaged, self.source)
+        self.assertTrue(problems)
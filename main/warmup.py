@@ -0,0 +1,105 @@
+"""
+Worker warm-up.
+
+A fresh worker pays for compiling templates, building the URL resolver and
+opening its first database connection on the first requests it serves. These
+steps do that work up front - from ``manage.py warmup``, or from
+netfix/wsgi.py / netfix/asgi.py when NETFIX_WARMUP=1 so every worker process
+warms itself before taking traffic.
+
+Apps with their own caches add a step with ``register_step()`` - services/warmup.py
+fills the category cache, the facet cube and the autocomplete index.
+"""
+
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.template import engines
+from django.urls import get_resolver, URLPattern, URLResolver
+
+logger = logging.getLogger(__name__)
+
+_steps = []
+
+
+def register_step(name):
+    """Adds a function to the warm-up sequence, e.g. ``@register_step("facet index")``"""
+    def decorator(func):
+        _steps.append((name, func))
+        return func
+    return decorator
+
+
+def template_names():
+    """Every template under the project's */templates directories"""
+    roots = [os.path.join(app.path, "templates") for app in apps.get_app_configs()]
+    for config in settings.TEMPLATES:
+        roots.extend(config.get("DIRS", []))
+
+    names = set()
+    for root in roots:
+        if not root.startswith(settings.BASE_DIR) or not os.path.isdir(root):
+            continue  # Leave django.contrib's admin templates to compile on demand
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith((".html", ".txt")):
+                    names.add(os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, "/"))
+    return sorted(names)
+
+
+@register_step("templates")
+def compile_templates():
+    """Parses every project template - kept by the cached loader when it's enabled"""
+    engine = engines["django"]
+    names = template_names()
+    for name in names:
+        engine.get_template(name)
+    return len(names)
+
+
+def _walk(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern.pattern.regex
+            yield from _walk(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            pattern.pattern.regex
+            yield pattern
+
+
+@register_step("urls")
+def resolve_urls():
+    """Imports every URLconf, compiles each pattern and builds the reverse lookup tables"""
+    resolver = get_resolver()
+    resolver.reverse_dict  # Populates the reverse/namespace dictionaries
+    return sum(1 for _ in _walk(resolver.url_patterns))
+
+
+@register_step("catalog")
+def prime_catalog():
+    """Opens the DB connection, loads the content types and runs the catalog queries once - their rows aren't kept"""
+    from django.contrib.contenttypes.models import ContentType
+    from django.db.models import Count
+    from services.models import Service
+    from users.models import Company, Customer
+
+    ContentType.objects.get_for_models(Service, Company, Customer)
+    rows = len(Service.objects.select_related("company__user").order_by("-date_created")[:50])
+    list(Service.objects.annotate(request_count=Count("servicerequest")).order_by("-request_count")[:50])
+    return rows
+
+
+def run(steps=None):
+    """Runs the warm-up steps (all by default); returns [(name, result, seconds)]"""
+    report = []
+    for name, func in _steps:
+        if steps and name not in steps:
+            continue
+        started = time.perf_counter()
+        result = func()
+        report.append((name, result, time.perf_counter() - started))
+    logger.info("Warm-up: %s", ", ".join(f"{name}={result} in {seconds:.3f}s" for name, result, seconds in report))
+    return report
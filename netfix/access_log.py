@@ -0,0 +1,110 @@
+"""
+Structured access log, written off the request path.
+
+MetricsMiddleware hands every finished request to log_request(), which
+decides whether to keep it:
+
+- failed (5xx) and slow (over ACCESS_LOG_SLOW_SECONDS) requests always
+- anything else with the probability set for its URL name in
+  ACCESS_LOG_SAMPLE_RATES (ACCESS_LOG_DEFAULT_SAMPLE_RATE otherwise)
+
+Kept requests go to the "netfix.access" logger. BackgroundHandler only puts
+the record on a bounded queue; a listener thread formats it as one JSON line
+and does the file write. When the queue is full the record is dropped (and
+counted) rather than making the request wait for the disk.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+logger = logging.getLogger("netfix.access")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line from the record's `access` fields"""
+
+    def format(self, record):
+        fields = {"ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")}
+        fields.update(getattr(record, "access", {"message": record.getMessage()}))
+        return json.dumps(fields, separators=(",", ":"))
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Queues records for a listener thread that writes them to `filename` (or
+    stderr) - configured from settings.LOGGING like any other handler
+    """
+
+    def __init__(self, filename=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        if filename:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            target = logging.FileHandler(filename, delay=True)
+        else:
+            target = logging.StreamHandler()
+        target.setFormatter(JsonFormatter())
+        self.dropped = 0
+        self.listener = Listener(self.queue, target)
+        self.listener.start()
+
+    def prepare(self, record):
+        return record  # Formatting happens on the listener thread
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Writes out what is still queued - logging calls this at interpreter exit"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        for target in self.listener.handlers:
+            target.close()
+        super().close()
+
+
+class Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Waits for room in a full queue instead of raising
+
+
+def user_type(request):
+    user = getattr(request, "user", None)  # Missing when a middleware answered before authentication
+    if user is None or not user.is_authenticated:
+        return "anonymous"
+    if user.is_company:
+        return "company"
+    return "customer" if user.is_customer else "staff"
+
+
+def log_request(request, response, route, elapsed, queries):
+    """Logs one finished request if it is failed, slow or sampled"""
+    if response.status_code >= 500:
+        reason = "error"
+    elif elapsed >= settings.ACCESS_LOG_SLOW_SECONDS:
+        reason = "slow"
+    else:
+        rate = settings.ACCESS_LOG_SAMPLE_RATES.get(route, settings.ACCESS_LOG_DEFAULT_SAMPLE_RATE)
+        if rate <= 0 or random.random() >= rate:
+            return
+        reason = "sampled"
+    logger.info("access", extra={"access": {
+        "route": route,
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "latency_ms": round(elapsed * 1000, 2),
+        "queries": queries,
+        "user_type": user_type(request),
+        "reason": reason,
+        "sample_rate": rate if reason == "sampled" else 1,  # Weight for turning sampled counts into totals
+    }})
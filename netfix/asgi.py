@@ -0,0 +1,24 @@
+"""
+ASGI config for netfix project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Read-only catalog and profile pages are served by coroutine views here, so one
+worker process can keep many concurrent readers in flight.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "netfix.settings")
+os.environ.setdefault("NETFIX_ASYNC_VIEWS", "1")
+
+application = get_asgi_application()
+
+if os.environ.get("NETFIX_WARMUP") == "1":
+    # Compile templates, build URL resolvers and prime catalog queries before taking traffic
+    from main import warmup
+    warmup.run()
@@ -0,0 +1,179 @@
+"""
+Offline geocoding and geohash lookups.
+
+Addresses are geocoded against the gazetteer shipped in netfix/data (place
+name -> coordinates), so nothing calls an external service. Located rows store
+a 12-character geohash in an indexed column; a radius query picks the geohash
+precision whose cells are at least as large as the radius and reads the 3x3
+block of cells around the point with index range scans, so only nearby rows
+are ever loaded and measured.
+"""
+
+import csv
+import functools
+import math
+import os
+import re
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 12
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.csv")
+
+
+@functools.lru_cache(maxsize=1)
+def gazetteer():
+    """Place names (lower-case) to (lat, lon), longest names first so 'New York' beats 'York'"""
+    with open(GAZETTEER_PATH, newline="", encoding="utf-8") as f:
+        places = {row["name"].lower(): (float(row["latitude"]), float(row["longitude"])) for row in csv.DictReader(f)}
+    return dict(sorted(places.items(), key=lambda item: -len(item[0])))
+
+
+def geocode(text):
+    """
+    Coordinates for free text: either an explicit "lat,lon" pair or the first
+    gazetteer place named in it. Returns None when nothing matches.
+    """
+    if not text:
+        return None
+    match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*", text)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
+        return None
+    lowered = text.lower()
+    for name, coordinates in gazetteer().items():
+        if re.search(rf"\b{re.escape(name)}\b", lowered):
+            return coordinates
+    return None
+
+
+def encode(lat, lon, precision=PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size_degrees(precision):
+    """(lat_span, lon_span) of one geohash cell in degrees"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def precision_for_radius(lat, radius_km):
+    """Finest precision whose cells are at least radius_km in both directions (0 = whole world)"""
+    for precision in range(PRECISION, 0, -1):
+        lat_span, lon_span = cell_size_degrees(precision)
+        # Cells narrow towards the poles - measure width at the cell edge farthest from the equator
+        edge_lat = min(89.9, abs(lat) + lat_span)
+        height_km = lat_span * KM_PER_DEGREE
+        width_km = lon_span * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+        if min(height_km, width_km) >= radius_km:
+            return precision
+    return 0
+
+
+def covering_cells(lat, lon, radius_km):
+    """
+    Geohash prefixes whose union contains every point within radius_km of
+    (lat, lon); an empty list means the radius needs the whole table.
+    """
+    precision = precision_for_radius(lat, radius_km)
+    if precision == 0:
+        return []
+    lat_span, lon_span = cell_size_degrees(precision)
+    cells = set()
+    for dlat in (-lat_span, 0, lat_span):
+        for dlon in (-lon_span, 0, lon_span):
+            cell_lat = max(-90.0, min(90.0, lat + dlat))
+            cell_lon = (lon + dlon + 180.0) % 360.0 - 180.0
+            cells.add(encode(cell_lat, cell_lon, precision))
+    return sorted(cells)
+
+
+def prefix_range(prefix):
+    """(low, high) bounds so that low <= geohash < high matches exactly the cells under prefix"""
+    return prefix, prefix + "~"  # '~' sorts after every base32 character
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def locate(instance, text):
+    """
+    Sets latitude/longitude/geohash on a model instance from free text. Text
+    that doesn't geocode leaves existing coordinates alone (e.g. set in the admin).
+    """
+    coordinates = geocode(text)
+    if coordinates:
+        instance.latitude, instance.longitude = coordinates
+    if instance.latitude is not None and instance.longitude is not None:
+        instance.geohash = encode(instance.latitude, instance.longitude)
+    else:
+        instance.geohash = ""
+
+
+def within_radius(queryset, lat, lon, radius_km):
+    """
+    [(distance_km, row)] for rows of ``queryset`` (a model with latitude,
+    longitude and geohash columns) within radius_km, nearest first. Only rows in
+    the covering geohash cells are loaded.
+    """
+    from django.db.models import Q
+
+    cells = covering_cells(lat, lon, radius_km)
+    if cells:
+        condition = Q()
+        for cell in cells:
+            low, high = prefix_range(cell)
+            condition |= Q(geohash__gte=low, geohash__lt=high)
+        candidates = queryset.filter(condition)
+    else:
+        candidates = queryset.exclude(geohash="")
+
+    found = []
+    for row in candidates:
+        distance = distance_km(lat, lon, row.latitude, row.longitude)
+        if distance <= radius_km:
+            found.append((distance, row))
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+def nearest(queryset, lat, lon, k, start_radius_km=5.0):
+    """
+    The k rows closest to (lat, lon) as [(distance_km, row)]. Searches a
+    growing radius; everything within the radius has been seen, so once k rows
+    are found they are the true k nearest.
+    """
+    radius = start_radius_km
+    while True:
+        found = within_radius(queryset, lat, lon, radius)
+        if len(found) >= k or radius >= math.pi * EARTH_RADIUS_KM:
+            return found[:k]
+        radius *= 4
@@ -0,0 +1,252 @@
+"""
+Prometheus metrics, shared between worker processes through files.
+
+Each process counts in memory and writes its totals to METRICS_DIR/<pid>.json
+(atomically, at most every METRICS_FLUSH_INTERVAL seconds, from the request
+that notices the interval has passed). /metrics adds up every process's file
+- its own counts live - and renders the Prometheus text format. Empty the
+directory when the service starts, as with prometheus_client's multiprocess mode.
+
+MetricsMiddleware goes first in MIDDLEWARE and records per-view request
+counts by status, latency histograms and the database queries each view ran.
+Streamed pages run their main queries while the body is iterated, so for
+them the timer and query count keep going until the last chunk has been
+produced (or the response is closed early). The same measurements feed the
+access log (netfix/access_log.py).
+
+Under ASGI a request's queries run in worker threads, not the one handling
+it. Async views count the queries they run through database_sync_to_async;
+queries from sync views and middleware that Django runs in its own executor
+aren't counted.
+"""
+
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.utils.deprecation import MiddlewareMixin
+
+from . import access_log
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # One writer of this process's file at a time
+_values = defaultdict(float)  # (metric name, sample suffix, sorted label items) -> value
+_metrics = {}  # name -> metric, in registration order
+_last_flush = 0.0
+_request_queries = contextvars.ContextVar("netfix_request_queries", default=None)  # An async request's query hook
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        _metrics[name] = self
+
+    def inc(self, amount=1, **labels):
+        key = (self.name, "", tuple(sorted(labels.items())))
+        with _lock:
+            _values[key] += amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        _metrics[name] = self
+
+    def observe(self, value, **labels):
+        labels = tuple(sorted(labels.items()))
+        with _lock:
+            for bound in self.buckets:
+                if value <= bound:  # Buckets are stored cumulative, so files just add up
+                    _values[(self.name, "_bucket", labels + (("le", _format(bound)),))] += 1
+            _values[(self.name, "_bucket", labels + (("le", "+Inf"),))] += 1
+            _values[(self.name, "_sum", labels)] += value
+            _values[(self.name, "_count", labels)] += 1
+
+
+REQUESTS = Counter("netfix_http_requests_total", "HTTP responses by view, method and status code")
+LATENCY = Histogram("netfix_http_request_duration_seconds", "Time spent producing a response, by view")
+DB_QUERIES = Counter(
+    "netfix_db_queries_total",
+    "Database queries run while handling a request, by view (async views: only those run through database_sync_to_async)",
+)
+DB_QUERY_SECONDS = Counter("netfix_db_query_seconds_total", "Time spent in database queries, by view")
+CACHE_LOOKUPS = Counter("netfix_cache_lookups_total", "Application cache lookups by cache and result")
+SERVICES_CREATED = Counter("netfix_services_created_total", "Services created, by field")
+REQUESTS_SUBMITTED = Counter("netfix_service_requests_submitted_total", "Service requests submitted, by field")
+
+
+def _format(value):
+    return repr(float(value)) if value != int(value) else f"{int(value)}.0"
+
+
+def _path(pid):
+    return os.path.join(settings.METRICS_DIR, f"{pid}.json")
+
+
+def flush(force=False):
+    """Writes this process's totals to its file (rate-limited unless forced)"""
+    global _last_flush
+    if not _flush_lock.acquire(blocking=force):
+        return  # Another thread is writing the file right now
+    try:
+        now = time.monotonic()
+        if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        _last_flush = now
+        with _lock:
+            samples = [[name, suffix, list(labels), value] for (name, suffix, labels), value in _values.items()]
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        temporary = _path(f"{os.getpid()}.tmp")
+        with open(temporary, "w") as handle:
+            json.dump(samples, handle)
+        os.replace(temporary, _path(os.getpid()))  # Readers only ever see whole files
+    finally:
+        _flush_lock.release()
+
+
+def counting_queries():
+    """
+    Counts the queries run inside it toward the current async request - the
+    request's own thread isn't the one running them (see netfix/async_utils.py)
+    """
+    hook = _request_queries.get()
+    return connection.execute_wrapper(hook) if hook else contextlib.nullcontext()
+
+
+atexit.register(lambda: flush(force=True) if _values else None)
+
+
+def collect():
+    """Every process's totals added together - this process's from memory, the others' from their files"""
+    totals = defaultdict(float)
+    own = f"{os.getpid()}.json"
+    if os.path.isdir(settings.METRICS_DIR):
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.endswith(".json") or filename == own:
+                continue
+            try:
+                with open(os.path.join(settings.METRICS_DIR, filename)) as handle:
+                    samples = json.load(handle)
+            except (OSError, ValueError):
+                continue  # A worker that died mid-write; its last good file was replaced, not truncated
+            for name, suffix, labels, value in samples:
+                totals[(name, suffix, tuple(tuple(label) for label in labels))] += value
+    with _lock:
+        for key, value in _values.items():
+            totals[key] += value
+    return totals
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def exposition():
+    """The Prometheus text format (version 0.0.4) for all metrics"""
+    samples = defaultdict(list)
+    for (name, suffix, labels), value in collect().items():
+        plain = tuple(label for label in labels if label[0] != "le")
+        bound = float(dict(labels).get("le", 0))
+        samples[name].append(((plain, suffix, bound), suffix, labels, value))
+
+    lines = []
+    for name, metric in _metrics.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for _, suffix, labels, value in sorted(samples[name], key=lambda sample: sample[0]):
+            label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels)
+            label_text = f"{{{label_text}}}" if labels else ""
+            lines.append(f"{name}{suffix}{label_text} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        queries, timed = self.query_counter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timed):
+            response = self.get_response(request)
+        return self.track(request, response, started, queries, timed)
+
+    async def __acall__(self, request):
+        queries, timed = self.query_counter()
+        started = time.perf_counter()
+        token = _request_queries.set(timed)  # Copied into the threads sync_to_async runs the view's queries in
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        return self.track(request, response, started, queries, timed)
+
+    @staticmethod
+    def query_counter():
+        queries = {"count": 0, "seconds": 0.0}
+
+        def timed(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries["count"] += 1
+                queries["seconds"] += time.perf_counter() - started
+
+        return queries, timed
+
+    def track(self, request, response, started, queries, timed):
+        if not response.streaming:
+            self.record(request, response, time.perf_counter() - started, queries)
+            return response
+
+        recorded = []
+
+        def finish():
+            if not recorded:  # Once - at the end of the stream, or on close if it was abandoned
+                recorded.append(True)
+                self.record(request, response, time.perf_counter() - started, queries)
+
+        response.streaming_content = self.measure(response.streaming_content, timed, finish)
+        response._resource_closers.append(finish)
+        return response
+
+    @staticmethod
+    def measure(content, timed, finish):
+        try:
+            with connection.execute_wrapper(timed):
+                yield from content
+        finally:
+            finish()
+
+    @staticmethod
+    def record(request, response, elapsed, queries):
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name or match.view_name) if match else "unmatched"  # Raw paths would explode label counts
+        REQUESTS.inc(view=view, method=request.method, status=str(response.status_code))
+        LATENCY.observe(elapsed, view=view)
+        if queries["count"]:
+            DB_QUERIES.inc(queries["count"], view=view)
+            DB_QUERY_SECONDS.inc(queries["seconds"], view=view)
+        access_log.log_request(request, response, view, elapsed, queries["count"])
+        flush()
@@ -0,0 +1,134 @@
+"""
+Microcache for hot anonymous GET pages.
+
+During a spike many identical requests for /services/ arrive within the same
+second. MicrocacheMiddleware keeps each finished response for a few seconds
+(settings.MICROCACHE_TTLS, per URL name) and makes sure only one request
+renders it at a time:
+
+- fresh copy: served straight from the cache (HIT)
+- no copy: the first request takes a short lock in the cache and renders
+  (MISS); concurrent requests poll for its result instead of hitting the
+  database themselves (COALESCED), rendering only if it takes longer than
+  MICROCACHE_WAIT seconds
+- expired copy younger than MICROCACHE_STALE: one request re-renders while
+  the others keep getting the old copy (STALE)
+
+Keys include the page's netfix/page_cache.py version, so a service write
+retires the cached copies at once instead of waiting out the TTL. A streamed
+page still streams on a miss; the copy is stored when the stream ends.
+
+Only anonymous requests are cached - logged-in pages carry a per-user navbar
+and already share the cached body from netfix/page_cache.py. The outcome is
+sent as X-Microcache and counted per URL name in `stats`.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics, page_cache
+
+POLL_INTERVAL = 0.02  # Seconds between looks at the cache while another request renders
+LOCK_TIMEOUT = 10  # A crashed renderer's lock expires after this long
+
+stats = Counter()  # (url name, outcome) -> responses, for this process
+_stats_lock = threading.Lock()
+
+
+def record(name, outcome):
+    with _stats_lock:
+        stats[(name, outcome)] += 1
+    metrics.CACHE_LOOKUPS.inc(cache="microcache", result=outcome)
+
+
+def freeze(response, content, fresh_for):
+    """A cacheable copy of a finished response, fresh for `fresh_for` seconds"""
+    return {
+        "status": response.status_code,
+        "headers": [(header, value) for header, value in response.items() if header.lower() != "content-length"],
+        "content": content,
+        "fresh_until": time.time() + fresh_for,
+    }
+
+
+def thaw(entry):
+    response = HttpResponse(entry["content"], status=entry["status"])
+    for header, value in entry["headers"]:
+        response[header] = value
+    return response
+
+
+def wait_for(key, wait):
+    """Polls for the entry another request is rendering; None if it doesn't show up in time"""
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+class MicrocacheMiddleware(MiddlewareMixin):
+    """Goes last in MIDDLEWARE, so the cached response still passes through every other middleware"""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = request.resolver_match.url_name
+        ttl = settings.MICROCACHE_TTLS.get(name)
+        if (ttl is None or request.method not in ("GET", "HEAD") or request.user.is_authenticated
+                or asyncio.iscoroutinefunction(view_func)):
+            return None
+
+        key = f"microcache:{page_cache.version(name)}:{request.get_full_path()}"
+        lock_key = f"{key}:lock"
+        entry = cache.get(key)
+        if entry is not None and entry["fresh_until"] > time.time():
+            return self.respond(name, "hit", thaw(entry))
+
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            if entry is not None:
+                return self.respond(name, "stale", thaw(entry))  # Someone is already refreshing it
+            entry = wait_for(key, settings.MICROCACHE_WAIT)
+            if entry is not None:
+                return self.respond(name, "coalesced", thaw(entry))
+            # The renderer is too slow (or gone) - render without caching rather than keep waiting
+            return self.respond(name, "miss", view_func(request, *view_args, **view_kwargs))
+
+        try:
+            response = view_func(request, *view_args, **view_kwargs)
+        except Exception:
+            cache.delete(lock_key)
+            raise
+        if response.status_code != 200 or response.cookies:
+            cache.delete(lock_key)  # Errors and anything setting cookies are per-request
+        elif response.streaming:
+            source = response.streaming_content
+            response.streaming_content = self.store_when_done(response, source, key, lock_key, ttl)
+        else:
+            cache.set(key, freeze(response, response.content, ttl), ttl + settings.MICROCACHE_STALE)
+            cache.delete(lock_key)
+        return self.respond(name, "miss", response)
+
+    @staticmethod
+    def store_when_done(response, source, key, lock_key, ttl):
+        chunks = []
+        try:
+            for chunk in source:
+                chunks.append(chunk)
+                yield chunk
+            cache.set(key, freeze(response, b"".join(chunks), ttl), ttl + settings.MICROCACHE_STALE)
+        finally:
+            cache.delete(lock_key)
+
+    @staticmethod
+    def respond(name, outcome, response):
+        record(name, outcome)
+        response["X-Microcache"] = outcome.upper()
+        return response
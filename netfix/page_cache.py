@@ -0,0 +1,84 @@
+"""
+Shared Page Bodies - catalog pages keep one cached body for every visitor.
+
+The body is rendered without the request, so nothing per-user can end up in it.
+Controls that depend on who is looking carry data-for="company|customer|anonymous"
+and are shown or hidden by the viewer-* class base.html puts on <body>. The
+navbar and that class are the only per-user parts, rendered on every request.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from . import metrics
+from .streaming import MARKER, placeholders, render_streaming, streaming_enabled
+
+VERSION_KEY = "page-body-version:{}"
+
+
+def version(name):
+    """Current version of page `name` (its URL name); every write that changes the page moves it on"""
+    # Versions start from the clock so a lost version key can't bring back an old body
+    return cache.get_or_set(VERSION_KEY.format(name), int(time.time() * 1000), None)
+
+
+def invalidate(*names):
+    """Retires every cached body of the named pages - called from the catalog signals"""
+    for name in names:
+        try:
+            cache.incr(VERSION_KEY.format(name))
+        except ValueError:
+            pass  # Nothing cached for that page yet
+
+
+def body_key(name, params):
+    """Cache key for page `name` with the query `params` that change its body"""
+    digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    return f"page-body:{name}:{version(name)}:{digest}"
+
+
+def render_shared(request, template_name, body_template, context, key=None, **lists):
+    """
+    Renders `template_name` with the shared body as {{ body }}. With a `key` the
+    body comes from the cache when it can and is stored after a miss; `lists`
+    are Rows for the body's stream placeholders, streamed on a miss if enabled.
+    """
+    if key is not None:
+        body = cache.get(key)
+        metrics.CACHE_LOOKUPS.inc(cache="page_body", result="miss" if body is None else "hit")
+        if body is not None:
+            return render(request, template_name, dict(context, body=mark_safe(body)))
+
+    for rows in lists.values():
+        rows.shared = True
+    body = get_template(body_template).render(dict(context, stream=placeholders(lists)))
+
+    placed = {name: rows for name, rows in lists.items() if MARKER.format(name) in body}
+    if placed and streaming_enabled(request):
+        response = render_streaming(request, template_name, dict(context, body=mark_safe(body)), **placed)
+        if key is not None:
+            response.streaming_content = _store_when_done(response.streaming_content, key, body, placed)
+        return response
+
+    body = _fill(body, {name: rows.render(None) for name, rows in placed.items()})
+    if key is not None:
+        cache.set(key, body, settings.PAGE_BODY_CACHE_TIMEOUT)
+    return render(request, template_name, dict(context, body=mark_safe(body)))
+
+
+def _fill(body, rendered):
+    for name, chunks in rendered.items():
+        body = body.replace(MARKER.format(name), "".join(chunks))
+    return body
+
+
+def _store_when_done(chunks, key, body, lists):
+    yield from chunks
+    # Only a body that streamed to the end is complete enough to cache
+    cache.set(key, _fill(body, {name: rows.rendered for name, rows in lists.items()}),
+              settings.PAGE_BODY_CACHE_TIMEOUT)
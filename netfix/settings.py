@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/1.11/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -41,11 +42,13 @@ INSTALLED_APPS = [
 
     # apps created
     'main',
-    'services',
+    'services.apps.ServicesConfig',
     'users'
 ]
 
 MIDDLEWARE = [
+    'netfix.metrics.MetricsMiddleware',  # Outermost, so its latencies include everything below
+    'netfix.throttle.ThrottleMiddleware',  # First, so floods are turned away before sessions/users load
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,16 +56,26 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'netfix.static_pages.StaticPageMiddleware',  # Pre-rendered pages for anonymous visitors, when enabled
+    'netfix.microcache.MicrocacheMiddleware',  # Last, so cached responses still pass through the rest
 ]
 
 ROOT_URLCONF = 'netfix.urls'
 
+# Compiled templates are kept per worker outside DEBUG (or when forced for profiling)
+template_loaders = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG or os.environ.get('NETFIX_CACHED_TEMPLATES') == '1':
+    template_loaders = [('django.template.loaders.cached.Loader', template_loaders)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': template_loaders,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -74,6 +87,63 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'netfix.wsgi.application'
+ASGI_APPLICATION = 'netfix.asgi.application'
+
+# Serve read-only catalog/profile pages as coroutine views (set by netfix/asgi.py)
+ASYNC_READ_VIEWS = os.environ.get('NETFIX_ASYNC_VIEWS') == '1'
+
+# Stream long listing pages: header first, then rows in chunks of STREAM_CHUNK_SIZE
+STREAMING_RENDER = os.environ.get('NETFIX_STREAMING', '1') == '1'
+STREAM_CHUNK_SIZE = 50
+
+# Lifetime of the shared catalog page bodies; writes retire them sooner via netfix/page_cache.py
+PAGE_BODY_CACHE_TIMEOUT = 60
+
+# Microcache for anonymous GETs: URL name -> seconds a response stays fresh (netfix/microcache.py)
+MICROCACHE_TTLS = {
+    'services_list': 2,
+    'most_requested_services': 5,
+}
+# How long an expired copy may still be served while one request re-renders it
+MICROCACHE_STALE = 30
+# How long a request waits for someone else's render of the same page before rendering itself
+MICROCACHE_WAIT = 2.0
+
+# Pre-rendered anonymous category and service pages written to disk by manage.py prerender_pages
+# and kept current on service writes (netfix/static_pages.py)
+STATIC_PAGES = os.environ.get('NETFIX_STATIC_PAGES') == '1'
+STATIC_PAGES_ROOT = os.environ.get('NETFIX_STATIC_PAGES_ROOT', os.path.join(BASE_DIR, 'static_pages'))
+
+# Per-process metric files that /metrics adds up (netfix/metrics.py); empty it on deploy
+METRICS_DIR = os.environ.get('NETFIX_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'netfix-metrics'))
+# Seconds between a worker's writes of its metric file
+METRICS_FLUSH_INTERVAL = 1.0
+
+# JSON access log (netfix/access_log.py): share of requests kept per URL name;
+# 5xx responses and requests slower than ACCESS_LOG_SLOW_SECONDS are always kept
+ACCESS_LOG_DEFAULT_SAMPLE_RATE = 1.0
+ACCESS_LOG_SAMPLE_RATES = {
+    'services_list': 0.1,
+    'most_requested_services': 0.1,
+    'services_autocomplete': 0.01,
+    'metrics': 0,
+}
+ACCESS_LOG_SLOW_SECONDS = 1.0
+
+# The access log is written by a background thread; other loggers keep Django's defaults
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'access': {
+            'class': 'netfix.access_log.BackgroundHandler',
+            'filename': os.environ.get('NETFIX_ACCESS_LOG', os.path.join(BASE_DIR, 'logs', 'access.log')),
+        },
+    },
+    'loggers': {
+        'netfix.access': {'handlers': ['access'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 
 # Database
@@ -87,6 +157,42 @@ DATABASES = {
 }
 
 
+# Caches - local memory by default; point every worker at one shared backend
+# (e.g. memcached) in production so invalidations reach all processes
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('NETFIX_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('NETFIX_CACHE_LOCATION', 'netfix'),
+    }
+}
+
+# Upper bound on how stale catalog facet counts can be in a process that missed an invalidation
+FACET_CACHE_TIMEOUT = 300
+
+# Services held in each process's autocomplete index (newest kept)
+AUTOCOMPLETE_MAX_SERVICES = 50000
+
+
+# Requests older than this are moved to the archive table by archive_requests
+REQUEST_ARCHIVE_AFTER_DAYS = 365
+
+# POST throttling per URL name: (burst size, tokens refilled per minute), per client IP and per user
+THROTTLE_RULES = {
+    'login': (10, 5),
+    'customer_signup': (5, 2),
+    'company_signup': (5, 2),
+    'request_service': (20, 10),
+    'cart': (10, 5),  # Each checkout submits a whole batch of requests
+}
+# Only enable behind a proxy that sets X-Forwarded-For; otherwise clients could pick their own key
+THROTTLE_TRUST_FORWARDED_FOR = os.environ.get('NETFIX_TRUST_FORWARDED_FOR') == '1'
+
+# Load shedding - requests in flight per worker, how long a request may queue for a slot, and the 503's Retry-After
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('NETFIX_MAX_CONCURRENT_REQUESTS', 64))
+CONCURRENCY_QUEUE_TIMEOUT = 0.5
+LOAD_SHED_RETRY_AFTER = 2
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -127,6 +233,24 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+# collectstatic writes content-hashed names plus .gz/.br variants (see netfix/staticfiles.py)
+STATICFILES_STORAGE = 'netfix.staticfiles.CompressedManifestStaticFilesStorage'
+
+# Email - digests are written to files locally; tests switch to the locmem backend
+EMAIL_BACKEND = os.environ.get('NETFIX_EMAIL_BACKEND', 'django.core.mail.backends.filebased.EmailBackend')
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+DEFAULT_FROM_EMAIL = 'NetFix <noreply@netfix.local>'
+
+# Seconds between a company's first pending request and its digest email
+NOTIFICATION_DIGEST_INTERVAL = 15 * 60
+
+# Bearer token for downstream systems reading /services/events/ (staff can always read it)
+EVENT_LOG_TOKEN = os.environ.get('NETFIX_EVENT_LOG_TOKEN', '')
+
+# Working hours (local time) for scheduled service requests
+BOOKING_DAY_START = 8
+BOOKING_DAY_END = 18
 
 # Authentication URLs
 LOGIN_URL = '/register/login/'
@@ -0,0 +1,68 @@
+"""
+Pre-rendered pages served from disk.
+
+With settings.STATIC_PAGES on, services/prerender.py writes the anonymous
+version of every category page and single-service page to
+STATIC_PAGES_ROOT/<url path>/index.html. Service, company and category writes
+queue jobs that rewrite just the affected files (run_worker must be running).
+
+StaticPageMiddleware serves those files to anonymous GET/HEAD requests
+without a query string, so the view never runs. Logged-in visitors get the
+dynamic page, which carries their navbar and request buttons. A front proxy
+can serve the files itself for requests without a session cookie, e.g. with
+nginx: ``try_files /static_pages$uri/index.html @django;``. A missing file
+(not generated yet, or removed with its service) falls through to the view.
+"""
+
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+URL_NAMES = {"index", "services_field"}  # The pages services/prerender.py writes
+
+
+def file_for(path):
+    """The file holding the page for a URL path, or None if the path can't map into the root"""
+    root = os.path.realpath(settings.STATIC_PAGES_ROOT)
+    filename = os.path.realpath(os.path.join(root, path.strip("/"), "index.html"))
+    return filename if filename.startswith(root + os.sep) else None
+
+
+def write(path, content):
+    """Atomically replaces the file for `path` - readers see the old page or the new one, never half"""
+    filename = file_for(path)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(content)
+    os.replace(temporary, filename)
+
+
+def remove(path):
+    filename = file_for(path)
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+class StaticPageMiddleware(MiddlewareMixin):
+    """Goes after AuthenticationMiddleware (it needs request.user) and before MicrocacheMiddleware"""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (not settings.STATIC_PAGES or request.resolver_match.url_name not in URL_NAMES
+                or request.method not in ("GET", "HEAD") or request.GET or request.user.is_authenticated):
+            return None
+        filename = file_for(request.path_info)
+        if filename is None:
+            return None
+        try:
+            with open(filename, "rb") as handle:
+                content = handle.read()
+        except OSError:  # Not generated (yet) - the view renders it
+            return None
+        response = HttpResponse(content)
+        response["X-Static-Page"] = "HIT"
+        return response
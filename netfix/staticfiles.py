@@ -0,0 +1,192 @@
+"""
+Static asset pipeline.
+
+``collectstatic`` writes content-hashed copies of every file (css/style.css ->
+css/style.3f2a9c1b7d4e.css) and, for text assets, pre-compressed ``.gz`` and
+``.br`` siblings - brotli only when the optional ``brotli`` package is
+installed. ``StaticFilesMiddleware`` wraps the WSGI application and serves
+those files straight from STATIC_ROOT, choosing the smallest variant the
+client accepts, so workers never compress per request and hashed files can be
+cached forever by browsers and proxies.
+"""
+
+import gzip
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+from wsgiref.util import FileWrapper
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip variants are still produced
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".txt", ".html", ".json", ".xml", ".map")
+MIN_COMPRESS_SIZE = 256  # Smaller files gain nothing worth the extra request headers
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=60"
+
+# Preferred order when a client accepts several encodings
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+def compress_file(path):
+    """Writes .gz (and .br if available) next to ``path`` when that actually saves bytes"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also pre-compresses text assets at collectstatic time"""
+
+    def stored_name(self, name):
+        # Before collectstatic has run (local development, tests) there is no
+        # manifest - fall back to the plain name instead of failing the page
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        # Originals plus the final hashed names (intermediate passes may have renamed files)
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                compress_file(self.path(name))
+
+
+def _accepted_encodings(header):
+    """
+    Parses Accept-Encoding into (accepted, refused) sets of codings - refused ones had q=0,
+    which rules them out even when "*" accepts everything else
+    """
+    accepted, refused = set(), set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        (accepted if q > 0 else refused).add(coding)
+    return accepted, refused
+
+
+class StaticFile:
+    """One collected file and its pre-compressed variants"""
+
+    def __init__(self, path, immutable):
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type == "application/javascript":
+            self.content_type += "; charset=utf-8"
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        self.variants = {None: self._stat(path)}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                self.variants[encoding] = self._stat(path + suffix)
+
+    @staticmethod
+    def _stat(path):
+        stat = os.stat(path)
+        return path, stat.st_size, f'"{int(stat.st_mtime):x}-{stat.st_size:x}"', formatdate(stat.st_mtime, usegmt=True)
+
+    def choose(self, accept_encoding):
+        accepted, refused = _accepted_encodings(accept_encoding) if accept_encoding else (set(), set())
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding not in refused and (encoding in accepted or "*" in accepted):
+                return encoding, self.variants[encoding]
+        return None, self.variants[None]
+
+
+class StaticFilesMiddleware:
+    """
+    WSGI middleware serving collected static files from STATIC_ROOT.
+    The file index is built once per worker; anything not in it (including
+    every non-static URL) goes straight to the wrapped Django application.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        from django.conf import settings
+
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = self._index() if self.root and os.path.isdir(self.root) else {}
+
+    def _index(self):
+        hashed = set()
+        manifest_path = os.path.join(self.root, ManifestStaticFilesStorage.manifest_name)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                hashed = set(json.load(f).get("paths", {}).values())
+
+        files = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith((".gz", ".br")) or filename == ManifestStaticFilesStorage.manifest_name:
+                    continue
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                files[self.prefix + name] = StaticFile(path, immutable=name in hashed)
+        return files
+
+    def __call__(self, environ, start_response):
+        static_file = self.files.get(environ.get("PATH_INFO", ""))
+        if static_file is None:
+            return self.application(environ, start_response)
+
+        method = environ.get("REQUEST_METHOD", "GET")
+        if method not in ("GET", "HEAD"):
+            start_response("405 Method Not Allowed", [("Allow", "GET, HEAD"), ("Content-Length", "0")])
+            return []
+
+        encoding, (path, size, etag, last_modified) = static_file.choose(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        headers = [
+            ("Cache-Control", static_file.cache_control),
+            ("ETag", etag),
+            ("Last-Modified", last_modified),
+        ]
+        if len(static_file.variants) > 1:
+            headers.append(("Vary", "Accept-Encoding"))
+
+        if environ.get("HTTP_IF_NONE_MATCH") == etag:
+            start_response("304 Not Modified", headers)
+            return []
+
+        headers += [("Content-Type", static_file.content_type), ("Content-Length", str(size))]
+        if encoding:
+            headers.append(("Content-Encoding", encoding))
+        start_response("200 OK", headers)
+        if method == "HEAD":
+            return []
+
+        # The server calls close() on the iterable when it's done, which closes the file
+        file_wrapper = environ.get("wsgi.file_wrapper", FileWrapper)
+        return file_wrapper(open(path, "rb"), 8192)
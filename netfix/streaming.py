@@ -0,0 +1,87 @@
+"""
+Streaming Render - sends the top of a page as soon as it is rendered and its long
+lists a chunk of rows at a time, instead of building the whole page in memory first
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+MARKER = "<!--netfix:stream:{}-->"
+
+
+class Rows:
+    """
+    One list on a streamed page - `rows` is iterated once (pass queryset.iterator()
+    so the database cursor is read in chunks too) and rendered `chunk_size` rows
+    at a time with a partial that loops over `rows`. `last` is extra context for a
+    final empty render, e.g. the load-more button's next_url. Set `csrf` when the
+    rows hold forms - the CSRF cookie has to be issued before the headers go out.
+    Shared rows (see netfix/page_cache.py) render without the request and keep
+    what they rendered so the finished body can be cached.
+    """
+
+    def __init__(self, rows, template, chunk_size=None, last=None, csrf=False):
+        self.rows = rows
+        self.template = template
+        self.chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+        self.last = last
+        self.csrf = csrf
+        self.shared = False
+        self.rendered = []
+
+    def render(self, request):
+        for html in self._render(None if self.shared else request):
+            if self.shared:
+                self.rendered.append(html)
+            yield html
+
+    def _render(self, request):
+        template = get_template(self.template)
+        chunk = []
+        for row in self.rows:
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                yield template.render({"rows": chunk}, request)
+                chunk = []
+        if chunk:
+            yield template.render({"rows": chunk}, request)
+        if self.last:
+            yield template.render(dict(self.last, rows=[]), request)
+
+
+def placeholders(names):
+    """The `stream` template context: a marker to print where each named list goes"""
+    return {name: mark_safe(MARKER.format(name)) for name in names}
+
+
+def streaming_enabled(request):
+    """Stream unless it is switched off in settings or for this request with ?stream=0"""
+    return settings.STREAMING_RENDER and request.GET.get("stream") != "0"
+
+
+def render_streaming(request, template_name, context, **lists):
+    """
+    Renders `template_name` with `stream.<name>` set to a placeholder for each
+    Rows in `lists`, then streams the page: everything before a placeholder,
+    that list's rows chunk by chunk, and so on to the end of the page
+    """
+    markers = {name: MARKER.format(name) for name in lists}
+    page = get_template(template_name).render(dict(context, stream=placeholders(lists)), request)
+    # Lists the template didn't place (e.g. an empty-state branch) are skipped
+    placed = sorted((page.index(marker), name) for name, marker in markers.items() if marker in page)
+    if any(lists[name].csrf for _, name in placed):
+        get_token(request)
+
+    def chunks():
+        start = 0
+        for position, name in placed:
+            yield page[start:position]
+            yield from lists[name].render(request)
+            start = position + len(markers[name])
+        yield page[start:]
+
+    response = StreamingHttpResponse(chunks(), content_type="text/html; charset=utf-8")
+    response["X-Accel-Buffering"] = "no"  # Ask nginx to pass chunks through instead of buffering the page
+    return response
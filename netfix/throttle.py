@@ -0,0 +1,158 @@
+"""
+Request throttling and load shedding.
+
+ThrottleMiddleware sits first in MIDDLEWARE and protects the endpoints named
+in settings.THROTTLE_RULES (login, signups, request_service) against floods
+of POSTs:
+
+- A token bucket per client IP is checked before sessions or users are
+  loaded, so a rejected request costs one cache round-trip and no ORM work.
+- A second bucket per logged-in user is checked in process_view, once
+  AuthenticationMiddleware has identified them, still before the view runs.
+
+Buckets live in the default cache - shared between workers once CACHES points
+at memcached or similar. A bucket is read and written without a lock, so
+concurrent requests can occasionally slip an extra token through; the limit
+is approximate by design.
+
+The middleware also caps requests in flight per worker process
+(MAX_CONCURRENT_REQUESTS). When that many are already running, a new request
+waits up to CONCURRENCY_QUEUE_TIMEOUT seconds for a slot and is otherwise
+shed with 503 + Retry-After instead of queueing behind a locked database.
+A streamed response runs its queries and renders its rows while the server
+iterates the body, so it keeps its slot until the server closes it.
+
+Under ASGI the middleware runs async, so async views aren't funnelled through
+Django's single thread-sensitive executor; the bucket and slot checks run in
+the thread pool.
+"""
+
+import asyncio
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.deprecation import MiddlewareMixin
+
+
+def client_ip(request):
+    """The caller's address; X-Forwarded-For is only honoured behind a trusted proxy"""
+    if settings.THROTTLE_TRUST_FORWARDED_FOR:
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def take_token(key, capacity, per_minute, now=None):
+    """
+    Spends one token from the bucket at `key`, refilling it at per_minute tokens per minute
+    Returns 0 when allowed, otherwise the seconds until a token is available
+    """
+    now = time.time() if now is None else now
+    rate = per_minute / 60.0
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    timeout = math.ceil(capacity / rate) + 1  # A full refill; idle buckets just expire
+    if tokens < 1:
+        cache.set(key, (tokens, now), timeout)
+        return (1 - tokens) / rate
+    cache.set(key, (tokens - 1, now), timeout)
+    return 0
+
+
+def too_many_requests(wait):
+    response = HttpResponse("Too many requests. Please slow down and try again shortly.", status=429,
+                            content_type="text/plain")
+    response["Retry-After"] = str(max(1, math.ceil(wait)))
+    return response
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests; acquire() waits briefly for a slot and reports whether it got one"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self, timeout):
+        return self._slots.acquire(timeout=timeout)
+
+    def release(self):
+        self._slots.release()
+
+
+class ThrottleMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        super().__init__(get_response)  # Async under ASGI when the rest of the chain is
+        self.limiter = ConcurrencyLimiter(settings.MAX_CONCURRENT_REQUESTS)
+
+    def _rule(self, request):
+        if request.method != "POST":
+            return None, None
+        try:
+            name = resolve(request.path_info).url_name
+        except Resolver404:
+            return None, None
+        return name, settings.THROTTLE_RULES.get(name)
+
+    def admit(self, request):
+        """None once the request holds a concurrency slot, otherwise the 429/503 response to send"""
+        name, rule = self._rule(request)
+        if rule:
+            wait = take_token(f"throttle:ip:{name}:{client_ip(request)}", *rule)
+            if wait:
+                return too_many_requests(wait)
+            request.throttle_rule = (name, rule)
+
+        if not self.limiter.acquire(settings.CONCURRENCY_QUEUE_TIMEOUT):
+            response = HttpResponse("The server is busy. Please retry shortly.", status=503,
+                                    content_type="text/plain")
+            response["Retry-After"] = str(settings.LOAD_SHED_RETRY_AFTER)
+            return response
+        return None
+
+    def hold_slot(self, response):
+        if response.streaming:
+            response._resource_closers.append(self.limiter.release)  # Run by response.close() after the last chunk
+        else:
+            self.limiter.release()
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        rejected = self.admit(request)
+        if rejected:
+            return rejected
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.limiter.release()
+            raise
+        return self.hold_slot(response)
+
+    async def __acall__(self, request):
+        # Waiting for a slot blocks, so it runs in the thread pool rather than the thread-sensitive executor
+        rejected = await sync_to_async(self.admit, thread_sensitive=False)(request)
+        if rejected:
+            return rejected
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            self.limiter.release()
+            raise
+        return self.hold_slot(response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        throttled = getattr(request, "throttle_rule", None)
+        if throttled is None or not request.user.is_authenticated:
+            return None
+        name, rule = throttled
+        wait = take_token(f"throttle:user:{name}:{request.user.pk}", *rule)
+        return too_many_requests(wait) if wait else None
@@ -13,18 +13,28 @@ Including another URLconf
     1. Import the include() function: from django.conf.urls import url, include
     2. Add a URL to urlpatterns:  url(r'^blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.conf.urls import url
 from django.contrib import admin
 from django.urls import include, path
 
 from . import views as v
 
+# Profile pages switch to their coroutine versions under ASGI
+_async = settings.ASYNC_READ_VIEWS
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', v.metrics_export, name='metrics'),
     path('', include('main.urls')),
     path('services/', include('services.urls')),
     path('register/', include('users.urls')),
     path('login/', include('users.urls')),
-    path('customer/<slug:name>', v.customer_profile, name='customer_profile'),
-    path('company/<slug:name>', v.company_profile, name='company_profile')
+    path('customer/<slug:name>', v.customer_profile_async if _async else v.customer_profile, name='customer_profile'),
+    path('company/<slug:name>', v.company_profile_async if _async else v.company_profile, name='company_profile'),
+    path('customer/<slug:name>/requests/', v.customer_requests_page, name='customer_requests_page'),
+    path('company/<slug:name>/services/', v.company_services_page, name='company_services_page'),
+    path('company/<slug:name>/requests/', v.company_requests_page, name='company_requests_page'),
+    path('company/<slug:name>/stats/', v.company_stats, name='company_stats'),
+    path('company/<slug:name>/availability/', v.company_availability, name='company_availability'),
 ]
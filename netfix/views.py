@@ -1,36 +1,82 @@
+from datetime import timedelta
+
 from django.shortcuts import render, get_object_or_404
 from django.db import models
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils import timezone
+from django.urls import reverse
 
 from users.models import User, Company, Customer
-from services.models import Service, ServiceRequest
+from services import analytics, archive, booking
+from services.models import ArchivedServiceRequest, Category, Service, ServiceRequest
+from . import metrics
+from .async_utils import async_read_view
+from .pagination import keyset_chain, keyset_page
+from .streaming import Rows, render_streaming, streaming_enabled
+
+SERVICES_PAGE_SIZE = 12  # Services rendered per page on a company profile
+REQUESTS_PAGE_SIZE = 20  # Service requests rendered per page on either profile
 
 
 def home(request):
     return render(request, 'users/home.html', {'user': request.user})
 
 
+def _next_url(name, username, cursor, include_archived=False):
+    if not cursor:
+        return None
+    return f"{reverse(name, args=[username])}?after={cursor}" + ("&history=all" if include_archived else "")
+
+
+def _include_archived(request):
+    """?history=all pages on into archived requests once the recent ones run out"""
+    return request.GET.get('history') == 'all'
+
+
+def _customer_requests(customer, include_archived=False):
+    return archive.history(
+        ServiceRequest.objects.filter(customer=customer).select_related('service__company__user'),
+        ArchivedServiceRequest.objects.filter(customer=customer).select_related('service__company__user'),
+        include_archived,
+    )
+
+
+def _company_requests(company, include_archived=False):
+    return archive.history(
+        ServiceRequest.objects.filter(service__company=company).select_related('customer__user', 'service'),
+        ArchivedServiceRequest.objects.filter(service__company=company).select_related('customer__user', 'service'),
+        include_archived,
+    )
+
+
 def customer_profile(request, name):
     """
     Customer Profile Display - Shows all customer information (except password)
     Shows service requests with correct price calculation (2 hours × 10.50 = 21.00)
+    First page of requests only - the rest load on demand from customer_requests_page
     """
     user = get_object_or_404(User, username=name)
     if hasattr(user, 'customer'):
         customer = user.customer
-        service_requests = ServiceRequest.objects.filter(customer=customer).order_by('-request_date')  # Service requests display
+        include_archived = _include_archived(request)
 
-        # Calculate statistics for customer profile
-        total_spent = sum(request.calculated_cost() for request in service_requests)  # Price calculation
-        unique_companies = service_requests.values('service__company').distinct().count()
-        unique_categories = service_requests.values('service__field').distinct().count()
+        # Totals cover archived requests too, via the archive rollups
+        stats = archive.customer_totals(customer)
+        service_requests, cursor = keyset_chain(
+            _customer_requests(customer, include_archived), 'request_date', size=REQUESTS_PAGE_SIZE
+        )
 
         return render(request, 'users/customer_profile.html', {
             'user': user,
             'customer': customer,
-            'service_requests': service_requests,
-            'total_spent': total_spent,
-            'unique_companies': unique_companies,
-            'unique_categories': unique_categories,
+            'service_requests': service_requests,  # First page of service requests
+            'requests_next_url': _next_url('customer_requests_page', user.username, cursor, include_archived),
+            'include_archived': include_archived,  # Whether the list pages on into archived history
+            'can_review': request.user == user,  # Review links only for the customer themselves
+            'total_requests': stats['total_requests'],
+            'total_spent': stats['total_spent'] or 0,
+            'unique_companies': stats['unique_companies'],
+            'unique_categories': stats['unique_categories'],
         })
     else:
         return render(request, 'users/error.html', {'message': 'User is not a customer'})
@@ -41,42 +87,178 @@ def company_profile(request, name):
     Company Profile Display - Shows all company information (except password)
     Shows services created by company as available services
     Shows customers who have requested their services
+    First page of each list only - the rest load on demand from the partial endpoints
     """
     user = get_object_or_404(User, username=name)
     if hasattr(user, 'company'):
         company = user.company
-        services = Service.objects.filter(company=company).order_by("-date_created")  # Company services display
-
-        # Get service requests for this company's services
-        service_requests = ServiceRequest.objects.filter(
-            service__company=company
-        ).select_related('customer__user', 'service').order_by('-request_date')
+        all_services = Service.objects.filter(company=company)
+        include_archived = _include_archived(request)
 
-        # Calculate additional statistics for enhanced profile
-        avg_price = services.aggregate(avg_price=models.Avg('price_hour'))['avg_price'] or 0
-        unique_categories = services.values('field').distinct().count()
-        total_requests = service_requests.count()
-
-        # Calculate total revenue from requests
-        total_revenue = sum(request.calculated_cost() for request in service_requests)
+        # Calculate statistics for enhanced profile with aggregates instead of Python loops
+        service_stats = all_services.aggregate(
+            service_count=models.Count('id'),
+            avg_price=models.Avg('price_hour'),
+            unique_categories=models.Count('category', distinct=True),
+            latest_service=models.Max('date_created'),
+        )
+        request_stats = archive.company_totals(company)  # Includes archived requests via the rollups
+        total_requests = request_stats['total_requests']
+        total_revenue = request_stats['total_revenue'] or 0
 
         # Calculate average request value
         avg_request_value = total_revenue / total_requests if total_requests > 0 else 0
 
-        # Get unique customers who have requested services
-        unique_customers = service_requests.values('customer').distinct().count()
+        services, services_cursor = keyset_page(all_services, 'date_created', size=SERVICES_PAGE_SIZE)
+        service_requests, requests_cursor = [], None
+        if user == request.user:  # Requests are only shown to the company itself
+            service_requests, requests_cursor = keyset_chain(
+                _company_requests(company, include_archived), 'request_date', size=REQUESTS_PAGE_SIZE
+            )
 
-        return render(request, 'users/company_profile.html', {
+        context = {
             'user': user,  # All company information
             'company': company,  # Company details
-            'services': services,  # Available services
-            'service_requests': service_requests,  # Service requests from customers
-            'avg_price': avg_price,  # Average price per hour
-            'unique_categories': unique_categories,  # Number of different service categories
+            'services': services,  # First page of available services
+            'services_next_url': _next_url('company_services_page', user.username, services_cursor),
+            'service_requests': service_requests,  # First page of service requests from customers
+            'requests_next_url': _next_url('company_requests_page', user.username, requests_cursor, include_archived),
+            'include_archived': include_archived,
+            'service_count': service_stats['service_count'],  # Number of services offered
+            'latest_service': service_stats['latest_service'],  # Date of the newest service
+            'avg_price': service_stats['avg_price'] or 0,  # Average price per hour
+            'unique_categories': service_stats['unique_categories'],  # Number of different service categories
             'total_requests': total_requests,  # Total service requests received
             'total_revenue': total_revenue,  # Total revenue from requests
             'avg_request_value': avg_request_value,  # Average value per request
-            'unique_customers': unique_customers,  # Number of unique customers
-        })
+            'unique_customers': request_stats['unique_customers'],  # Number of unique customers
+            'recent_reviews': company.reviews.select_related('customer__user').order_by('-created_at')[:5],  # Latest reviews
+        }
+        if streaming_enabled(request):
+            # Profile header and stats go out first, then each list's cards as they render
+            return render_streaming(
+                request, 'users/company_profile.html', context,
+                services=Rows(services, 'users/partials/company_services.html',
+                              last={'next_url': context['services_next_url']}),
+                requests=Rows(service_requests, 'users/partials/company_requests.html',
+                              last={'next_url': context['requests_next_url']}, csrf=True),
+            )
+        return render(request, 'users/company_profile.html', context)
     else:
         return render(request, 'users/error.html', {'message': 'User is not a company'})
+
+
+def customer_requests_page(request, name):
+    """Next page of a customer's service requests (HTML fragment for the profile's load-more button)"""
+    customer = get_object_or_404(Customer, user__username=name)
+    include_archived = _include_archived(request)
+    rows, cursor = keyset_chain(
+        _customer_requests(customer, include_archived), 'request_date', request.GET.get('after'), REQUESTS_PAGE_SIZE
+    )
+    return render(request, 'users/partials/customer_requests.html', {
+        'rows': rows,
+        'can_review': request.user == customer.user,
+        'next_url': _next_url('customer_requests_page', name, cursor, include_archived),
+    })
+
+
+def company_services_page(request, name):
+    """Next page of a company's services (HTML fragment for the profile's load-more button)"""
+    company = get_object_or_404(Company, user__username=name)
+    rows, cursor = keyset_page(
+        Service.objects.filter(company=company), 'date_created', request.GET.get('after'), SERVICES_PAGE_SIZE
+    )
+    return render(request, 'users/partials/company_services.html', {
+        'rows': rows,
+        'next_url': _next_url('company_services_page', name, cursor),
+    })
+
+
+def company_requests_page(request, name):
+    """Next page of requests for a company's services - only the company itself may see them"""
+    company = get_object_or_404(Company, user__username=name)
+    if company.user != request.user:
+        raise Http404
+    include_archived = _include_archived(request)
+    rows, cursor = keyset_chain(
+        _company_requests(company, include_archived), 'request_date', request.GET.get('after'), REQUESTS_PAGE_SIZE
+    )
+    return render(request, 'users/partials/company_requests.html', {
+        'rows': rows,
+        'next_url': _next_url('company_requests_page', name, cursor, include_archived),
+    })
+
+
+def company_stats(request, name):
+    """
+    Company Analytics - JSON time series of requests, hours and revenue from the daily buckets
+    Query: start/end (YYYY-MM-DD, default last 30 days), resolution=day|week|month,
+    optional service=<id> or field=<slug>. Only the company itself can read its numbers.
+    """
+    company = get_object_or_404(Company, user__username=name)
+    if company.user != request.user:
+        raise Http404
+
+    filters = {'company': company}
+    try:
+        end = analytics.parse_day(request.GET.get('end'), timezone.localdate())
+        start = analytics.parse_day(request.GET.get('start'), end - timedelta(days=29))
+        if request.GET.get('service'):
+            filters['service_id'] = int(request.GET['service'])
+        if request.GET.get('field'):
+            category = Category.by_slug(request.GET['field'])
+            if category is None:
+                raise ValueError(f"Unknown category '{request.GET['field']}'")
+            filters['category'] = category
+        resolution = request.GET.get('resolution', 'day')
+        points = analytics.series(start, end, resolution, **filters)
+    except (ValueError, KeyError) as error:
+        return JsonResponse({'error': str(error) or 'Invalid query'}, status=400)
+
+    return JsonResponse({
+        'company': name,
+        'resolution': resolution,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': points,
+    })
+
+
+def company_availability(request, name):
+    """
+    Company Availability - JSON free slots within working hours for a week
+    Query: start (YYYY-MM-DD, default today), days (1-31, default 7)
+    """
+    company = get_object_or_404(Company, user__username=name)
+    try:
+        start = analytics.parse_day(request.GET.get('start'), timezone.localdate())
+        days = int(request.GET.get('days', 7))
+        if not 1 <= days <= 31:
+            raise ValueError('days must be between 1 and 31')
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    return JsonResponse({
+        'company': name,
+        'capacity': company.capacity,
+        'days': [
+            {
+                'date': day['date'].isoformat(),
+                'free': [
+                    {'start': slot_start.isoformat(), 'end': slot_end.isoformat(), 'available': available}
+                    for slot_start, slot_end, available in day['free']
+                ],
+            }
+            for day in booking.free_slots(company, start, days)
+        ],
+    })
+
+
+# Async versions of the profile views, routed when serving through netfix/asgi.py
+customer_profile_async = async_read_view(customer_profile)
+company_profile_async = async_read_view(company_profile)
+
+
+def metrics_export(request):
+    """Prometheus scrape endpoint - counters and histograms summed over every worker process"""
+    return HttpResponse(metrics.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -11,6 +11,16 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from netfix.staticfiles import StaticFilesMiddleware
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "netfix.settings")
 
 application = get_wsgi_application()
+
+if os.environ.get("NETFIX_WARMUP") == "1":
+    # Compile templates, build URL resolvers and prime catalog queries before taking traffic
+    from main import warmup
+    warmup.run()
+
+# Hashed, pre-compressed assets from collectstatic are answered before Django sees the request
+application = StaticFilesMiddleware(application)
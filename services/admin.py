@@ -1,13 +1,55 @@
 from django.contrib import admin
 
-from .models import Service, ServiceRequest
+from netfix.pagination import EstimatedCountPaginator
+from .models import ArchivedServiceRequest, Category, Review, Service, ServiceRequest
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug", "company_only")
+    prepopulated_fields = {"slug": ("name",)}
+    search_fields = ("^name",)
 
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "price_hour", "field", "date_created", "company")
+    list_display = ("id", "name", "price_hour", "category", "date_created", "company")
+    list_select_related = ("company__user", "category")  # Related names without a query per row
+    list_filter = ("category",)  # Leads the (category, price_hour) index
+    search_fields = ("^name",)  # Prefix search; also backs request autocompletes
+    autocomplete_fields = ("company",)
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # Skip the second, unfiltered COUNT(*)
 
 
 @admin.register(ServiceRequest)
 class ServiceRequestAdmin(admin.ModelAdmin):
     list_display = ("id", "customer", "service", "address", "hours_needed", "request_date")
+    list_select_related = ("customer__user", "service")
+    list_filter = ("request_date",)  # Indexed date range filter
+    autocomplete_fields = ("customer", "service")
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ArchivedServiceRequest)
+class ArchivedServiceRequestAdmin(admin.ModelAdmin):
+    list_display = ("id", "customer", "service", "hours_needed", "request_date", "archived_at")
+    list_select_related = ("customer__user", "service")
+    raw_id_fields = ("customer", "service")
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ("id", "company", "customer", "stars", "created_at")
+    list_select_related = ("company__user", "customer__user")
+    raw_id_fields = ("service_request", "company", "customer")
+    readonly_fields = ("stars",)  # Star edits go through services.reviews so company totals stay right
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,180 @@
+"""
+Daily request/revenue buckets and the time-series queries built on them.
+
+``record_request()`` bumps the bucket for a new request inside the request's
+transaction (``record_requests()`` does a cart's batch); ``rebuild()`` recomputes
+buckets from raw requests - hot and archived - for a date range (the backfill command). ``series()`` reads buckets at day, week or month
+resolution and fills empty periods with zeros for charting.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import ArchivedServiceRequest, DailyRequestStats, ServiceRequest
+
+RESOLUTIONS = {
+    "day": None,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+MAX_RANGE_DAYS = 3 * 366  # Bounds the work (and response size) of one series query
+
+REQUEST_COST = ExpressionWrapper(
+    F("hours_needed") * F("service__price_hour"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def record_request(service_request):
+    """Adds one request to its service's bucket for the day - call inside the request's transaction"""
+    record_requests([service_request])
+
+
+def record_requests(service_requests):
+    """
+    Adds a batch of requests (a cart checkout) to their buckets with one
+    update per (day, service) - call inside the requests' transaction
+    """
+    buckets = {}
+    for service_request in service_requests:
+        service = service_request.service
+        key = (timezone.localdate(service_request.request_date), service.pk)
+        _, requests, hours, revenue = buckets.get(key, (service, 0, 0, 0))
+        buckets[key] = (
+            service, requests + 1, hours + service_request.hours_needed,
+            revenue + service.price_hour * service_request.hours_needed,
+        )
+    for (day, _), (service, requests, hours, revenue) in buckets.items():
+        _add_to_bucket(day, service, requests, hours, revenue)
+
+
+def _add_to_bucket(day, service, requests, hours, revenue):
+    increments = {
+        "requests": F("requests") + requests,
+        "hours": F("hours") + hours,
+        "revenue": F("revenue") + revenue,
+    }
+    bucket = DailyRequestStats.objects.filter(day=day, service=service)
+    if bucket.update(**increments):
+        return
+    try:
+        with transaction.atomic():  # Savepoint - a concurrent insert of the same bucket wins the race
+            DailyRequestStats.objects.create(
+                day=day, service=service, company_id=service.company_id, category_id=service.category_id,
+                requests=requests, hours=hours, revenue=revenue,
+            )
+    except IntegrityError:
+        bucket.update(**increments)
+
+
+def rebuild(start=None, end=None, batch_days=31):
+    """
+    Recomputes buckets from raw requests between ``start`` and ``end``
+    (inclusive, whole history by default), one transaction per batch of days.
+    Returns the number of bucket rows written.
+    """
+    if start is None or end is None:
+        firsts = [
+            model.objects.order_by("request_date").values_list("request_date", flat=True).first()
+            for model in (ServiceRequest, ArchivedServiceRequest)
+        ]
+        firsts = [first for first in firsts if first is not None]
+        if not firsts:
+            return 0
+        first = min(firsts)
+        start = start or timezone.localdate(first)
+        end = end or timezone.localdate()
+
+    written = 0
+    batch_start = start
+    while batch_start <= end:
+        batch_end = min(end, batch_start + timedelta(days=batch_days - 1))
+        totals = {}
+        for model in (ServiceRequest, ArchivedServiceRequest):  # Archived days still need their buckets
+            rows = (
+                model.objects
+                .annotate(day=TruncDate("request_date"))
+                .filter(day__gte=batch_start, day__lte=batch_end)
+                .values("day", "service", "service__company", "service__category")
+                .annotate(request_count=Count("id"), hour_total=Sum("hours_needed"), revenue_total=Sum(REQUEST_COST))
+                .order_by()
+            )
+            for row in rows:
+                key = (row["day"], row["service"])
+                bucket = totals.setdefault(key, DailyRequestStats(
+                    day=row["day"], service_id=row["service"], company_id=row["service__company"],
+                    category_id=row["service__category"], requests=0, hours=0, revenue=0,
+                ))
+                bucket.requests += row["request_count"]
+                bucket.hours += row["hour_total"]
+                bucket.revenue += row["revenue_total"] or 0
+        buckets = list(totals.values())
+        with transaction.atomic():
+            DailyRequestStats.objects.filter(day__gte=batch_start, day__lte=batch_end).delete()
+            DailyRequestStats.objects.bulk_create(buckets, batch_size=500)
+        written += len(buckets)
+        batch_start = batch_end + timedelta(days=1)
+    return written
+
+
+def _period_start(day, resolution):
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _periods(start, end, resolution):
+    current = _period_start(start, resolution)
+    while current <= end:
+        yield current
+        if resolution == "month":
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if resolution == "week" else 1)
+
+
+def series(start, end, resolution="day", **filters):
+    """
+    Time series of requests/hours/revenue between ``start`` and ``end`` for the
+    buckets matching ``filters`` (e.g. company=..., service_id=..., category=...)
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}'")
+    if end < start or (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f"Range must be between 0 and {MAX_RANGE_DAYS} days")
+
+    buckets = DailyRequestStats.objects.filter(day__gte=start, day__lte=end, **filters)
+    trunc = RESOLUTIONS[resolution]
+    period = trunc("day") if trunc else F("day")
+    rows = (
+        buckets.annotate(period=period)
+        .values("period")
+        .annotate(requests_total=Sum("requests"), hours_total=Sum("hours"), revenue_total=Sum("revenue"))
+        .order_by("period")
+    )
+    totals = {}
+    for row in rows:
+        key = row["period"].date() if hasattr(row["period"], "date") else row["period"]
+        totals[key] = row
+
+    points = []
+    for period_start in _periods(start, end, resolution):
+        row = totals.get(period_start, {})
+        points.append({
+            "period": period_start.isoformat(),
+            "requests": row.get("requests_total") or 0,
+            "hours": row.get("hours_total") or 0,
+            "revenue": str((row.get("revenue_total") or Decimal("0")).quantize(Decimal("0.01"))),
+        })
+    return points
+
+
+def parse_day(value, default):
+    return date.fromisoformat(value) if value else default
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ServicesConfig(AppConfig):
     name = 'services'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - registers cache invalidation receivers
+        from . import warmup  # noqa: F401 - registers the catalog cache warm-up steps
@@ -0,0 +1,113 @@
+"""
+Hot/cold archival of service requests.
+
+``archive_before()`` moves requests older than a cutoff from ServiceRequest
+into ArchivedServiceRequest, one transaction per batch, oldest first. In the
+same transaction each moved request is added to its (customer, service)
+ArchivedRequestRollup, so profile totals (hot aggregates plus rollups) are
+the same before and after a move.
+
+Archived rows are always older than every remaining hot row, so history reads
+page through the hot table first and carry the same cursor into the archive
+(``history()``).
+
+Deleting a hot request cascades to its booking and notification event; both
+are long past by the time a request is old enough to archive.
+"""
+
+import time
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+from .models import ArchivedRequestRollup, ArchivedServiceRequest, Service, ServiceRequest
+
+ARCHIVED_COST = ExpressionWrapper(
+    F("hours") * F("service__price_hour"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+REQUEST_COST = ExpressionWrapper(
+    F("hours_needed") * F("service__price_hour"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def move_batch(cutoff, batch_size=1000):
+    """Archives up to batch_size of the oldest requests before cutoff in one transaction; returns how many"""
+    with transaction.atomic():
+        rows = list(
+            ServiceRequest.objects.filter(request_date__lt=cutoff)
+            .order_by("request_date", "id")
+            .values("id", "customer_id", "service_id", "address", "hours_needed", "request_date")[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedServiceRequest.objects.bulk_create([ArchivedServiceRequest(**row) for row in rows])
+
+        pairs = {}
+        for row in rows:
+            requests, hours = pairs.get((row["customer_id"], row["service_id"]), (0, 0))
+            pairs[row["customer_id"], row["service_id"]] = (requests + 1, hours + row["hours_needed"])
+        for (customer_id, service_id), (requests, hours) in pairs.items():
+            rollup = ArchivedRequestRollup.objects.filter(customer_id=customer_id, service_id=service_id)
+            if not rollup.update(requests=F("requests") + requests, hours=F("hours") + hours):
+                ArchivedRequestRollup.objects.create(
+                    customer_id=customer_id, service_id=service_id, requests=requests, hours=hours
+                )
+
+        ServiceRequest.objects.filter(id__in=[row["id"] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_before(cutoff, batch_size=1000, pause=0.0, progress=None):
+    """Moves every request older than cutoff in batches, sleeping `pause` seconds between them"""
+    moved = 0
+    while True:
+        count = move_batch(cutoff, batch_size)
+        if not count:
+            return moved
+        moved += count
+        if progress:
+            progress(moved)
+        if pause:
+            time.sleep(pause)
+
+
+def history(hot, archived, include_archived):
+    """The querysets a history read pages through, newest first"""
+    return [hot, archived] if include_archived else [hot]
+
+
+def customer_totals(customer):
+    """Request count, spend and distinct companies/categories across hot and archived requests"""
+    hot = ServiceRequest.objects.filter(customer=customer)
+    rolled = ArchivedRequestRollup.objects.filter(customer=customer)
+    hot_stats = hot.aggregate(total_requests=Count("id"), total_spent=Sum(REQUEST_COST))
+    rolled_stats = rolled.aggregate(total_requests=Sum("requests"), total_spent=Sum(ARCHIVED_COST))
+    distinct = Service.objects.filter(
+        Q(id__in=hot.values("service_id")) | Q(id__in=rolled.values("service_id"))
+    ).aggregate(
+        unique_companies=Count("company", distinct=True),
+        unique_categories=Count("category", distinct=True),
+    )
+    return {
+        "total_requests": hot_stats["total_requests"] + (rolled_stats["total_requests"] or 0),
+        "total_spent": (hot_stats["total_spent"] or 0) + (rolled_stats["total_spent"] or 0),
+        **distinct,
+    }
+
+
+def company_totals(company):
+    """Request count, revenue and distinct customers across hot and archived requests"""
+    hot = ServiceRequest.objects.filter(service__company=company)
+    rolled = ArchivedRequestRollup.objects.filter(service__company=company)
+    hot_stats = hot.aggregate(total_requests=Count("id"), total_revenue=Sum(REQUEST_COST))
+    rolled_stats = rolled.aggregate(total_requests=Sum("requests"), total_revenue=Sum(ARCHIVED_COST))
+    customers = (
+        hot.values("customer_id").union(rolled.values("customer_id")).count()  # UNION drops duplicates
+    )
+    return {
+        "total_requests": hot_stats["total_requests"] + (rolled_stats["total_requests"] or 0),
+        "total_revenue": (hot_stats["total_revenue"] or 0) + (rolled_stats["total_revenue"] or 0),
+        "unique_customers": customers,
+    }
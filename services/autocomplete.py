@@ -0,0 +1,159 @@
+"""
+In-process prefix index for service-name autocomplete.
+
+Keys are lowercased name/field prefixes held in one sorted list per match
+kind, so a lookup is a bisect to the first key >= the typed prefix followed by
+a short forward scan of each list - no query per keystroke. Separate lists keep
+a popular field ("plumbing", shared by every plumbing service) from using up
+the scan before the names that start the same way are reached. Each service contributes its full name, every
+later word of its name and its field. The index is loaded lazily on the first
+lookup and then kept current by signals.py: saves and deletes are applied
+once the surrounding transaction commits.
+
+Memory is bounded by AUTOCOMPLETE_MAX_SERVICES (the newest services are kept,
+the oldest evicted first) and by truncating keys to MAX_KEY_LENGTH characters.
+
+Every write bumps a version number in the shared cache. A process that finds
+a version it didn't produce itself (another worker wrote) rebuilds before
+answering.
+"""
+
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Category, Service
+
+VERSION_CACHE_KEY = "services:autocomplete-version"
+MAX_KEY_LENGTH = 48
+SCAN_FACTOR = 20  # Matches examined per kind and requested suggestion before ranking
+
+# Match kinds, best first
+NAME, WORD, FIELD = 0, 1, 2
+KINDS = (NAME, WORD, FIELD)
+
+
+def _keys(name, field):
+    name = " ".join(name.lower().split())[:MAX_KEY_LENGTH]
+    keys = {(name, NAME)}
+    words = name.split(" ")
+    for position in range(1, len(words)):
+        keys.add((" ".join(words[position:]), WORD))
+    keys.add((field.lower()[:MAX_KEY_LENGTH], FIELD))
+    return keys
+
+
+class PrefixIndex:
+    """Sorted (key, service id) tuples per match kind plus an id -> (name, field, keys) table"""
+
+    def __init__(self, max_services):
+        self.max_services = max_services
+        self._lock = threading.RLock()
+        self._entries = {kind: [] for kind in KINDS}
+        self._services = {}
+        self._ids = []  # Sorted ids, oldest first, for eviction
+        self._loaded = False
+        self._version = None
+
+    def __len__(self):
+        return len(self._services)
+
+    def _insert(self, service_id, name, field):
+        keys = _keys(name, field)
+        self._services[service_id] = (name, field, keys)
+        insort(self._ids, service_id)
+        for key, kind in keys:
+            insort(self._entries[kind], (key, service_id))
+
+    def _remove(self, service_id):
+        row = self._services.pop(service_id, None)
+        if row is None:
+            return
+        del self._ids[bisect_left(self._ids, service_id)]
+        for key, kind in row[2]:
+            entries = self._entries[kind]
+            del entries[bisect_left(entries, (key, service_id))]
+
+    def rebuild(self):
+        """Reloads the newest max_services services in one query"""
+        # Read first: a write landing during the query bumps the version past this, forcing another rebuild
+        version = cache.get(VERSION_CACHE_KEY)
+        rows = Service.objects.order_by("-id").values_list("id", "name", "category")[:self.max_services]
+        entries, services = {kind: [] for kind in KINDS}, {}
+        for service_id, name, category_id in rows:
+            field = Category.get_cached(category_id).name
+            keys = _keys(name, field)
+            services[service_id] = (name, field, keys)
+            for key, kind in keys:
+                entries[kind].append((key, service_id))
+        for kind_entries in entries.values():
+            kind_entries.sort()
+        with self._lock:
+            self._entries, self._services = entries, services
+            self._ids = sorted(services)
+            self._loaded = True
+            self._version = version
+
+    def _ensure_current(self):
+        if not self._loaded or cache.get(VERSION_CACHE_KEY) != self._version:
+            self.rebuild()
+
+    def _bump_version(self):
+        cache.add(VERSION_CACHE_KEY, 0)
+        try:
+            version = cache.incr(VERSION_CACHE_KEY)
+        except ValueError:  # Evicted between add and incr
+            return
+        if version == (self._version or 0) + 1:
+            self._version = version  # Only our own write happened since the last sync
+        else:
+            self._loaded = False
+
+    def upsert(self, service_id, name, field):
+        with self._lock:
+            if self._loaded:
+                self._remove(service_id)
+                self._insert(service_id, name, field)
+                while len(self._services) > self.max_services:
+                    self._remove(self._ids[0])
+            self._bump_version()
+
+    def discard(self, service_id):
+        with self._lock:
+            if self._loaded:
+                self._remove(service_id)
+            self._bump_version()
+
+    def reset(self):
+        with self._lock:
+            self._entries, self._services, self._ids = {kind: [] for kind in KINDS}, {}, []
+            self._loaded = False
+
+    def suggest(self, prefix, limit=8):
+        """Up to `limit` [(service id, name, field)], full-name matches first, then words, then fields"""
+        prefix = " ".join(prefix.lower().split())[:MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+        with self._lock:
+            self._ensure_current()
+            best = {}
+            for kind in KINDS:
+                if len(best) >= limit:
+                    break  # Matches of a worse kind would rank below all of these
+                entries = self._entries[kind]
+                position = bisect_left(entries, (prefix,))
+                end = min(len(entries), position + limit * SCAN_FACTOR)
+                while position < end:
+                    key, service_id = entries[position]
+                    if not key.startswith(prefix):
+                        break
+                    if service_id not in best:  # Already matched by a better kind
+                        best[service_id] = (kind, len(key))
+                    position += 1
+            ranked = sorted(best.items(), key=lambda item: (item[1], -item[0]))[:limit]
+            return [(service_id, *self._services[service_id][:2]) for service_id, _ in ranked]
+
+
+index = PrefixIndex(settings.AUTOCOMPLETE_MAX_SERVICES)
@@ -0,0 +1,129 @@
+"""
+Capacity-aware scheduling.
+
+Bookings are stored with indexed (company, start) columns. Because a booking
+lasts at most MAX_BOOKING_HOURS, every booking overlapping a window starts
+within MAX_BOOKING_HOURS before the window's end, so each check is one bounded
+index range scan. A sweep over the start/end events of those bookings gives
+the number of concurrent jobs at every instant, which is compared with the
+company's capacity (conflict checks) or turned into free slots (availability).
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import Company
+from .models import Booking
+
+MAX_BOOKING_HOURS = 12
+
+
+def _overlapping(company_id, start, end):
+    """(start, end) of every booking of the company that overlaps [start, end)"""
+    return list(
+        Booking.objects.filter(
+            company_id=company_id,
+            start__gte=start - timedelta(hours=MAX_BOOKING_HOURS),
+            start__lt=end,
+            end__gt=start,
+        ).values_list("start", "end")
+    )
+
+
+def sweep(intervals, start, end):
+    """
+    Splits [start, end) into consecutive (from, to, concurrent_bookings)
+    segments. Ends sort before starts at the same instant, so back-to-back
+    bookings don't count as overlapping.
+    """
+    events = []
+    for booking_start, booking_end in intervals:
+        events.append((max(booking_start, start), 1))
+        events.append((min(booking_end, end), -1))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    segments, count, cursor = [], 0, start
+    for instant, delta in events:
+        if instant > cursor:
+            segments.append((cursor, instant, count))
+            cursor = instant
+        count += delta
+    if cursor < end:
+        segments.append((cursor, end, count))
+    return segments
+
+
+def _working_window(day):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(day, time(settings.BOOKING_DAY_START)), tz),
+        timezone.make_aware(datetime.combine(day, time(settings.BOOKING_DAY_END)), tz),
+    )
+
+
+def validate_slot(start, hours):
+    """Raises ValidationError unless [start, start + hours) is a bookable slot"""
+    if hours > MAX_BOOKING_HOURS:
+        raise ValidationError(f"Scheduled requests can be at most {MAX_BOOKING_HOURS} hours long.")
+    if start <= timezone.now():
+        raise ValidationError("Please choose a start time in the future.")
+    day_start, day_end = _working_window(timezone.localtime(start).date())
+    if start < day_start or start + timedelta(hours=hours) > day_end:
+        raise ValidationError(
+            f"Bookings must fit within working hours ({settings.BOOKING_DAY_START}:00-{settings.BOOKING_DAY_END}:00)."
+        )
+
+
+def book(service_request, start):
+    """
+    Books [start, start + hours_needed) for the request's company, or raises
+    ValidationError if that would exceed the company's capacity at any point.
+    Call inside the transaction that saves the request.
+    """
+    hours = service_request.hours_needed
+    validate_slot(start, hours)
+    end = start + timedelta(hours=hours)
+    company_id = service_request.service.company_id
+
+    # Take the company's write lock first, so concurrent bookings for the same
+    # company are checked one after another (row lock on PostgreSQL/MySQL,
+    # database write lock on SQLite)
+    Company.objects.filter(pk=company_id).update(capacity=F("capacity"))
+    capacity = Company.objects.values_list("capacity", flat=True).get(pk=company_id)
+
+    busiest = max((count for _, _, count in sweep(_overlapping(company_id, start, end), start, end)), default=0)
+    if busiest >= capacity:
+        raise ValidationError("The company is fully booked at that time. Please pick another slot.")
+
+    return Booking.objects.create(company_id=company_id, service_request=service_request, start=start, end=end)
+
+
+def free_slots(company, first_day, days=7):
+    """
+    Free time per day within working hours as
+    [{"date": day, "free": [(start, end, available_capacity), ...]}, ...]
+    """
+    window_start = _working_window(first_day)[0]
+    window_end = _working_window(first_day + timedelta(days=days - 1))[1]
+    segments = sweep(_overlapping(company.pk, window_start, window_end), window_start, window_end)
+
+    schedule = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        day_start, day_end = _working_window(day)
+        free = []
+        for seg_start, seg_end, count in segments:
+            seg_start, seg_end = max(seg_start, day_start), min(seg_end, day_end)
+            available = company.capacity - count
+            if seg_start >= seg_end or available <= 0:
+                continue
+            if free and free[-1][1] == seg_start and free[-1][2] == available:
+                free[-1] = (free[-1][0], seg_end, available)  # Merge with the previous slot
+            else:
+                free.append((seg_start, seg_end, available))
+        schedule.append({"date": day, "free": free})
+    return schedule
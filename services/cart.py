@@ -0,0 +1,95 @@
+"""
+Multi-service cart.
+
+A customer booking several services for one address collects them in a cart
+kept in their session ({service id: hours}, in the order they were added) and
+submits it once. ``checkout()`` saves every ServiceRequest with a single
+bulk_create in one transaction, then updates the daily analytics buckets,
+digest events, the most requested page and the /metrics counters once for the
+whole batch instead of once per request, and appends the batch to the request
+event log in one insert.
+
+bulk_create skips Model.save() and the post_save signals, so checkout does by
+hand what they do for a single request (geocoding, page invalidation, counters).
+Slot booking stays on the single request form: each booking needs its own
+capacity check against the company's calendar.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+
+from netfix import geo, metrics, page_cache
+from . import analytics, event_log
+from .models import Service, ServiceRequest
+from .notifications import record_request_events
+
+SESSION_KEY = "cart"
+MAX_LINES = 20  # Bounds the size of one checkout batch
+
+
+def _items(request):
+    return request.session.get(SESSION_KEY, {})
+
+
+def add(request, service, hours):
+    """Puts a service in the cart (replacing its hours if already there); False when the cart is full"""
+    items = _items(request)
+    if str(service.pk) not in items and len(items) >= MAX_LINES:
+        return False
+    items[str(service.pk)] = hours
+    request.session[SESSION_KEY] = items
+    return True
+
+
+def remove(request, service_id):
+    items = _items(request)
+    if items.pop(str(service_id), None) is not None:
+        request.session[SESSION_KEY] = items
+
+
+def clear(request):
+    request.session.pop(SESSION_KEY, None)
+
+
+def count(request):
+    return len(_items(request))
+
+
+def lines(request):
+    """[(service, hours), ...] for the cart, dropping services deleted since they were added"""
+    items = _items(request)
+    services = Service.objects.select_related("company__user").in_bulk([int(service_id) for service_id in items])
+    return [(services[int(service_id)], hours) for service_id, hours in items.items() if int(service_id) in services]
+
+
+def checkout(customer, address, cart_lines):
+    """Submits one request per (service, hours) line as a single batch; returns the saved requests"""
+    service_requests = []
+    for service, hours in cart_lines:
+        service_request = ServiceRequest(customer=customer, service=service, address=address, hours_needed=hours)
+        geo.locate(service_request, address)  # What ServiceRequest.save() does for a single request
+        service_requests.append(service_request)
+
+    with transaction.atomic():
+        ServiceRequest.objects.bulk_create(service_requests)
+        if service_requests and service_requests[0].pk is None:
+            # SQLite doesn't hand back the new ids. The transaction holds the database's
+            # write lock, so this customer's newest rows are the batch just inserted
+            ids = ServiceRequest.objects.filter(customer=customer).order_by("-id").values_list("id", flat=True)
+            for service_request, pk in zip(service_requests, sorted(ids[:len(service_requests)])):
+                service_request.pk = pk
+
+        analytics.record_requests(service_requests)  # One update per (day, service) bucket
+        record_request_events(service_requests)  # One insert, at most one digest job
+        event_log.append(service_requests)  # One insert into the downstream feed
+        transaction.on_commit(lambda: page_cache.invalidate("most_requested_services"))
+
+        submitted = Counter(service.field for service, _ in cart_lines)
+
+        def count_submitted():
+            for field, requests in submitted.items():
+                metrics.REQUESTS_SUBMITTED.inc(requests, field=field)
+
+        transaction.on_commit(count_submitted)
+    return service_requests
@@ -0,0 +1,66 @@
+"""
+Append-only log of new service requests for downstream consumers.
+
+Billing and the data warehouse used to poll ServiceRequest for new rows.
+They now read RequestEvent, a sequence-numbered table. ``append()`` writes the
+events inside the transaction that saves the requests, so a request and its
+event commit or roll back together. A cart checkout appends its whole batch
+in one insert, which shares the requests' single commit (and fsync).
+
+Consumers remember the last ``seq`` they processed and ask for what follows
+(``read()``, the /services/events/ endpoint or ``manage.py
+tail_request_events``). Events are never updated or deleted, so a consumer
+that falls behind or restarts picks up exactly where it left off.
+"""
+
+import time
+
+from .models import RequestEvent
+
+MAX_BATCH = 1000  # Events per read
+
+
+def payload(service_request):
+    """The event body - a snapshot of the request as it was submitted"""
+    service = service_request.service
+    return {
+        "id": service_request.pk,
+        "request_date": service_request.request_date.isoformat(),
+        "customer": service_request.customer.user.username,
+        "company": service.company.user.username,
+        "service_id": service.pk,
+        "service": service.name,
+        "field": service.field,
+        "address": service_request.address,
+        "hours": service_request.hours_needed,
+        "price_hour": str(service.price_hour),
+        "cost": str(service.price_hour * service_request.hours_needed),
+    }
+
+
+def append(service_requests):
+    """Logs saved requests - call inside the transaction that created them"""
+    RequestEvent.objects.bulk_create(
+        RequestEvent(request_id=service_request.pk, payload=payload(service_request))
+        for service_request in service_requests
+    )
+
+
+def read(after=0, limit=MAX_BATCH):
+    """Events with seq > `after`, oldest first"""
+    return list(RequestEvent.objects.filter(seq__gt=after).order_by("seq")[:min(limit, MAX_BATCH)])
+
+
+def follow(after=0, poll_interval=1.0, batch=MAX_BATCH):
+    """Yields events after `after` forever, polling when caught up"""
+    while True:
+        events = read(after, batch)
+        yield from events
+        if events:
+            after = events[-1].seq
+        else:
+            time.sleep(poll_interval)
+
+
+def as_dict(event):
+    return {"seq": event.seq, "kind": event.kind, "created_at": event.created_at.isoformat(), "request": event.payload}
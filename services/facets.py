@@ -0,0 +1,169 @@
+"""
+Faceted filtering for the services catalog.
+
+One grouped query counts services per (category, price bucket, company rating)
+combination - at most 11 x 4 x 6 rows however big the catalog is. That
+"cube" is cached and dropped whenever a service or company is written (see
+signals.py). Every facet's counts are then summed from the cube in Python,
+applying the other facets' selections but not its own, so choosing Plumbing
+still shows how many services every other field has.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from netfix import metrics
+from .models import Category, Service
+
+CUBE_CACHE_KEY = "services:facet-cube"
+
+# (key, label, min inclusive, max exclusive)
+PRICE_BUCKETS = [
+    ("under-25", "Under $25", None, 25),
+    ("25-50", "$25 - $50", 25, 50),
+    ("50-100", "$50 - $100", 50, 100),
+    ("100-plus", "$100+", 100, None),
+]
+RATINGS = [4, 3, 2, 1]  # "N stars & up" choices
+
+
+def _price_bucket_expression():
+    whens = []
+    for index, (_, _, low, high) in enumerate(PRICE_BUCKETS):
+        condition = Q()
+        if low is not None:
+            condition &= Q(price_hour__gte=low)
+        if high is not None:
+            condition &= Q(price_hour__lt=high)
+        whens.append(When(condition, then=Value(index)))
+    return Case(*whens, output_field=IntegerField())
+
+
+def _price_filter(key):
+    for bucket_key, _, low, high in PRICE_BUCKETS:
+        if bucket_key == key:
+            condition = Q()
+            if low is not None:
+                condition &= Q(price_hour__gte=low)
+            if high is not None:
+                condition &= Q(price_hour__lt=high)
+            return condition
+    return None
+
+
+def build_cube():
+    """[(category_id, price_bucket_index, rating, count)] - the single grouped query"""
+    rows = (
+        Service.objects.annotate(price_bucket=_price_bucket_expression())
+        .values("category", "price_bucket", "company__rating")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return [(row["category"], row["price_bucket"], row["company__rating"], row["count"]) for row in rows]
+
+
+def get_cube():
+    cube = cache.get(CUBE_CACHE_KEY)
+    metrics.CACHE_LOOKUPS.inc(cache="facets", result="miss" if cube is None else "hit")
+    if cube is None:
+        cube = build_cube()
+        cache.set(CUBE_CACHE_KEY, cube, settings.FACET_CACHE_TIMEOUT)
+    return cube
+
+
+def invalidate():
+    cache.delete(CUBE_CACHE_KEY)
+
+
+def parse_selection(params):
+    """Valid facet selections from the query string: {'field': <category slug>, 'price': ..., 'rating': ...}"""
+    selection = {}
+    category = Category.by_slug(params.get("field", ""))
+    if category is not None and not category.company_only:
+        selection["field"] = category.slug
+    if _price_filter(params.get("price")) is not None:
+        selection["price"] = params["price"]
+    if params.get("rating", "").isdigit() and int(params["rating"]) in RATINGS:
+        selection["rating"] = int(params["rating"])
+    return selection
+
+
+def apply(queryset, selection):
+    """Narrows a Service queryset to the selected facets"""
+    if "field" in selection:
+        queryset = queryset.filter(category=Category.by_slug(selection["field"]))
+    if "price" in selection:
+        queryset = queryset.filter(_price_filter(selection["price"]))
+    if "rating" in selection:
+        queryset = queryset.filter(company__rating__gte=selection["rating"])
+    return queryset
+
+
+def _matches(row, selection, skip):
+    category_id, price_bucket, rating, _ = row
+    if skip != "field" and "field" in selection and category_id != Category.by_slug(selection["field"]).pk:
+        return False
+    if skip != "price" and "price" in selection and PRICE_BUCKETS[price_bucket][0] != selection["price"]:
+        return False
+    if skip != "rating" and "rating" in selection and rating < selection["rating"]:
+        return False
+    return True
+
+
+def counts(selection, cube=None):
+    """Per-facet counts: {'field': {slug: n}, 'price': {key: n}, 'rating': {min: n}, 'total': n}"""
+    cube = get_cube() if cube is None else cube
+    result = {
+        "field": {category.slug: 0 for category in Category.service_categories()},
+        "price": {key: 0 for key, _, _, _ in PRICE_BUCKETS},
+        "rating": {minimum: 0 for minimum in RATINGS},
+        "total": 0,
+    }
+    for row in cube:
+        category_id, price_bucket, rating, count = row
+        if _matches(row, selection, "field"):
+            result["field"][Category.get_cached(category_id).slug] += count
+        if price_bucket is not None and _matches(row, selection, "price"):
+            result["price"][PRICE_BUCKETS[price_bucket][0]] += count
+        if _matches(row, selection, "rating"):
+            for minimum in RATINGS:
+                if rating >= minimum:
+                    result["rating"][minimum] += count
+        if _matches(row, selection, None):
+            result["total"] += count
+    return result
+
+
+def facet_links(selection, params):
+    """Facet options for the template with counts, active state and toggle URLs"""
+    facet_counts = counts(selection)
+
+    def url(name, value):
+        query = params.copy()
+        query.pop("page", None)
+        if selection.get(name) == value:
+            query.pop(name, None)  # Clicking the active option clears it
+        else:
+            query[name] = value
+        encoded = query.urlencode()
+        return f"?{encoded}" if encoded else "?"
+
+    return {
+        "total": facet_counts["total"],
+        "fields": [
+            {"label": category.name, "count": facet_counts["field"][category.slug],
+             "active": selection.get("field") == category.slug, "url": url("field", category.slug)}
+            for category in Category.service_categories()
+        ],
+        "prices": [
+            {"label": label, "count": facet_counts["price"][key], "active": selection.get("price") == key,
+             "url": url("price", key)}
+            for key, label, _, _ in PRICE_BUCKETS
+        ],
+        "ratings": [
+            {"label": f"{minimum}★ & up", "count": facet_counts["rating"][minimum],
+             "active": selection.get("rating") == minimum, "url": url("rating", str(minimum))}
+            for minimum in RATINGS
+        ],
+    }
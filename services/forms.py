@@ -2,7 +2,12 @@ from django import forms
 from django.core.validators import MinValueValidator
 
 from users.models import Company
-from .models import Service, ServiceRequest
+from .models import Category, Review, Service, ServiceRequest
+
+
+def service_category_choices():
+    """(name, name) pairs for every category a service can be created in"""
+    return [(category.name, category.name) for category in Category.service_categories()]
 
 
 class CreateNewService(forms.ModelForm):
@@ -10,6 +15,9 @@ class CreateNewService(forms.ModelForm):
     Service Creation Form - Asks for name, description, price, field
     Example: electricity Company creating service with price 10.50
     """
+    field = forms.ChoiceField(choices=service_category_choices, widget=forms.Select(attrs={  # Service field/category
+        'class': 'form-control'
+    }))
 
     class Meta:
         model = Service
@@ -31,9 +39,6 @@ class CreateNewService(forms.ModelForm):
                 'step': '0.01',
                 'min': '0.01'
             }),
-            'field': forms.Select(attrs={  # Service field/category
-                'class': 'form-control'
-            })
         }
 
     def __init__(self, *args, **kwargs):
@@ -51,7 +56,7 @@ class CreateNewService(forms.ModelForm):
         if self.company:
             if self.company.field_of_work == "All in One":
                 # "All in One" companies can create services in any specific field
-                available_choices = Service.FIELD_CHOICES
+                available_choices = service_category_choices()
             else:
                 # Other companies can only create services in their specific field
                 available_choices = [(self.company.field_of_work, self.company.field_of_work)]
@@ -89,6 +94,8 @@ class CreateNewService(forms.ModelForm):
                         f"You cannot create services in the '{field}' category."
                     )
 
+        if field:
+            self.instance.field = field  # Sets the category before model validation runs
         return cleaned_data
 
     def save(self, commit=True):
@@ -122,6 +129,40 @@ class RequestServiceForm(forms.ModelForm):
             })
         }
 
+    scheduled_start = forms.DateTimeField(  # Optional time slot - checked against the company's capacity
+        required=False,
+        input_formats=['%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S'],
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}, format='%Y-%m-%dT%H:%M'),
+    )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['hours_needed'].validators = [MinValueValidator(1)]  # Hours validation for 2-hour example
+
+
+class CartCheckoutForm(forms.Form):
+    """
+    Cart Checkout Form - One address for every service in the cart
+    """
+    address = forms.CharField(max_length=255, widget=forms.TextInput(attrs={
+        'placeholder': 'Enter your address',
+        'class': 'form-control'
+    }))
+
+
+class ReviewForm(forms.ModelForm):
+    """
+    Review Form - Stars and an optional comment on a completed service request
+    """
+
+    class Meta:
+        model = Review
+        fields = ['stars', 'comment']
+        widgets = {
+            'stars': forms.Select(attrs={'class': 'form-control'}),
+            'comment': forms.Textarea(attrs={
+                'placeholder': 'How did it go?',
+                'class': 'form-control',
+                'rows': 4
+            }),
+        }
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from netfix import pagination
+from services import archive
+from services.models import ArchivedServiceRequest, ServiceRequest
+
+
+class Command(BaseCommand):
+    help = "Moves old service requests into the archive table in batched transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=settings.REQUEST_ARCHIVE_AFTER_DAYS,
+                            help="Archive requests made more than this many days ago")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Requests moved per transaction")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many requests would move")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        if options["dry_run"]:
+            count = ServiceRequest.objects.filter(request_date__lt=cutoff).count()
+            self.stdout.write(f"{count} request{'s' if count != 1 else ''} older than {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        moved = archive.archive_before(
+            cutoff, options["batch_size"], options["pause"],
+            progress=lambda total: self.stdout.write(f"  archived {total}...") if options["verbosity"] > 1 else None,
+        )
+        if moved:
+            # The admin changelists' row estimates would still count the moved requests as hot
+            pagination.refresh_estimates(ServiceRequest, ArchivedServiceRequest)
+        self.stdout.write(f"Archived {moved} request{'s' if moved != 1 else ''} older than {cutoff:%Y-%m-%d}")
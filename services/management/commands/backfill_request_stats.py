@@ -0,0 +1,18 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from services import analytics
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily request/revenue buckets from raw service requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD); default: oldest request")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD); default: today")
+        parser.add_argument("--batch-days", type=int, default=31, help="Days rebuilt per transaction")
+
+    def handle(self, *args, **options):
+        written = analytics.rebuild(options["start"], options["end"], options["batch_days"])
+        self.stdout.write(f"Wrote {written} daily bucket{'s' if written != 1 else ''}")
@@ -0,0 +1,45 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.models import ArchivedServiceRequest, ServiceRequest
+
+COLUMNS = ["id", "request_date", "customer", "company", "service", "field", "hours", "price_hour", "cost", "archived"]
+
+
+class Command(BaseCommand):
+    help = "Writes service requests as CSV, newest first, for one customer or company"
+
+    def add_arguments(self, parser):
+        who = parser.add_mutually_exclusive_group(required=True)
+        who.add_argument("--customer", help="Customer username")
+        who.add_argument("--company", help="Company username")
+        parser.add_argument("--include-archived", action="store_true", help="Also export archived history")
+
+    def handle(self, *args, **options):
+        if options["customer"]:
+            filters = {"customer__user__username": options["customer"]}
+        else:
+            filters = {"service__company__user__username": options["company"]}
+        if not ServiceRequest.objects.filter(**filters).exists() and not ArchivedServiceRequest.objects.filter(**filters).exists():
+            raise CommandError("No requests found for that user")
+
+        sources = [ServiceRequest.objects]
+        if options["include_archived"]:
+            sources.append(ArchivedServiceRequest.objects)  # Entirely older than the hot rows
+
+        writer = csv.writer(self.stdout)
+        writer.writerow(COLUMNS)
+        for source in sources:
+            rows = (
+                source.filter(**filters)
+                .select_related("customer__user", "service__company__user")
+                .order_by("-request_date", "-id")
+            )
+            for row in rows.iterator(chunk_size=2000):
+                writer.writerow([
+                    row.id, row.request_date.isoformat(), row.customer.user.username,
+                    row.service.company.user.username, row.service.name, row.service.field,
+                    row.hours_needed, row.service.price_hour, row.calculated_cost(),
+                    "yes" if source.model is ArchivedServiceRequest else "no",
+                ])
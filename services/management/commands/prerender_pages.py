@@ -0,0 +1,20 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from services import prerender
+
+
+class Command(BaseCommand):
+    help = "Writes every category and service page to STATIC_PAGES_ROOT for anonymous visitors"
+
+    def handle(self, *args, **options):
+        if not settings.STATIC_PAGES:
+            # Without the mode, service writes wouldn't refresh the files and they'd go stale
+            raise CommandError("Static pages are off - set NETFIX_STATIC_PAGES=1")
+        started = time.monotonic()
+        pages = prerender.build_all()
+        self.stdout.write(
+            f"Wrote {pages} pages to {settings.STATIC_PAGES_ROOT} in {time.monotonic() - started:.1f}s"
+        )
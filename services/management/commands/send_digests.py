@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from services.notifications import deliver_digests
+
+
+class Command(BaseCommand):
+    help = "Sends pending service request digests to companies (run from cron or the job worker)"
+
+    def handle(self, *args, **options):
+        stats = deliver_digests()
+        self.stdout.write(
+            f"Sent {stats['emails']} digest(s) covering {stats['events']} request(s) "
+            f"in {stats['seconds']}s ({stats['emails_per_second']} emails/s, "
+            f"{stats['events_per_second']} events/s), {stats['failed']} failed"
+        )
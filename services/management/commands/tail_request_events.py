@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services import event_log
+
+
+class Command(BaseCommand):
+    help = "Writes request events after a sequence number as JSON lines, optionally following new ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--after", type=int, default=0, help="Last sequence number already processed")
+        parser.add_argument("--limit", type=int, help="Stop after this many events")
+        parser.add_argument("--follow", action="store_true", help="Keep polling for new events")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls when caught up")
+
+    def handle(self, *args, **options):
+        if options["after"] < 0:
+            raise CommandError("--after must be >= 0")
+        if options["follow"]:
+            events = event_log.follow(options["after"], options["poll_interval"])
+        else:
+            events = self.backlog(options["after"])
+
+        for written, event in enumerate(events, 1):
+            self.stdout.write(json.dumps(event_log.as_dict(event), separators=(",", ":")))
+            self.stdout.flush()  # Consumers read line by line through a pipe
+            if options["limit"] and written >= options["limit"]:
+                break
+
+    @staticmethod
+    def backlog(after):
+        """Everything committed so far, one batch at a time"""
+        while True:
+            events = event_log.read(after)
+            yield from events
+            if len(events) < event_log.MAX_BATCH:
+                return
+            after = events[-1].seq
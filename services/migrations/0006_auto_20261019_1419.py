@@ -0,0 +1,25 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_auto_20261019_1415'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['company', '-date_created', '-id'], name='services_se_company_a30a6a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['customer', '-request_date', '-id'], name='services_se_custome_a63523_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['service', '-request_date', '-id'], name='services_se_service_fa4ec5_idx'),
+        ),
+    ]
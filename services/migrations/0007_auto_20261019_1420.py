@@ -0,0 +1,40 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('services', '0006_auto_20261019_1419'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRequestStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('field', models.CharField(choices=[('Air Conditioner', 'Air Conditioner'), ('Carpentry', 'Carpentry'), ('Electricity', 'Electricity'), ('Gardening', 'Gardening'), ('Home Machines', 'Home Machines'), ('Housekeeping', 'Housekeeping'), ('Interior Design', 'Interior Design'), ('Locks', 'Locks'), ('Painting', 'Painting'), ('Plumbing', 'Plumbing'), ('Water Heaters', 'Water Heaters')], max_length=30)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('hours', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.company')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.service')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dailyrequeststats',
+            index=models.Index(fields=['company', 'day'], name='services_da_company_b4c9e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyrequeststats',
+            index=models.Index(fields=['field', 'day'], name='services_da_field_6b3cfb_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrequeststats',
+            constraint=models.UniqueConstraint(fields=('day', 'service'), name='unique_daily_stats_per_service'),
+        ),
+    ]
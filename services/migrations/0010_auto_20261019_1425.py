@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0009_auto_20261019_1424'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['field', 'price_hour'], name='services_se_field_771870_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0010_auto_20261019_1425'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['request_date'], name='services_se_request_8e2012_idx'),
+        ),
+    ]
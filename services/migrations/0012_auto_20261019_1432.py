@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_auto_20261019_1430'),
+        ('services', '0011_auto_20261019_1430'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedServiceRequest',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('address', models.CharField(max_length=255)),
+                ('hours_needed', models.PositiveIntegerField()),
+                ('request_date', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_requests', to='users.customer')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_requests', to='services.service')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedRequestRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('hours', models.PositiveIntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.customer')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.service')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedservicerequest',
+            index=models.Index(fields=['customer', '-request_date', '-id'], name='services_ar_custome_2b0303_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedservicerequest',
+            index=models.Index(fields=['service', '-request_date', '-id'], name='services_ar_service_b0a06b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedrequestrollup',
+            constraint=models.UniqueConstraint(fields=('customer', 'service'), name='unique_archive_rollup_pair'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0012_auto_20261019_1432'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=70, unique=True)),
+                ('slug', models.SlugField(max_length=70, unique=True)),
+                ('company_only', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name_plural': 'categories',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='dailyrequeststats',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='services.category'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='services.category'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:35
+
+from django.db import migrations, transaction
+from django.utils.text import slugify
+
+# The choice lists Service.field and Company.field_of_work were restricted to
+CATEGORIES = [
+    "Air Conditioner", "All in One", "Carpentry", "Electricity", "Gardening", "Home Machines",
+    "Housekeeping", "Interior Design", "Locks", "Painting", "Plumbing", "Water Heaters",
+]
+BATCH_SIZE = 2000
+
+
+def backfill(model, source_field, category_ids):
+    """Sets category_id from the text column one primary-key range at a time, each in its own transaction"""
+    last = None
+    while True:
+        pending = model.objects.order_by("pk")
+        if last is not None:
+            pending = pending.filter(pk__gt=last)
+        batch = list(pending.values_list("pk", flat=True)[:BATCH_SIZE])
+        if not batch:
+            return
+        with transaction.atomic():
+            for name, category_id in category_ids.items():
+                model.objects.filter(
+                    pk__gte=batch[0], pk__lte=batch[-1], category__isnull=True, **{source_field: name}
+                ).update(category_id=category_id)
+        last = batch[-1]
+
+
+def forwards(apps, schema_editor):
+    Category = apps.get_model("services", "Category")
+    for name in CATEGORIES:
+        Category.objects.get_or_create(name=name, defaults={"slug": slugify(name), "company_only": name == "All in One"})
+    category_ids = dict(Category.objects.values_list("name", "id"))
+    backfill(apps.get_model("services", "Service"), "field", category_ids)
+    backfill(apps.get_model("services", "DailyRequestStats"), "field", category_ids)
+
+
+def backwards(apps, schema_editor):
+    for model_name in ("Service", "DailyRequestStats"):
+        model = apps.get_model("services", model_name)
+        for category in apps.get_model("services", "Category").objects.all():
+            model.objects.filter(category=category).update(field=category.name)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Each backfill batch commits on its own
+
+    dependencies = [
+        ('services', '0013_auto_20261019_1435'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0014_auto_20261019_1435'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dailyrequeststats',
+            name='services_da_field_6b3cfb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='service',
+            name='services_se_field_771870_idx',
+        ),
+        # A default lets the text columns be re-added (then refilled) if this is reversed
+        migrations.AlterField(
+            model_name='dailyrequeststats',
+            name='field',
+            field=models.CharField(default='', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='service',
+            name='field',
+            field=models.CharField(default='', max_length=30),
+        ),
+        migrations.RemoveField(
+            model_name='dailyrequeststats',
+            name='field',
+        ),
+        migrations.RemoveField(
+            model_name='service',
+            name='field',
+        ),
+        migrations.AlterField(
+            model_name='dailyrequeststats',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='services.category'),
+        ),
+        migrations.AlterField(
+            model_name='service',
+            name='category',
+            field=models.ForeignKey(limit_choices_to={'company_only': False}, on_delete=django.db.models.deletion.PROTECT, to='services.category'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyrequeststats',
+            index=models.Index(fields=['category', 'day'], name='services_da_categor_ac417d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['category', 'price_hour'], name='services_se_categor_610199_idx'),
+        ),
+    ]
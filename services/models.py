@@ -1,36 +1,85 @@
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.db import models
+from netfix import geo
 from users.models import Company, Customer
 
+class Category(models.Model):
+    """
+    Service Categories - The service fields plus "All in One", which is a company type only
+    Services and companies point here by integer key; the slug routes /services/<slug>/
+    """
+    name = models.CharField(max_length=70, unique=True)
+    slug = models.SlugField(max_length=70, unique=True)
+    company_only = models.BooleanField(default=False)  # True for "All in One" - never a service's category
+
+    _by_id = {}  # Process-wide id -> Category cache; the table is tiny and rarely changes
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name_plural = "categories"
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def cached(cls, refresh=False):
+        """All categories by id, loaded once per process (reloaded on refresh or a miss)"""
+        if refresh or not cls._by_id:
+            cls._by_id = {category.pk: category for category in cls.objects.all()}
+        return cls._by_id
+
+    @classmethod
+    def get_cached(cls, pk):
+        category = cls.cached().get(pk)
+        return category if category is not None else cls.cached(refresh=True).get(pk)
+
+    @classmethod
+    def by_name(cls, name):
+        for refresh in (False, True):
+            for category in cls.cached(refresh).values():
+                if category.name == name:
+                    return category
+        raise cls.DoesNotExist(f"Unknown category '{name}'")
+
+    @classmethod
+    def by_slug(cls, slug):
+        """The category for a URL slug, or None"""
+        return next((c for c in cls.cached().values() if c.slug == slug), None)
+
+    @classmethod
+    def service_categories(cls):
+        """Categories a service can be created in, by name"""
+        return sorted((c for c in cls.cached().values() if not c.company_only), key=lambda c: c.name)
+
+
 class Service(models.Model):
     """
     Service Creation & Display - Asks for name, description, price, field
     Displays name, description, field, price per hour, date created, company name
     """
-    FIELD_CHOICES = [
-        # Service categories matching company field restrictions
-        # Note: "All in One" excluded - services must have specific categories
-        ("Air Conditioner", "Air Conditioner"),
-        ("Carpentry", "Carpentry"),
-        ("Electricity", "Electricity"),
-        ("Gardening", "Gardening"),
-        ("Home Machines", "Home Machines"),
-        ("Housekeeping", "Housekeeping"),
-        ("Interior Design", "Interior Design"),
-        ("Locks", "Locks"),
-        ("Painting", "Painting"),
-        ("Plumbing", "Plumbing"),
-        ("Water Heaters", "Water Heaters"),
-    ]
-
     company = models.ForeignKey(Company, on_delete=models.CASCADE)  # Company association
     name = models.CharField(max_length=40)  # Service name
     description = models.TextField()  # Service description
     price_hour = models.DecimalField(decimal_places=2, max_digits=8, validators=[MinValueValidator(0.00)])  # Price field
-    field = models.CharField(max_length=30, choices=FIELD_CHOICES)  # Service field/category
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, limit_choices_to={"company_only": False})  # Service field/category
     date_created = models.DateTimeField(auto_now_add=True)  # Date created for display
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "-date_created", "-id"]),  # Company profile pages, newest first
+            models.Index(fields=["category", "price_hour"]),  # Catalog facet filters and category pages
+        ]
+
+    @property
+    def field(self):
+        """Category name, from the per-process category cache (no query)"""
+        return Category.get_cached(self.category_id).name if self.category_id else None
+
+    @field.setter
+    def field(self, name):
+        self.category = Category.by_name(name)
+
     def clean(self):
         """
         All in One Company Service Creation Rules:
@@ -77,7 +126,174 @@ class ServiceRequest(models.Model):
     address = models.CharField(max_length=255)  # Address field
     hours_needed = models.PositiveIntegerField()  # Service time in hours
     request_date = models.DateTimeField(auto_now_add=True)  # Request tracking
+    latitude = models.FloatField(null=True, blank=True)  # Geocoded from address when it names a known place
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True)  # Set by the company; opens the request to a review
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["request_date"]),  # Admin date filters and archival sweeps
+            models.Index(fields=["customer", "-request_date", "-id"]),  # Customer profile pages
+            models.Index(fields=["service", "-request_date", "-id"]),  # Company profile pages (per service)
+        ]
+
+    def save(self, *args, **kwargs):
+        """Geocode the address from the offline gazetteer"""
+        geo.locate(self, self.address)
+        super().save(*args, **kwargs)
 
     def calculated_cost(self):
         """Price Calculation - Shows correct calculation: 2 hours × 10.50 = 21.00"""
         return self.service.price_hour * self.hours_needed  # Automatic cost calculation
+
+
+class Review(models.Model):
+    """
+    Customer Reviews - 1 to 5 stars and a comment on a completed service request
+    The company's rating columns are kept in step by services/reviews.py, never recomputed from this table
+    """
+    STAR_CHOICES = [(stars, f"{stars} star{'s' if stars > 1 else ''}") for stars in range(1, 6)]
+
+    service_request = models.OneToOneField(
+        ServiceRequest, on_delete=models.SET_NULL, null=True, blank=True  # Survives request archival
+    )
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="reviews")
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="reviews")
+    stars = models.PositiveSmallIntegerField(choices=STAR_CHOICES)
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "-created_at"]),  # Latest reviews on the company profile
+        ]
+
+
+class ArchivedServiceRequest(models.Model):
+    """
+    Request Archive - Service requests older than REQUEST_ARCHIVE_AFTER_DAYS, moved out of the hot table
+    by the archive_requests command. Keeps the original id so cursors and links stay valid.
+    """
+    id = models.IntegerField(primary_key=True)  # Same id the request had in ServiceRequest
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="archived_requests")
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="archived_requests")
+    address = models.CharField(max_length=255)
+    hours_needed = models.PositiveIntegerField()
+    request_date = models.DateTimeField()  # Copied, not auto_now_add
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["customer", "-request_date", "-id"]),  # Customer history pages
+            models.Index(fields=["service", "-request_date", "-id"]),  # Company history pages
+        ]
+
+    is_archived = True  # Lets shared templates label history rows
+
+    def calculated_cost(self):
+        """Price Calculation - Same as ServiceRequest.calculated_cost"""
+        return self.service.price_hour * self.hours_needed
+
+
+class ArchivedRequestRollup(models.Model):
+    """
+    Archive Totals - Requests and hours per (customer, service) pair that have been archived
+    Profile totals add these to the hot-table aggregates, so archiving never changes them.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    requests = models.PositiveIntegerField(default=0)
+    hours = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["customer", "service"], name="unique_archive_rollup_pair"),
+        ]
+
+
+class NotificationEvent(models.Model):
+    """
+    Company Notifications - One row per new ServiceRequest, recorded in the same
+    transaction as the request and delivered later as a per-company digest email
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)  # Company to notify
+    service_request = models.ForeignKey(ServiceRequest, on_delete=models.CASCADE)  # Request that triggered it
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)  # Set once included in a sent digest
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["delivered_at", "company"]),  # Pending events grouped by company
+        ]
+
+
+class DailyRequestStats(models.Model):
+    """
+    Request Analytics - Requests, hours and revenue per service per day
+    Updated as requests are created (and rebuilt by backfill_request_stats), so
+    company charts read a few hundred bucket rows instead of raw request history.
+    Company and category are denormalized so per-company and per-category series need no join.
+    """
+    day = models.DateField()
+    service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.PROTECT)
+    requests = models.PositiveIntegerField(default=0)
+    hours = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "service"], name="unique_daily_stats_per_service"),
+        ]
+        indexes = [
+            models.Index(fields=["company", "day"]),  # Company time series
+            models.Index(fields=["category", "day"]),  # Category time series
+        ]
+
+    @property
+    def field(self):
+        return Category.get_cached(self.category_id).name if self.category_id else None
+
+    @field.setter
+    def field(self, name):
+        self.category = Category.by_name(name)
+
+
+class Booking(models.Model):
+    """
+    Scheduled Service Requests - The time slot a request occupies in its company's calendar
+    A company can run up to Company.capacity bookings at the same time
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)  # Denormalized from the service for the index
+    service_request = models.OneToOneField(ServiceRequest, on_delete=models.CASCADE)
+    start = models.DateTimeField()
+    end = models.DateTimeField()  # start + hours_needed
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "start"]),  # Overlap and availability range scans
+        ]
+
+
+class RequestEvent(models.Model):
+    """
+    Request Event Log - Append-only feed of new ServiceRequests for downstream systems (billing, warehouse)
+    Written in the request's transaction, so an event exists exactly when its request committed.
+    Readers resume after the last seq they saw. The payload is a snapshot and request_id is not a
+    foreign key, so archiving or deleting the request never rewrites the log.
+    """
+    CREATED = "request.created"
+
+    seq = models.BigAutoField(primary_key=True)  # Cursor - SQLite serializes writers, so it grows in commit order
+    kind = models.CharField(max_length=40, default=CREATED)
+    request_id = models.PositiveIntegerField()
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Request events are append-only")
+        super().save(*args, **kwargs)
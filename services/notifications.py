@@ -0,0 +1,124 @@
+"""
+Batched digest notifications to companies.
+
+``record_request_event()`` runs inside the request_service transaction: it
+stores a NotificationEvent and makes sure one digest job is scheduled for the
+next delivery window. ``deliver_digests()`` (run by that job or by
+``manage.py send_digests``) sends one email per company covering every pending
+event, over a single backend connection, and marks the events delivered.
+
+A request can see the digest job still queued, skip scheduling, and commit its
+event only after that job has listed the companies to mail. So a run that
+finds events it didn't cover when it finishes schedules the next one itself.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from main import jobs
+from main.models import Job
+from .models import NotificationEvent
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TASK = "services.send_request_digests"
+MAX_REQUESTS_PER_EMAIL = 50  # Longer digests link to the profile for the rest
+
+
+def record_request_event(service_request):
+    """Stores the event and schedules a digest run unless one is already pending"""
+    record_request_events([service_request])
+
+
+def record_request_events(service_requests):
+    """Stores one event per request in a single insert and schedules at most one digest run"""
+    NotificationEvent.objects.bulk_create(
+        NotificationEvent(company_id=service_request.service.company_id, service_request=service_request)
+        for service_request in service_requests
+    )
+    schedule_digest()
+
+
+def schedule_digest():
+    """Queues a digest run for the next delivery window unless one is already waiting"""
+    if not Job.objects.filter(task=DIGEST_TASK, status=Job.QUEUED).exists():
+        jobs.enqueue(
+            DIGEST_TASK,
+            run_at=timezone.now() + timedelta(seconds=settings.NOTIFICATION_DIGEST_INTERVAL),
+        )
+
+
+def _build_digest(company, events):
+    requests = [event.service_request for event in events]
+    context = {
+        "company": company,
+        "requests": requests[:MAX_REQUESTS_PER_EMAIL],
+        "total": len(requests),
+        "remaining": max(0, len(requests) - MAX_REQUESTS_PER_EMAIL),
+    }
+    subject = f"NetFix: {len(requests)} new service request{'s' if len(requests) != 1 else ''}"
+    body = render_to_string("services/emails/request_digest.txt", context)
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [company.user.email])
+
+
+def deliver_digests(connection=None):
+    """
+    Sends one digest per company with pending events. Each company is handled
+    in its own transaction, so a failed send leaves its events pending for the
+    next run (at-least-once delivery) - the digest job then fails, so the queue
+    retries it with backoff. Returns delivery metrics.
+    """
+    started = time.perf_counter()
+    stats = {"companies": 0, "events": 0, "emails": 0, "failed": 0}
+    failed = []
+
+    pending = NotificationEvent.objects.filter(delivered_at__isnull=True)
+    company_ids = list(pending.values_list("company_id", flat=True).distinct().order_by("company_id"))
+
+    connection = connection or get_connection()
+    connection.open()
+    try:
+        for company_id in company_ids:
+            try:
+                with transaction.atomic():
+                    events = list(
+                        pending.filter(company_id=company_id)
+                        .select_related("company__user", "service_request__customer__user", "service_request__service")
+                        .order_by("id")
+                    )
+                    if not events:
+                        continue
+                    sent = connection.send_messages([_build_digest(events[0].company, events)])
+                    if not sent:
+                        raise RuntimeError("email backend did not accept the digest")
+                    NotificationEvent.objects.filter(id__in=[event.id for event in events]).update(
+                        delivered_at=timezone.now()
+                    )
+            except Exception:
+                stats["failed"] += 1
+                failed.append(company_id)
+                logger.exception("Digest delivery failed for company %s", company_id)
+                continue
+            stats["companies"] += 1
+            stats["events"] += len(events)
+            stats["emails"] += sent
+    finally:
+        connection.close()
+
+    # Events committed after the company list was read; failed companies are retried with the job
+    if pending.exclude(company_id__in=failed).exists():
+        schedule_digest()
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 4)
+    stats["emails_per_second"] = round(stats["emails"] / elapsed, 1) if elapsed else 0.0
+    stats["events_per_second"] = round(stats["events"] / elapsed, 1) if elapsed else 0.0
+    logger.info("Digest run: %s", stats)
+    return stats
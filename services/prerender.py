@@ -0,0 +1,154 @@
+"""
+Pre-rendered category and service pages (served by netfix/static_pages.py).
+
+``build_all()`` (``manage.py prerender_pages``) writes every page. After that,
+service, company and category writes queue the pages that show the changed
+rows on the job queue (main/jobs.py), in the write's own transaction:
+
+- the service's own page (its file is removed as soon as a delete commits)
+- its category page - the old and the new one when it moved
+- the company's other service pages ("More services from ...", rating)
+- every page in the category, but only when the service is one of the
+  newest there - those are listed under "Related services" on all of them
+
+The request only inserts a few jobs. Whole companies and categories are
+queued as one fan-out job, and a worker expands that into one job per page.
+A page that already has a job waiting isn't queued again, so a burst of
+writes renders each page once. Until a worker gets to a page the old file is
+served. A page that fails to render is removed, so the view serves it
+instead of a stale copy.
+"""
+
+import logging
+import os
+import shutil
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest
+from django.template.loader import render_to_string
+
+from main import jobs
+from main.models import Job
+from netfix import static_pages
+from .models import Category, Service
+from .views import field_page_context, service_page_context
+
+logger = logging.getLogger(__name__)
+
+RELATED_WINDOW = 4  # Pages list the 3 newest other services in their category, so the 4 newest can appear
+PAGE_TASK = "services.prerender_page"  # Payload {"page": "service" | "category", "id": ...}
+FAN_OUT_TASK = "services.prerender_pages_for"  # Payload {"company": id} or {"category": id}
+
+
+def service_path(service_id):
+    return f"/services/{service_id}"
+
+
+def category_path(category):
+    return category_path_for(category.slug)
+
+
+def category_path_for(slug):
+    return f"/services/{slug}/"
+
+
+def _services():
+    return Service.objects.select_related("company__user")
+
+
+def _anonymous_request(path):
+    request = HttpRequest()
+    request.method = "GET"
+    request.path = request.path_info = path
+    request.user = AnonymousUser()
+    return request
+
+
+def _write(path, template_name, context):
+    try:
+        content = render_to_string(template_name, context, _anonymous_request(path))
+    except Exception:
+        logger.exception("Pre-rendering %s failed", path)
+        static_pages.remove(path)
+    else:
+        static_pages.write(path, content.encode())
+
+
+def render_service(service):
+    _write(service_path(service.pk), "services/single_service.html", service_page_context(service))
+
+
+def render_category(category):
+    _write(category_path(category), "services/field.html", field_page_context(category))
+
+
+def build_all():
+    """Writes every category and service page from scratch; returns the number of pages"""
+    shutil.rmtree(settings.STATIC_PAGES_ROOT, ignore_errors=True)  # Drops pages of deleted services
+    os.makedirs(settings.STATIC_PAGES_ROOT, exist_ok=True)
+    pages = 0
+    for category in Category.service_categories():
+        render_category(category)
+        pages += 1
+    for service in _services().iterator(chunk_size=500):
+        render_service(service)
+        pages += 1
+    return pages
+
+
+def _queue(task, payload):
+    """Enqueues a job unless an identical one is still waiting - call inside the write's transaction"""
+    if not Job.objects.filter(task=task, status=Job.QUEUED, payload=payload).exists():
+        jobs.enqueue(task, payload)
+
+
+def queue_page(page, object_id):
+    _queue(PAGE_TASK, {"page": page, "id": object_id})
+
+
+def render_page(page, id):
+    """Writes one page from the current rows (PAGE_TASK)"""
+    if page == "service":
+        service = _services().filter(pk=id).first()
+        if service is None:
+            static_pages.remove(service_path(id))
+        else:
+            render_service(service)
+    else:
+        category = Category.objects.filter(pk=id).first()  # Not the per-process cache - a rename may be newer
+        if category is not None and category.company_only:
+            static_pages.remove(category_path(category))  # service_field 404s these
+        elif category is not None:
+            render_category(category)
+
+
+def fan_out(company=None, category=None):
+    """Queues one page job per service of a company or category, plus the category pages (FAN_OUT_TASK)"""
+    services = Service.objects.filter(company_id=company) if company else Service.objects.filter(category_id=category)
+    rows = list(services.values_list("pk", "category_id"))
+    for category_id in {category_id for _, category_id in rows} | ({category} if category else set()):
+        queue_page("category", category_id)
+    for service_id, _ in rows:
+        queue_page("service", service_id)
+
+
+def service_changed(service_id, company_id, category_ids, date_created):
+    """Queues the pages affected by creating, editing or deleting one service"""
+    queue_page("service", service_id)
+    _queue(FAN_OUT_TASK, {"company": company_id})
+    for category_id in category_ids:
+        queue_page("category", category_id)
+        newer = Service.objects.filter(category_id=category_id, date_created__gt=date_created).exclude(pk=service_id)
+        if newer.count() < RELATED_WINDOW:
+            _queue(FAN_OUT_TASK, {"category": category_id})
+
+
+def company_changed(company_id):
+    """Queues the company's service pages and the category pages its services appear on"""
+    _queue(FAN_OUT_TASK, {"company": company_id})
+
+
+def category_changed(category_id):
+    """Queues the category page and its service pages, which show the category's name"""
+    _queue(FAN_OUT_TASK, {"category": category_id})
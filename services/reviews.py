@@ -0,0 +1,91 @@
+"""
+Customer reviews and the running company rating.
+
+Each company carries rating_sum / rating_count plus the derived
+rating_average (indexed, for sorting) and the whole-star ``rating`` the
+templates and catalog facets show. Reviews never get re-aggregated on read:
+creating, editing or deleting one applies a delta to those columns with
+UPDATE ... SET col = col + delta, in the same transaction as the review
+write, so concurrent reviews can't lose each other's stars.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import ExpressionWrapper, F, FloatField, IntegerField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from netfix import page_cache
+from users.models import Company
+from . import facets, prerender
+from .models import Review, ServiceRequest
+
+
+def apply_rating_delta(company_id, stars_delta, count_delta):
+    """Moves the company's running totals and recomputes the derived columns from them"""
+    with transaction.atomic():
+        Company.objects.filter(pk=company_id).update(
+            rating_sum=F("rating_sum") + stars_delta,
+            rating_count=F("rating_count") + count_delta,
+        )
+        Company.objects.filter(pk=company_id, rating_count__gt=0).update(
+            rating_average=ExpressionWrapper(
+                Cast("rating_sum", FloatField()) / F("rating_count"), output_field=FloatField()
+            ),
+            rating=ExpressionWrapper(  # Whole stars, rounded half up in integer arithmetic
+                (F("rating_sum") * 2 + F("rating_count")) / (F("rating_count") * 2), output_field=IntegerField()
+            ),
+        )
+        Company.objects.filter(pk=company_id, rating_count=0).update(rating_average=0, rating=0)
+        transaction.on_commit(facets.invalidate)  # Bulk updates fire no signals; rating facet counts moved
+        transaction.on_commit(lambda: page_cache.invalidate("services_list"))  # ?sort=rating order moved too
+        if settings.STATIC_PAGES:
+            prerender.company_changed(company_id)  # Service pages show the rating
+
+
+def complete(service_request):
+    """Marks a request complete (once); returns whether this call did it"""
+    done = ServiceRequest.objects.filter(pk=service_request.pk, completed_at__isnull=True).update(
+        completed_at=timezone.now()
+    )
+    service_request.refresh_from_db(fields=["completed_at"])
+    return bool(done)
+
+
+def submit(service_request, stars, comment=""):
+    """Creates or edits the customer's review of a completed request; returns (review, created)"""
+    if service_request.completed_at is None:
+        raise ValidationError("You can review a request once the company has marked it complete.")
+    company_id = service_request.service.company_id
+
+    with transaction.atomic():
+        while True:
+            review = Review.objects.filter(service_request=service_request).first()
+            if review is None:
+                try:
+                    with transaction.atomic():  # Savepoint - a concurrent first review wins the race
+                        review = Review.objects.create(
+                            service_request=service_request, company_id=company_id,
+                            customer_id=service_request.customer_id, stars=stars, comment=comment,
+                        )
+                except IntegrityError:
+                    continue  # Edit the review that won instead
+                apply_rating_delta(company_id, stars, 1)
+                return review, True
+
+            # Compare-and-set on the old star count, so two edits can't both apply a delta from the same base
+            previous = review.stars
+            updated_at = timezone.now()
+            if Review.objects.filter(pk=review.pk, stars=previous).update(
+                stars=stars, comment=comment, updated_at=updated_at
+            ):
+                apply_rating_delta(company_id, stars - previous, 0)
+                review.stars, review.comment, review.updated_at = stars, comment, updated_at
+                return review, False
+            # Edited or deleted meanwhile - start over from the current row, or as a new review if it's gone
+
+
+def forget(review):
+    """Takes a deleted review back out of its company's totals"""
+    apply_rating_delta(review.company_id, -review.stars, -1)
@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from netfix import metrics, page_cache, static_pages
+from users.models import Company
+from . import autocomplete, facets, prerender, reviews
+from .models import Category, Review, Service, ServiceRequest
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_categories(sender, **kwargs):
+    """Reloads the per-process category cache after an admin edit"""
+    Category.cached(refresh=True)
+    transaction.on_commit(facets.invalidate)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Company)  # Ratings feed the rating facet
+@receiver(post_delete, sender=Company)
+def invalidate_facets(sender, **kwargs):
+    """Catalog facet counts are rebuilt on the next request after any service/company write commits"""
+    # Not before: a request rebuilding in between would cache the old counts for FACET_CACHE_TIMEOUT
+    transaction.on_commit(facets.invalidate)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def retire_catalog_pages(sender, **kwargs):
+    """Shared catalog page bodies show services, their companies and categories"""
+    # After commit, or a request in between could cache a body of the old rows under the new version
+    transaction.on_commit(lambda: page_cache.invalidate("services_list", "most_requested_services"))
+
+
+@receiver(post_save, sender=ServiceRequest)
+@receiver(post_delete, sender=ServiceRequest)
+def retire_most_requested(sender, **kwargs):
+    """Request counts on the most requested page"""
+    transaction.on_commit(lambda: page_cache.invalidate("most_requested_services"))
+
+
+@receiver(post_save, sender=Service)
+def count_service(sender, instance, created, **kwargs):
+    """Business counter for /metrics, counted once the write commits"""
+    if created:
+        field = instance.field
+        transaction.on_commit(lambda: metrics.SERVICES_CREATED.inc(field=field))
+
+
+@receiver(post_save, sender=ServiceRequest)
+def count_request(sender, instance, created, **kwargs):
+    if created:
+        field = instance.service.field
+        transaction.on_commit(lambda: metrics.REQUESTS_SUBMITTED.inc(field=field))
+
+
+@receiver(post_save, sender=Service)
+def index_service(sender, instance, **kwargs):
+    """Keeps the autocomplete index in step with committed service edits"""
+    service_id, name, field = instance.pk, instance.name, instance.field
+    transaction.on_commit(lambda: autocomplete.index.upsert(service_id, name, field))
+
+
+@receiver(post_delete, sender=Service)
+def unindex_service(sender, instance, **kwargs):
+    service_id = instance.pk
+    transaction.on_commit(lambda: autocomplete.index.discard(service_id))
+
+
+@receiver(post_delete, sender=Review)
+def unrate(sender, instance, **kwargs):
+    """Deleting a review (e.g. from the admin) takes its stars back out of the company rating"""
+    reviews.forget(instance)
+
+
+@receiver(pre_save, sender=Service)
+def remember_category(sender, instance, **kwargs):
+    """A service moving category changes the old category's page too"""
+    if settings.STATIC_PAGES and instance.pk:
+        instance._saved_category_id = (
+            Service.objects.filter(pk=instance.pk).values_list("category_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def prerender_service_pages(sender, instance, signal, **kwargs):
+    """Queues the pre-rendered pages showing this service, in the write's transaction"""
+    if not settings.STATIC_PAGES:
+        return
+    prerender.service_changed(
+        instance.pk, instance.company_id,
+        {instance.category_id, getattr(instance, "_saved_category_id", None)} - {None},
+        instance.date_created,
+    )
+    if signal is post_delete:
+        path = prerender.service_path(instance.pk)
+        transaction.on_commit(lambda: static_pages.remove(path))  # Not served again while its job waits
+
+
+@receiver(post_save, sender=Company)
+def prerender_company_pages(sender, instance, **kwargs):
+    if settings.STATIC_PAGES:
+        prerender.company_changed(instance.pk)
+
+
+@receiver(pre_save, sender=Category)
+def remember_slug(sender, instance, **kwargs):
+    if settings.STATIC_PAGES and instance.pk:
+        instance._saved_slug = Category.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def prerender_category_pages(sender, instance, signal, **kwargs):
+    """A renamed or deleted category's old page would otherwise keep being served"""
+    if not settings.STATIC_PAGES:
+        return
+    if signal is post_delete:
+        old_slug = instance.slug
+    else:
+        prerender.category_changed(instance.pk)  # Its name shows on the category and service pages
+        saved_slug = getattr(instance, "_saved_slug", None)
+        old_slug = saved_slug if saved_slug != instance.slug else None
+    if old_slug:
+        path = prerender.category_path_for(old_slug)
+        transaction.on_commit(lambda: static_pages.remove(path))
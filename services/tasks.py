@@ -0,0 +1,23 @@
+from main.jobs import task
+from . import prerender
+from .notifications import DIGEST_TASK, deliver_digests
+
+
+@task(DIGEST_TASK)
+def send_request_digests():
+    """Scheduled digest run - see services.notifications"""
+    stats = deliver_digests()
+    if stats["failed"]:
+        # The failed companies' events are still pending; failing the job retries them with backoff
+        raise RuntimeError(f"Digest delivery failed for {stats['failed']} compan{'y' if stats['failed'] == 1 else 'ies'}")
+
+
+@task(prerender.PAGE_TASK)
+def prerender_page(page, id):
+    """Rewrites one pre-rendered page - see services.prerender"""
+    prerender.render_page(page, id)
+
+
+@task(prerender.FAN_OUT_TASK)
+def prerender_pages_for(company=None, category=None):
+    prerender.fan_out(company=company, category=category)
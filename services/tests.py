@@ -1,10 +1,39 @@
-from django.test import TestCase, Client
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max, Min, Sum
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
+from django.core.management import CommandError, call_command
+from django.http import Http404, StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, Client, AsyncRequestFactory
 from django.urls import reverse
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from users.models import User, Customer, Company
-from .models import Service, ServiceRequest
+from main import jobs
+from netfix import geo, page_cache, pagination, static_pages
+from netfix.async_utils import async_read_view
+from main.models import Job
+from .models import (
+    ArchivedRequestRollup, ArchivedServiceRequest, Booking, Category, DailyRequestStats, NotificationEvent,
+    RequestEvent, Review, Service, ServiceRequest,
+)
+from . import analytics, archive, autocomplete, booking, cart, event_log, facets, prerender, reviews
+from .notifications import DIGEST_TASK, deliver_digests
 from .forms import CreateNewService, RequestServiceForm
+from . import views as service_views
 
 class ServiceModelTests(TestCase):
     """Test Service model functionality"""
@@ -271,6 +300,30 @@ class ServiceViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Electrical Repair')
 
+    def test_service_list_streams_in_chunks(self):
+        """Test the all services page sends its header first, then the cards in chunks"""
+        for i in range(4):
+            Service.objects.create(company=self.company, name=f'Extra {i}', description='d',
+                                   price_hour=Decimal('12'), field='Electricity')
+        with self.settings(STREAM_CHUNK_SIZE=2):
+            response = self.client.get(reverse('services_list'))
+            self.assertTrue(response.streaming)
+            chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn('All Services', chunks[0])
+        self.assertNotIn('service-card', chunks[0])
+        self.assertEqual([chunk.count('class="service-card"') for chunk in chunks[1:4]], [2, 2, 1])
+        self.assertIn('</html>', chunks[-1])
+        self.assertNotIn('netfix:stream', ''.join(chunks))
+
+    def test_service_list_without_streaming(self):
+        """Test ?stream=0 and empty results render the page in one response"""
+        response = self.client.get(reverse('services_list'), {'stream': '0'})
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'Electrical Repair')
+        response = self.client.get(reverse('services_list'), {'field': 'plumbing'})
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'No Matching Services')
+
     def test_individual_service_view(self):
         """Test individual service page displays all required information"""
         response = self.client.get(reverse('index', args=[self.service.id]))
@@ -331,3 +384,1236 @@ class ServiceViewTests(TestCase):
         """Test most requested services page"""
         response = self.client.get(reverse('most_requested_services'))
         self.assertEqual(response.status_code, 200)
+
+class AsyncServiceViewTests(TransactionTestCase):
+    """Test async read views (served under ASGI) render the same pages"""
+    serialized_rollback = True  # Restores the migrated categories after each flush
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        company_user = User.objects.create_user(
+            username='company1', email='company@test.com', password='testpass123', is_company=True
+        )
+        self.company = Company.objects.create(user=company_user, field_of_work='Electricity')
+        self.service = Service.objects.create(
+            company=self.company, name='Electrical Repair', description='Professional electrical repair',
+            price_hour=Decimal('10.50'), field='Electricity'
+        )
+
+    def get(self, view, path, *args):
+        request = self.factory.get(path)
+        request.user = AnonymousUser()
+        return async_to_sync(view)(request, *args)
+
+    def test_async_views_are_coroutines(self):
+        """Test async views are recognised as coroutine views by Django's handler"""
+        for view in (service_views.service_list_async, service_views.index_async,
+                     service_views.most_requested_services_async, service_views.service_field_async):
+            self.assertTrue(asyncio.iscoroutinefunction(view))
+
+    def test_async_service_list(self):
+        """Test async all services page"""
+        response = self.get(service_views.service_list_async, '/services/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Electrical Repair')
+
+    def test_async_service_field(self):
+        """Test async service type page"""
+        response = self.get(service_views.service_field_async, '/services/electricity/', 'electricity')
+        self.assertContains(response, 'Electrical Repair')
+
+    def test_async_index_404(self):
+        """Test async individual service page raises 404 for unknown ids"""
+        with self.assertRaises(Http404):
+            self.get(service_views.index_async, '/services/999', 999)
+
+    def test_buffered_stream_keeps_status_and_headers(self):
+        """Test a streamed page buffered for ASGI keeps its status code and every header"""
+        def streamed(request):
+            response = StreamingHttpResponse(iter([b'rows']), status=203, content_type='text/plain')
+            response['Cache-Control'] = 'max-age=60'
+            response['X-Custom'] = 'kept'
+            return response
+
+        response = self.get(async_read_view(streamed), '/')
+        self.assertFalse(response.streaming)
+        self.assertEqual((response.status_code, response.content), (203, b'rows'))
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response['Cache-Control'], 'max-age=60')
+        self.assertEqual(response['X-Custom'], 'kept')
+
+class NotificationDigestTests(TestCase):
+    """Test batched company digest notifications"""
+
+    def setUp(self):
+        self.company_user = User.objects.create_user(
+            username='company1', email='company@test.com', password='testpass123', is_company=True
+        )
+        self.company = Company.objects.create(user=self.company_user, field_of_work='Electricity')
+        self.service = Service.objects.create(
+            company=self.company, name='Electrical Repair', description='Professional electrical repair',
+            price_hour=Decimal('10.50'), field='Electricity'
+        )
+        self.customer_user = User.objects.create_user(
+            username='customer1', email='customer@test.com', password='testpass123', is_customer=True
+        )
+        Customer.objects.create(user=self.customer_user, date_of_birth='1990-01-01')
+        self.client.login(username='customer1', password='testpass123')
+
+    def request_service(self, address):
+        return self.client.post(
+            reverse('request_service', args=[self.service.id]),
+            data={'address': address, 'hours_needed': 2}
+        )
+
+    def test_requests_record_events_and_schedule_one_digest(self):
+        """Test each request records an event, but only one digest job is scheduled"""
+        self.request_service('1 First Street')
+        self.request_service('2 Second Street')
+        self.assertEqual(NotificationEvent.objects.filter(company=self.company).count(), 2)
+        self.assertEqual(Job.objects.filter(task=DIGEST_TASK, status=Job.QUEUED).count(), 1)
+        self.assertEqual(len(mail.outbox), 0)  # Nothing sent on the request path
+
+    def test_digest_coalesces_per_company(self):
+        """Test pending events are delivered as one email per company"""
+        self.request_service('1 First Street')
+        self.request_service('2 Second Street')
+
+        stats = deliver_digests()
+        self.assertEqual(stats['emails'], 1)
+        self.assertEqual(stats['events'], 2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['company@test.com'])
+        self.assertIn('2 new service requests', mail.outbox[0].subject)
+        self.assertIn('1 First Street', mail.outbox[0].body)
+        self.assertIn('$21.00', mail.outbox[0].body)
+        self.assertFalse(NotificationEvent.objects.filter(delivered_at__isnull=True).exists())
+
+        # Nothing left to send on the next run
+        self.assertEqual(deliver_digests()['emails'], 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_digest_job_sends_email(self):
+        """Test the scheduled digest job delivers through the email backend"""
+        self.request_service('1 First Street')
+        Job.objects.filter(task=DIGEST_TASK).update(run_at=timezone.now())
+        jobs.autodiscover()
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_event_committed_during_a_run_gets_a_follow_up(self):
+        """Test an event the running digest didn't list schedules the next run"""
+        self.request_service('1 First Street')
+        Job.objects.filter(task=DIGEST_TASK).update(status=Job.RUNNING)  # Claimed by a worker
+        late = ServiceRequest.objects.create(customer=Customer.objects.get(), service=self.service,
+                                             address='3 Late Street', hours_needed=1)
+
+        def send_messages(messages):
+            # Recorded by a request that saw the job still queued, committed after the company list was read
+            NotificationEvent.objects.create(company=self.company, service_request=late)
+            return len(messages)
+
+        connection = mail.get_connection()
+        with patch.object(connection, 'send_messages', send_messages):
+            deliver_digests(connection)
+        self.assertEqual(Job.objects.filter(task=DIGEST_TASK, status=Job.QUEUED).count(), 1)
+
+    def test_failed_digest_job_is_retried(self):
+        """Test a digest the backend refuses fails the job, and the retry delivers it"""
+        self.request_service('1 First Street')
+        Job.objects.filter(task=DIGEST_TASK).update(run_at=timezone.now())
+        jobs.autodiscover()
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', return_value=0):
+            jobs.run_pending()
+        job = Job.objects.get(task=DIGEST_TASK)
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('Digest delivery failed for 1 company', job.last_error)
+        self.assertTrue(NotificationEvent.objects.filter(delivered_at__isnull=True).exists())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.run_pending()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+        self.assertEqual(len(mail.outbox), 1)
+
+class RequestAnalyticsTests(TestCase):
+    """Test daily request/revenue buckets and the company stats endpoint"""
+
+    def setUp(self):
+        self.company_user = User.objects.create_user(
+            username='company1', email='company@test.com', password='testpass123', is_company=True
+        )
+        self.company = Company.objects.create(user=self.company_user, field_of_work='All in One')
+        self.wiring = Service.objects.create(
+            company=self.company, name='Wiring', description='Test', price_hour=Decimal('10.50'), field='Electricity'
+        )
+        self.pipes = Service.objects.create(
+            company=self.company, name='Pipes', description='Test', price_hour=Decimal('20.00'), field='Plumbing'
+        )
+        customer_user = User.objects.create_user(
+            username='customer1', email='customer@test.com', password='testpass123', is_customer=True
+        )
+        Customer.objects.create(user=customer_user, date_of_birth='1990-01-01')
+        self.client.login(username='customer1', password='testpass123')
+
+    def request_service(self, service, hours):
+        self.client.post(reverse('request_service', args=[service.id]), data={'address': 'Street', 'hours_needed': hours})
+
+    def test_requests_update_daily_bucket(self):
+        """Test each request increments its service's bucket for the day"""
+        self.request_service(self.wiring, 2)
+        self.request_service(self.wiring, 3)
+        bucket = DailyRequestStats.objects.get(service=self.wiring)
+        self.assertEqual((bucket.requests, bucket.hours), (2, 5))
+        self.assertEqual(bucket.revenue, Decimal('52.50'))
+        self.assertEqual(bucket.company, self.company)
+        self.assertEqual(bucket.field, 'Electricity')
+
+    def test_backfill_matches_incremental(self):
+        """Test rebuilding from raw requests gives the same buckets"""
+        self.request_service(self.wiring, 2)
+        self.request_service(self.pipes, 1)
+        before = sorted(DailyRequestStats.objects.values_list('service', 'requests', 'hours', 'revenue'))
+        DailyRequestStats.objects.all().delete()
+        call_command('backfill_request_stats', stdout=StringIO())
+        after = sorted(DailyRequestStats.objects.values_list('service', 'requests', 'hours', 'revenue'))
+        self.assertEqual(before, after)
+
+    def test_stats_endpoint_resolutions(self):
+        """Test day/week/month series from buckets, with empty periods filled in"""
+        today = timezone.localdate()
+        DailyRequestStats.objects.create(
+            day=today - timedelta(days=1), service=self.wiring, company=self.company, field='Electricity',
+            requests=2, hours=4, revenue=Decimal('42.00')
+        )
+        DailyRequestStats.objects.create(
+            day=today, service=self.pipes, company=self.company, field='Plumbing',
+            requests=1, hours=1, revenue=Decimal('20.00')
+        )
+        self.client.login(username='company1', password='testpass123')
+        url = reverse('company_stats', args=['company1'])
+
+        data = self.client.get(url).json()
+        self.assertEqual(len(data['series']), 30)
+        self.assertEqual(data['series'][-1], {'period': today.isoformat(), 'requests': 1, 'hours': 1, 'revenue': '20.00'})
+        self.assertEqual(data['series'][0]['requests'], 0)
+
+        start = (today - timedelta(days=1)).isoformat()
+        month = self.client.get(url, {'resolution': 'month', 'start': start}).json()['series']
+        self.assertEqual(sum(point['requests'] for point in month), 3)
+        self.assertEqual(month[0]['period'], (today - timedelta(days=1)).replace(day=1).isoformat())
+
+        week = self.client.get(url, {'resolution': 'week', 'start': start, 'field': 'plumbing'}).json()['series']
+        self.assertEqual(sum(point['requests'] for point in week), 1)
+
+    def test_stats_endpoint_access_and_validation(self):
+        """Test stats are private to the company and bad queries get 400"""
+        url = reverse('company_stats', args=['company1'])
+        self.assertEqual(self.client.get(url).status_code, 404)  # Logged in as a customer
+        self.client.login(username='company1', password='testpass123')
+        self.assertEqual(self.client.get(url, {'resolution': 'year'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': 'not-a-date'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2000-01-01'}).status_code, 400)
+
+class GeoLookupTests(TestCase):
+    """Test offline geocoding, geohash radius/k-nearest queries and the near-me filter"""
+
+    def setUp(self):
+        self.companies = {}
+        for username, location in [('nairobi_co', 'Nairobi'), ('thika_co', 'Thika'),
+                                   ('mombasa_co', 'Mombasa'), ('london_co', 'London'), ('nowhere_co', '')]:
+            user = User.objects.create_user(username=username, email=f'{username}@test.com', password='x', is_company=True)
+            company = Company.objects.create(user=user, field_of_work='Electricity', location=location)
+            Service.objects.create(
+                company=company, name=f'{username} wiring', description='Test',
+                price_hour=Decimal('10.00'), field='Electricity'
+            )
+            self.companies[username] = company
+
+    def test_geohash_encode(self):
+        """Test geohash encoding against a known value"""
+        self.assertEqual(geo.encode(42.6, -5.6, 5), 'ezs42')
+
+    def test_geocode_from_gazetteer(self):
+        """Test addresses and coordinates geocode offline, and unknown text does not"""
+        self.assertEqual(geo.geocode('12 Moi Avenue, Nairobi'), (-1.2864, 36.8172))
+        self.assertEqual(geo.geocode('5th Avenue, New York'), (40.7128, -74.006))
+        self.assertEqual(geo.geocode('-1.5, 36.9'), (-1.5, 36.9))
+        self.assertIsNone(geo.geocode('Atlantis'))
+        company = self.companies['nairobi_co']
+        self.assertTrue(company.geohash.startswith(geo.encode(-1.2864, 36.8172, 6)))
+        self.assertEqual(self.companies['nowhere_co'].geohash, '')
+
+    def test_radius_query_matches_brute_force(self):
+        """Test the geohash-indexed radius search finds exactly the companies within range"""
+        lat, lon = geo.geocode('Nairobi')
+        for radius in (5, 50, 500, 5000, 20000):
+            expected = sorted(
+                c.pk for c in Company.objects.exclude(geohash='')
+                if geo.distance_km(lat, lon, c.latitude, c.longitude) <= radius
+            )
+            found = sorted(c.pk for _, c in geo.within_radius(Company.objects.all(), lat, lon, radius))
+            self.assertEqual(found, expected, radius)
+
+    def test_k_nearest(self):
+        """Test k-nearest returns the closest companies in order"""
+        lat, lon = geo.geocode('Nairobi')
+        nearest = [c.user.username for _, c in geo.nearest(Company.objects.select_related('user'), lat, lon, 3)]
+        self.assertEqual(nearest, ['nairobi_co', 'thika_co', 'mombasa_co'])
+
+    def test_requests_are_geocoded(self):
+        """Test service request addresses naming a known place get coordinates"""
+        customer_user = User.objects.create_user(username='cust', email='cust@test.com', password='x', is_customer=True)
+        customer = Customer.objects.create(user=customer_user)
+        request = ServiceRequest.objects.create(
+            customer=customer, service=Service.objects.first(), address='Kenyatta Ave, Nakuru', hours_needed=1
+        )
+        self.assertEqual((request.latitude, request.longitude), (-0.3031, 36.08))
+
+    def test_services_near_me_filter(self):
+        """Test the catalog near filter lists only nearby companies' services, nearest first"""
+        response = self.client.get(reverse('services_list'), {'near': 'Nairobi', 'radius': 50})
+        names = [service.name for service in response.context['services']]
+        self.assertEqual(names, ['nairobi_co wiring', 'thika_co wiring'])
+        self.assertContains(response, 'within 50 km of Nairobi')
+
+        response = self.client.get(reverse('services_list'), {'near': 'Atlantis'})
+        self.assertEqual(response.context['services'], [])
+        self.assertContains(response, 'know where')
+
+    def test_non_finite_radius_falls_back_to_default(self):
+        """Test radius=nan or inf is treated like a missing radius instead of failing"""
+        for radius in ('nan', 'inf', '-inf'):
+            response = self.client.get(reverse('services_list'), {'near': 'Nairobi', 'radius': radius})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['radius'], service_views.NEAR_DEFAULT_RADIUS_KM)
+
+    def test_near_filter_falls_back_to_closest_companies(self):
+        """Test an empty radius shows the k nearest companies' services instead"""
+        lat, lon = geo.geocode('Nairobi')
+        response = self.client.get(reverse('services_list'), {'near': f'{lat},{lon - 3}', 'radius': 1})
+        self.assertEqual([service.name for service in response.context['services']][:1], ['nairobi_co wiring'])
+        self.assertContains(response, 'showing the closest companies')
+
+    def test_near_fallback_applies_the_facets(self):
+        """Test nearby companies with no matching service don't block the fallback"""
+        Service.objects.create(company=self.companies['mombasa_co'], name='mombasa_co rewiring', description='Test',
+                               price_hour=Decimal('150.00'), field='Electricity')
+        response = self.client.get(reverse('services_list'), {'near': 'Nairobi', 'radius': 50, 'price': '100-plus'})
+        self.assertEqual([service.name for service in response.context['services']], ['mombasa_co rewiring'])
+        self.assertContains(response, 'showing the closest companies')
+
+class BookingTests(TestCase):
+    """Test capacity-aware scheduling and availability"""
+
+    def setUp(self):
+        company_user = User.objects.create_user(
+            username='company1', email='company@test.com', password='testpass123', is_company=True
+        )
+        self.company = Company.objects.create(user=company_user, field_of_work='Electricity', capacity=2)
+        self.service = Service.objects.create(
+            company=self.company, name='Wiring', description='Test', price_hour=Decimal('10.00'), field='Electricity'
+        )
+        customer_user = User.objects.create_user(
+            username='customer1', email='customer@test.com', password='testpass123', is_customer=True
+        )
+        self.customer = Customer.objects.create(user=customer_user, date_of_birth='1990-01-01')
+        self.day = timezone.localdate() + timedelta(days=2)
+
+    def at(self, hour):
+        return timezone.make_aware(datetime.combine(self.day, time(hour)))
+
+    def book(self, hour, hours=2):
+        request = ServiceRequest.objects.create(
+            customer=self.customer, service=self.service, address='Street', hours_needed=hours
+        )
+        return booking.book(request, self.at(hour))
+
+    def test_sweep_counts_concurrency(self):
+        """Test sweep-line segments count overlaps, and back-to-back bookings don't overlap"""
+        segments = booking.sweep([(self.at(9), self.at(11)), (self.at(10), self.at(12)), (self.at(12), self.at(13))],
+                                 self.at(8), self.at(14))
+        self.assertEqual([(s.hour, e.hour, c) for s, e, c in segments],
+                         [(8, 9, 0), (9, 10, 1), (10, 11, 2), (11, 12, 1), (12, 13, 1), (13, 14, 0)])
+
+    def test_capacity_limits_overlapping_bookings(self):
+        """Test a company with capacity 2 accepts two overlapping bookings but not a third"""
+        self.book(9)
+        self.book(10)
+        with self.assertRaises(ValidationError):
+            self.book(10, hours=1)
+        self.book(11)  # First booking has ended by 11:00
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_slot_validation(self):
+        """Test bookings must be in the future, within working hours and not too long"""
+        with self.assertRaises(ValidationError):
+            self.book(17)  # Ends after 18:00
+        with self.assertRaises(ValidationError):
+            self.book(8, hours=booking.MAX_BOOKING_HOURS + 1)
+
+    def test_free_slots(self):
+        """Test free slots report remaining capacity and merge adjacent periods"""
+        self.book(9)
+        self.book(10)
+        free = booking.free_slots(self.company, self.day, days=1)[0]['free']
+        self.assertEqual([(s.hour, e.hour, a) for s, e, a in free], [(8, 9, 2), (9, 10, 1), (11, 12, 1), (12, 18, 2)])
+
+    def test_request_view_rejects_full_slot(self):
+        """Test request_service shows an error and saves nothing when the slot is full"""
+        self.company.capacity = 1
+        self.company.save()
+        self.book(9)
+        self.client.login(username='customer1', password='testpass123')
+        response = self.client.post(reverse('request_service', args=[self.service.id]), data={
+            'address': 'Street', 'hours_needed': 2, 'scheduled_start': self.at(10).strftime('%Y-%m-%dT%H:%M'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'fully booked')
+        self.assertEqual(ServiceRequest.objects.count(), 1)
+
+        response = self.client.post(reverse('request_service', args=[self.service.id]), data={
+            'address': 'Street', 'hours_needed': 2, 'scheduled_start': self.at(13).strftime('%Y-%m-%dT%H:%M'),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_availability_endpoint(self):
+        """Test the availability JSON lists a week of free slots"""
+        self.book(9)
+        data = self.client.get(reverse('company_availability', args=['company1']),
+                               {'start': self.day.isoformat()}).json()
+        self.assertEqual(data['capacity'], 2)
+        self.assertEqual(len(data['days']), 7)
+        self.assertEqual(data['days'][0]['free'][1]['available'], 1)
+        self.assertEqual(self.client.get(reverse('company_availability', args=['company1']),
+                                         {'days': 99}).status_code, 400)
+
+
+class ServiceFacetTests(TransactionTestCase):
+    """Faceted catalog filtering with counts from one cached grouped query"""
+    serialized_rollback = True  # Restores the migrated categories after each flush
+
+    def setUp(self):
+        cache.clear()  # Test rollbacks don't fire the invalidation signals
+        def make_company(name, rating):
+            user = User.objects.create_user(username=name, email=f'{name}@test.com', password='testpass123', is_company=True)
+            return Company.objects.create(user=user, field_of_work='All in One', rating=rating)
+        self.top = make_company('topco', 5)
+        self.low = make_company('lowco', 2)
+        for company, name, field, price in [
+            (self.top, 'Pipe Fix', 'Plumbing', '20'),
+            (self.top, 'Wiring', 'Electricity', '60'),
+            (self.low, 'Drain Clean', 'Plumbing', '40'),
+            (self.low, 'Big Rewire', 'Electricity', '150'),
+        ]:
+            Service.objects.create(company=company, name=name, description='d', field=field, price_hour=Decimal(price))
+
+    def test_counts_exclude_own_facet(self):
+        """Each facet's counts apply the other selections but not its own"""
+        result = facets.counts({'field': 'plumbing'})
+        self.assertEqual(result['total'], 2)
+        self.assertEqual(result['field']['plumbing'], 2)
+        self.assertEqual(result['field']['electricity'], 2)  # Still shows the alternative
+        self.assertEqual(result['price'], {'under-25': 1, '25-50': 1, '50-100': 0, '100-plus': 0})
+        self.assertEqual(result['rating'][4], 1)
+        self.assertEqual(result['rating'][1], 2)
+
+    def test_cube_is_cached_and_invalidated_on_write(self):
+        """Counts come from the cache until a service is saved or deleted"""
+        facets.counts({})
+        with self.assertNumQueries(0):
+            self.assertEqual(facets.counts({})['total'], 4)
+        Service.objects.create(company=self.low, name='Tap', description='d', field='Plumbing', price_hour=Decimal('10'))
+        self.assertEqual(facets.counts({})['total'], 5)
+        Service.objects.get(name='Tap').delete()
+        self.assertEqual(facets.counts({})['total'], 4)
+
+    def test_cube_outlives_uncommitted_writes(self):
+        """The cached cube is only dropped once the write commits, so nothing rebuilds from it early"""
+        facets.counts({})
+        with transaction.atomic():
+            Service.objects.create(company=self.low, name='Tap', description='d', field='Plumbing',
+                                   price_hour=Decimal('10'))
+            self.assertIsNotNone(cache.get(facets.CUBE_CACHE_KEY))
+        self.assertIsNone(cache.get(facets.CUBE_CACHE_KEY))
+
+    def test_rating_change_invalidates(self):
+        """Company rating edits move services between rating facets"""
+        self.assertEqual(facets.counts({})['rating'][4], 2)
+        self.low.rating = 4
+        self.low.save()
+        self.assertEqual(facets.counts({})['rating'][4], 4)
+
+    def test_list_view_filters(self):
+        """The list shows only services matching every selected facet"""
+        response = self.client.get('/services/', {'field': 'electricity', 'rating': '4'})
+        self.assertEqual([s.name for s in response.context['services']], ['Wiring'])
+        response = self.client.get('/services/', {'price': '100-plus'})
+        self.assertEqual([s.name for s in response.context['services']], ['Big Rewire'])
+
+    def test_invalid_selection_ignored(self):
+        """Unknown facet values are dropped rather than erroring"""
+        response = self.client.get('/services/', {'field': 'rocketry', 'price': 'free', 'rating': '9'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['selection'], {})
+        self.assertEqual(len(response.context['services']), 4)
+
+    def test_active_option_link_clears_it(self):
+        """Clicking the selected option removes it from the query string"""
+        response = self.client.get('/services/', {'field': 'plumbing'})
+        plumbing = next(o for o in response.context['facets']['fields'] if o['label'] == 'Plumbing')
+        self.assertTrue(plumbing['active'])
+        self.assertEqual(plumbing['url'], '?')
+
+
+class SharedPageBodyTests(TransactionTestCase):
+    """One cached catalog page body for anonymous visitors, customers and companies"""
+    serialized_rollback = True  # Page versions move when writes commit; restores the migrated categories
+
+    def setUp(self):
+        cache.clear()
+        company_user = User.objects.create_user(username='shareco', email='shareco@test.com', password='testpass123',
+                                                is_company=True)
+        self.company = Company.objects.create(user=company_user, field_of_work='Plumbing')
+        customer_user = User.objects.create_user(username='sharecust', email='sharecust@test.com',
+                                                 password='testpass123', is_customer=True)
+        self.customer = Customer.objects.create(user=customer_user, date_of_birth='1990-01-01')
+        self.service = Service.objects.create(company=self.company, name='Leak Fix', description='d',
+                                              field='Plumbing', price_hour=Decimal('20'))
+
+    def get(self, path, username=None):
+        client = Client()
+        if username:
+            client.login(username=username, password='testpass123')
+        response = client.get(path)
+        html = b''.join(response.streaming_content) if response.streaming else response.content
+        return html.decode()
+
+    @staticmethod
+    def body(html):
+        return html.split("<div class='content'>", 1)[1]
+
+    def test_one_body_for_every_viewer(self):
+        """Customers and companies are served the body cached for an anonymous visitor"""
+        for path in ('/services/', '/services/most-requested/'):
+            anonymous = self.get(path)
+            with CaptureQueriesContext(connection) as queries:
+                customer = self.get(path, 'sharecust')
+            self.assertFalse([q for q in queries if 'FROM "services_service"' in q['sql']])
+            company = self.get(path, 'shareco')
+            self.assertEqual(self.body(customer), self.body(anonymous))
+            self.assertEqual(self.body(company), self.body(anonymous))
+            self.assertIn('class="viewer-customer"', customer)
+            self.assertIn('class="viewer-company"', company)
+            self.assertIn('data-for="customer">Request Service', anonymous)
+
+    def test_writes_retire_cached_bodies(self):
+        """New services and new requests show up on the next request"""
+        self.get('/services/')
+        self.get('/services/most-requested/')
+        Service.objects.create(company=self.company, name='Boiler Check', description='d',
+                               field='Plumbing', price_hour=Decimal('30'))
+        self.assertIn('Boiler Check', self.get('/services/'))
+        ServiceRequest.objects.create(customer=self.customer, service=self.service, address='1 Road', hours_needed=1)
+        self.assertIn('1 request<', self.get('/services/most-requested/'))
+
+    def test_body_kept_until_write_commits(self):
+        """The page version only moves once the write commits, so no body of the old rows outlives it"""
+        self.get('/services/')
+        with transaction.atomic():
+            Service.objects.create(company=self.company, name='Boiler Check', description='d',
+                                   field='Plumbing', price_hour=Decimal('30'))
+            version = page_cache.version('services_list')
+        self.assertNotEqual(page_cache.version('services_list'), version)
+        self.assertIn('Boiler Check', self.get('/services/'))
+
+
+class AutocompleteTests(TransactionTestCase):
+    """Prefix-index suggestions kept current by committed service writes"""
+    serialized_rollback = True  # Restores the migrated categories after each flush
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.index.reset()
+        user = User.objects.create_user(username='fixit', email='fixit@test.com', password='testpass123', is_company=True)
+        self.company = Company.objects.create(user=user, field_of_work='All in One')
+        self.pipe = Service.objects.create(company=self.company, name='Pipe Repair', description='d',
+                                           field='Plumbing', price_hour=Decimal('30'))
+        self.wiring = Service.objects.create(company=self.company, name='Home Wiring', description='d',
+                                             field='Electricity', price_hour=Decimal('40'))
+
+    def names(self, prefix, limit=8):
+        return [name for _, name, _ in autocomplete.index.suggest(prefix, limit)]
+
+    def test_matches_name_word_and_field_prefixes(self):
+        """Full names, later words and fields all match, case-insensitively"""
+        self.assertEqual(self.names('PIPE'), ['Pipe Repair'])
+        self.assertEqual(self.names('wir'), ['Home Wiring'])
+        self.assertEqual(self.names('plumb'), ['Pipe Repair'])
+        self.assertEqual(self.names('zzz'), [])
+        self.assertEqual(self.names('  '), [])
+
+    def test_name_matches_rank_before_word_matches(self):
+        """A service whose name starts with the prefix outranks one matching a later word"""
+        Service.objects.create(company=self.company, name='Repair Shop', description='d',
+                               field='Carpentry', price_hour=Decimal('20'))
+        self.assertEqual(self.names('repair'), ['Repair Shop', 'Pipe Repair'])
+
+    def test_incremental_updates(self):
+        """Saves and deletes update the loaded index without a rebuild query"""
+        self.names('p')  # Load the index
+        self.pipe.name = 'Drain Unblocking'
+        self.pipe.save()
+        self.wiring.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('drain'), ['Drain Unblocking'])
+            self.assertEqual(self.names('pipe'), [])
+            self.assertEqual(self.names('home'), [])
+
+    def test_foreign_write_triggers_rebuild(self):
+        """A version bump from another process makes the next lookup reload"""
+        self.names('p')
+        Service.objects.filter(pk=self.pipe.pk).update(name='Tap Fitting')  # No signal, like another worker
+        cache.incr(autocomplete.VERSION_CACHE_KEY)
+        self.assertEqual(self.names('tap'), ['Tap Fitting'])
+
+    def test_popular_field_does_not_crowd_out_names(self):
+        """Hundreds of services in a field don't hide a service whose name starts with the field"""
+        crowded = autocomplete.PrefixIndex(max_services=1000)
+        crowded.rebuild()
+        for service_id in range(1000, 1399):
+            crowded.upsert(service_id, f'Fix {service_id}', 'Plumbing')
+        crowded.upsert(2000, 'Plumbing Express', 'Plumbing')
+        self.assertEqual([n for _, n, _ in crowded.suggest('plumb', 3)][0], 'Plumbing Express')
+
+    def test_write_during_rebuild_is_not_lost(self):
+        """A write committed while the rebuild query runs makes the next lookup rebuild again"""
+        real_get_cached = Category.get_cached
+        raced = []
+
+        def racing_get_cached(category_id):
+            if not raced:  # The rebuild query has already read its rows
+                raced.append(True)
+                Service.objects.filter(pk=self.pipe.pk).update(name='Tap Fitting')
+                cache.incr(autocomplete.VERSION_CACHE_KEY)
+            return real_get_cached(category_id)
+
+        cache.set(autocomplete.VERSION_CACHE_KEY, 1)
+        with patch.object(Category, 'get_cached', racing_get_cached):
+            autocomplete.index.rebuild()
+        self.assertEqual(self.names('tap'), ['Tap Fitting'])
+
+    def test_memory_bound_evicts_oldest(self):
+        """Past the service cap the oldest services drop out of the index"""
+        bounded = autocomplete.PrefixIndex(max_services=1)
+        bounded.rebuild()
+        self.assertEqual(len(bounded), 1)
+        self.assertEqual([n for _, n, _ in bounded.suggest('home')], ['Home Wiring'])
+        bounded.upsert(self.wiring.pk + 1, 'Garden Care', 'Gardening')
+        self.assertEqual(len(bounded), 1)
+        self.assertEqual([n for _, n, _ in bounded.suggest('home')], [])
+
+    def test_endpoint(self):
+        """The JSON endpoint returns suggestions with links and clamps the limit"""
+        response = self.client.get(reverse('services_autocomplete'), {'q': 'pi', 'limit': 'x'})
+        self.assertEqual(response.json()['results'],
+                         [{'id': self.pipe.pk, 'name': 'Pipe Repair', 'field': 'Plumbing', 'url': f'/services/{self.pipe.pk}'}])
+
+
+class AdminChangelistTests(TestCase):
+    """Admin changelists stay constant-query and avoid full-table counts"""
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser(username='admin', email='admin@test.com', password='testpass123')
+        self.client.force_login(admin_user)
+        company_user = User.objects.create_user(username='co', email='co@test.com', password='testpass123',
+                                                is_company=True)
+        company = Company.objects.create(user=company_user, field_of_work='All in One')
+        customer_user = User.objects.create_user(username='cu', email='cu@test.com', password='testpass123',
+                                                 is_customer=True)
+        customer = Customer.objects.create(user=customer_user)
+        for i in range(5):
+            service = Service.objects.create(company=company, name=f'Svc {i}', description='d',
+                                             field='Plumbing', price_hour=Decimal('10'))
+            ServiceRequest.objects.create(customer=customer, service=service, address='1 Road', hours_needed=1)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_related_columns_do_not_query_per_row(self):
+        """Adding rows doesn't add queries to the service and request changelists"""
+        services_before = self.changelist_queries('/admin/services/service/')
+        requests_before = self.changelist_queries('/admin/services/servicerequest/')
+        service = Service.objects.first()
+        for _ in range(5):
+            ServiceRequest.objects.create(customer=Customer.objects.first(), service=service,
+                                          address='2 Road', hours_needed=1)
+            Service.objects.create(company=service.company, name='More', description='d',
+                                   field='Plumbing', price_hour=Decimal('10'))
+        self.assertEqual(self.changelist_queries('/admin/services/service/'), services_before)
+        self.assertEqual(self.changelist_queries('/admin/services/servicerequest/'), requests_before)
+
+    def test_filters_and_autocomplete(self):
+        """Field filter and the company autocomplete endpoint respond"""
+        plumbing = Category.objects.get(slug='plumbing')
+        response = self.client.get('/admin/services/service/', {'category__id__exact': plumbing.pk})
+        self.assertContains(response, 'Svc 0')
+        response = self.client.get('/admin/users/company/autocomplete/', {'term': 'c'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_estimated_count_paginator(self):
+        """Large unfiltered tables use the estimate; filtered counts are capped"""
+        with patch.object(pagination, 'ESTIMATE_THRESHOLD', 2):
+            paginator = pagination.EstimatedCountPaginator(ServiceRequest.objects.order_by('-id'), 100)
+            self.assertEqual(paginator.count, pagination.estimated_table_rows(ServiceRequest))
+        with patch.object(pagination, 'COUNT_CAP', 3):
+            paginator = pagination.EstimatedCountPaginator(ServiceRequest.objects.filter(hours_needed=1).order_by('-id'), 100)
+            self.assertEqual(paginator.count, 3)
+        paginator = pagination.EstimatedCountPaginator(ServiceRequest.objects.filter(hours_needed=1).order_by('-id'), 100)
+        self.assertEqual(paginator.count, 5)
+
+    def test_estimate_follows_archival(self):
+        """Deleting the oldest rows lowers the estimate; ANALYZE makes it the exact count"""
+        oldest = ServiceRequest.objects.order_by('id')[:2]
+        ServiceRequest.objects.filter(id__in=list(oldest.values_list('id', flat=True))).delete()
+        span = ServiceRequest.objects.aggregate(low=Min('id'), high=Max('id'))
+        self.assertEqual(pagination.estimated_table_rows(ServiceRequest), span['high'] - span['low'] + 1)
+        ServiceRequest.objects.filter(id=span['high'] - 1).delete()
+        pagination.refresh_estimates(ServiceRequest)
+        self.assertEqual(pagination.estimated_table_rows(ServiceRequest), ServiceRequest.objects.count())
+
+
+class RequestArchiveTests(TestCase):
+    """Hot/cold archival keeps totals, history pages and exports intact"""
+
+    def setUp(self):
+        company_user = User.objects.create_user(username='archco', email='archco@test.com', password='testpass123',
+                                                is_company=True)
+        self.company = Company.objects.create(user=company_user, field_of_work='All in One')
+        self.customer_user = User.objects.create_user(username='archcu', email='archcu@test.com',
+                                                      password='testpass123', is_customer=True)
+        self.customer = Customer.objects.create(user=self.customer_user)
+        self.plumbing = Service.objects.create(company=self.company, name='Pipes', description='d',
+                                               field='Plumbing', price_hour=Decimal('10'))
+        self.wiring = Service.objects.create(company=self.company, name='Wires', description='d',
+                                             field='Electricity', price_hour=Decimal('20'))
+        now = timezone.now()
+        for days_ago, service in [(800, self.plumbing), (700, self.wiring), (600, self.plumbing), (5, self.plumbing)]:
+            request = ServiceRequest.objects.create(customer=self.customer, service=service,
+                                                    address='1 Road', hours_needed=2)
+            ServiceRequest.objects.filter(pk=request.pk).update(request_date=now - timedelta(days=days_ago))
+
+    def test_move_keeps_totals(self):
+        """Requests move in batches and profile totals are unchanged"""
+        customer_before = archive.customer_totals(self.customer)
+        company_before = archive.company_totals(self.company)
+        call_command('archive_requests', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(ServiceRequest.objects.count(), 1)
+        self.assertEqual(ArchivedServiceRequest.objects.count(), 3)
+        self.assertEqual(ArchivedRequestRollup.objects.get(service=self.plumbing).requests, 2)
+        self.assertEqual(archive.customer_totals(self.customer), customer_before)
+        self.assertEqual(archive.company_totals(self.company), company_before)
+        self.assertEqual(customer_before['total_spent'], Decimal('100'))
+        self.assertEqual(customer_before['unique_categories'], 2)
+
+    def test_dry_run_moves_nothing(self):
+        """--dry-run only reports the count"""
+        out = StringIO()
+        call_command('archive_requests', '--dry-run', stdout=out)
+        self.assertIn('3 requests', out.getvalue())
+        self.assertFalse(ArchivedServiceRequest.objects.exists())
+
+    def test_profile_history_continues_into_archive(self):
+        """?history=all pages on from recent requests into archived ones"""
+        archive.archive_before(timezone.now() - timedelta(days=365))
+        response = self.client.get('/customer/archcu', {'history': 'all'})
+        self.assertEqual(response.context['total_requests'], 4)
+        self.assertEqual(len(response.context['service_requests']), 4)
+        self.assertTrue(response.context['service_requests'][-1].is_archived)
+        response = self.client.get('/customer/archcu')
+        self.assertEqual(len(response.context['service_requests']), 1)
+        self.assertEqual(response.context['total_requests'], 4)
+
+    def test_history_cursor_spans_tables(self):
+        """A cursor from the hot table carries over into the archive"""
+        archive.archive_before(timezone.now() - timedelta(days=365))
+        with patch('netfix.views.REQUESTS_PAGE_SIZE', 2):
+            first = self.client.get('/customer/archcu', {'history': 'all'})
+            self.assertIn('history=all', first.context['requests_next_url'])
+            second = self.client.get(first.context['requests_next_url'])
+        self.assertEqual(len(second.context['rows']), 2)
+        self.assertIsNone(second.context['next_url'])
+
+    def test_export_and_analytics_include_archive(self):
+        """CSV export and the analytics rebuild read archived requests"""
+        archive.archive_before(timezone.now() - timedelta(days=365))
+        out = StringIO()
+        call_command('export_requests', '--customer', 'archcu', '--include-archived', stdout=out)
+        lines = out.getvalue().strip().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[-1].endswith(',yes'))
+        out = StringIO()
+        call_command('export_requests', '--customer', 'archcu', stdout=out)
+        self.assertEqual(len(out.getvalue().strip().splitlines()), 2)
+        analytics.rebuild()
+        self.assertEqual(DailyRequestStats.objects.aggregate(total=Sum('requests'))['total'], 4)
+
+
+class CategoryTests(TestCase):
+    """Categories as an indexed table with slug routing"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='catco', email='catco@test.com', password='testpass123',
+                                        is_company=True)
+        self.company = Company.objects.create(user=user, field_of_work='Locks')
+        self.service = Service.objects.create(company=self.company, name='Lock Change', description='d',
+                                              field='Locks', price_hour=Decimal('30'))
+
+    def test_migrated_categories(self):
+        """The migration seeds every category once, with stable slugs"""
+        self.assertEqual(Category.objects.count(), 12)
+        self.assertTrue(Category.objects.get(slug='all-in-one').company_only)
+        self.assertEqual(len(Category.service_categories()), 11)
+
+    def test_field_names_map_to_foreign_keys(self):
+        """field/field_of_work read and write through the category key without queries"""
+        locks = Category.objects.get(slug='locks')
+        self.assertEqual(self.service.category_id, locks.pk)
+        self.assertEqual(self.company.category_id, locks.pk)
+        service = Service.objects.get(pk=self.service.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(service.field, 'Locks')
+        with self.assertRaises(Category.DoesNotExist):
+            Service(field='Rocketry')
+
+    def test_category_page_by_slug(self):
+        """Category pages route by slug and list that category's services"""
+        response = self.client.get(reverse('services_field', args=['locks']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['field'], 'Locks')
+        self.assertEqual(list(response.context['services']), [self.service])
+
+    def test_unknown_category_is_404(self):
+        """Unknown slugs and the company-only type are 404s, not empty pages"""
+        self.assertEqual(self.client.get('/services/rocketry/').status_code, 404)
+        self.assertEqual(self.client.get('/services/all-in-one/').status_code, 404)
+
+    def test_renamed_category_refreshes_cache(self):
+        """Editing a category reloads the per-process cache"""
+        locks = Category.objects.get(slug='locks')
+        locks.name = 'Locksmith'
+        locks.save()
+        self.assertEqual(Service.objects.get(pk=self.service.pk).field, 'Locksmith')
+        locks.name = 'Locks'
+        locks.save()
+
+
+class ReviewTests(TestCase):
+    """Reviews on completed requests keep running company rating totals"""
+
+    def setUp(self):
+        company_user = User.objects.create_user(username='revco', email='revco@test.com', password='testpass123',
+                                                is_company=True)
+        self.company = Company.objects.create(user=company_user, field_of_work='Plumbing')
+        self.service = Service.objects.create(company=self.company, name='Pipes', description='d',
+                                              field='Plumbing', price_hour=Decimal('10'))
+        self.customers = []
+        for i in range(2):
+            user = User.objects.create_user(username=f'revcu{i}', email=f'revcu{i}@test.com', password='testpass123',
+                                            is_customer=True)
+            self.customers.append(Customer.objects.create(user=user))
+        self.requests = [
+            ServiceRequest.objects.create(customer=customer, service=self.service, address='1 Road', hours_needed=1)
+            for customer in self.customers
+        ]
+
+    def company_rating(self):
+        company = Company.objects.get(pk=self.company.pk)
+        return company.rating_sum, company.rating_count, company.rating_average, company.rating
+
+    def test_requires_completion(self):
+        """Uncompleted requests can't be reviewed"""
+        with self.assertRaises(ValidationError):
+            reviews.submit(self.requests[0], 5)
+
+    def test_running_totals_on_create_edit_delete(self):
+        """Creating, editing and deleting reviews move sum/count/average without re-aggregating"""
+        for service_request in self.requests:
+            reviews.complete(service_request)
+        reviews.submit(self.requests[0], 5)
+        reviews.submit(self.requests[1], 2)
+        self.assertEqual(self.company_rating(), (7, 2, Decimal('3.50'), 4))
+        review, created = reviews.submit(self.requests[1], 4, 'Better on reflection')
+        self.assertFalse(created)
+        self.assertEqual(review.comment, 'Better on reflection')
+        self.assertEqual(self.company_rating(), (9, 2, Decimal('4.50'), 5))
+        review.delete()
+        self.assertEqual(self.company_rating(), (5, 1, Decimal('5.00'), 5))
+        Review.objects.get().delete()
+        self.assertEqual(self.company_rating(), (0, 0, Decimal('0.00'), 0))
+
+    def test_edit_racing_a_delete_becomes_new_review(self):
+        """An edit whose review was deleted meanwhile is saved as a new review instead of failing"""
+        reviews.complete(self.requests[0])
+        reviews.submit(self.requests[0], 2)
+        real_filter = Review.objects.filter
+        raced = []
+
+        def delete_first(*args, **kwargs):
+            if 'stars' in kwargs and not raced:  # The compare-and-set - the admin deletes the review just before it
+                raced.append(True)
+                real_filter().delete()
+            return real_filter(*args, **kwargs)
+
+        with patch.object(Review.objects, 'filter', side_effect=delete_first):
+            review, created = reviews.submit(self.requests[0], 4)
+        self.assertTrue(created)
+        self.assertEqual(self.company_rating()[:2], (4, 1))
+
+    def test_admin_cannot_overwrite_running_totals(self):
+        """The company admin form shows the rating columns read-only"""
+        admin_user = User.objects.create_superuser(username='admin', email='admin@test.com', password='testpass123')
+        self.client.force_login(admin_user)
+        reviews.apply_rating_delta(self.company.pk, 5, 1)
+        form = self.client.get(reverse('admin:users_company_change', args=[self.company.pk])).context['adminform']
+        self.assertTrue({'rating_sum', 'rating_count', 'rating_average', 'rating'} <= set(form.readonly_fields))
+
+    def test_complete_and_review_views(self):
+        """Only the company can complete a request and only its customer can review it"""
+        url = reverse('complete_request', args=[self.requests[0].id])
+        self.client.login(username='revcu0', password='testpass123')
+        self.assertEqual(self.client.post(url).status_code, 404)
+        self.client.login(username='revco', password='testpass123')
+        self.client.post(url)
+        self.assertIsNotNone(ServiceRequest.objects.get(pk=self.requests[0].pk).completed_at)
+
+        review_url = reverse('review_request', args=[self.requests[0].id])
+        self.client.login(username='revcu1', password='testpass123')
+        self.assertEqual(self.client.get(review_url).status_code, 404)
+        self.client.login(username='revcu0', password='testpass123')
+        response = self.client.post(review_url, {'stars': 4, 'comment': 'Quick and tidy'})
+        self.assertRedirects(response, '/customer/revcu0', fetch_redirect_response=False)
+        self.assertEqual(self.company_rating()[:2], (4, 1))
+        self.assertContains(self.client.get('/company/revco'), 'Quick and tidy')
+
+    def test_catalog_sorts_by_rating(self):
+        """?sort=rating orders services by the indexed company average"""
+        other_user = User.objects.create_user(username='topco2', email='topco2@test.com', password='testpass123',
+                                              is_company=True)
+        other = Company.objects.create(user=other_user, field_of_work='Plumbing')
+        top = Service.objects.create(company=other, name='Top Pipes', description='d',
+                                     field='Plumbing', price_hour=Decimal('10'))
+        reviews.apply_rating_delta(other.pk, 5, 1)
+        reviews.apply_rating_delta(self.company.pk, 3, 1)
+        response = self.client.get('/services/', {'sort': 'rating'})
+        self.assertEqual(list(response.context['services'])[:2], [top, self.service])
+
+    def test_review_survives_archival(self):
+        """Archiving the request keeps the review and the company totals"""
+        reviews.complete(self.requests[0])
+        reviews.submit(self.requests[0], 5)
+        ServiceRequest.objects.filter(pk=self.requests[0].pk).update(request_date=timezone.now() - timedelta(days=900))
+        archive.archive_before(timezone.now() - timedelta(days=365))
+        self.assertIsNone(Review.objects.get().service_request)
+        self.assertEqual(self.company_rating()[:2], (5, 1))
+
+
+class CartCheckoutTests(TestCase):
+    """Test the multi-service cart and its single-batch checkout"""
+
+    def setUp(self):
+        company_user = User.objects.create_user(
+            username='company1', email='company@test.com', password='testpass123', is_company=True
+        )
+        self.company = Company.objects.create(user=company_user, field_of_work='All in One')
+        self.pipes = Service.objects.create(
+            company=self.company, name='Pipes', description='Test', price_hour=Decimal('20.00'), field='Plumbing'
+        )
+        self.paint = Service.objects.create(
+            company=self.company, name='Paint', description='Test', price_hour=Decimal('15.00'), field='Painting'
+        )
+        customer_user = User.objects.create_user(
+            username='customer1', email='customer@test.com', password='testpass123', is_customer=True
+        )
+        self.customer = Customer.objects.create(user=customer_user, date_of_birth='1990-01-01')
+        self.client.login(username='customer1', password='testpass123')
+
+    def add(self, service, hours):
+        return self.client.post(reverse('cart_add', args=[service.id]), {'hours_needed': hours})
+
+    def test_add_and_remove(self):
+        """Test the cart keeps one line per service with its latest hours"""
+        self.assertRedirects(self.add(self.pipes, 2), reverse('cart'))
+        self.add(self.paint, 3)
+        self.add(self.pipes, 4)
+        response = self.client.get(reverse('cart'))
+        self.assertEqual([(item['service'], item['hours']) for item in response.context['items']],
+                         [(self.pipes, 4), (self.paint, 3)])
+        self.assertEqual(response.context['total'], Decimal('125.00'))
+        self.client.post(reverse('cart_remove', args=[self.pipes.id]))
+        self.assertEqual(len(self.client.get(reverse('cart')).context['items']), 1)
+
+    def test_invalid_hours_are_not_added(self):
+        """Test hours are validated on the request form before reaching the cart"""
+        response = self.add(self.pipes, 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].has_error('hours_needed'))
+        self.assertEqual(self.client.get(reverse('cart')).context['items'], [])
+
+    def test_checkout_submits_batch(self):
+        """Test checkout saves every request in one insert with batch-level side effects"""
+        self.add(self.pipes, 2)
+        self.add(self.paint, 1)
+        self.add(self.pipes, 3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('cart'), {'address': 'Kenyatta Ave, Nakuru'})
+        self.assertRedirects(response, '/customer/customer1', fetch_redirect_response=False)
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "services_servicerequest"')]
+        self.assertEqual(len(inserts), 1)
+
+        requests = ServiceRequest.objects.filter(customer=self.customer).order_by('id')
+        self.assertEqual([(r.service, r.hours_needed) for r in requests], [(self.pipes, 3), (self.paint, 1)])
+        self.assertEqual(requests[0].latitude, -0.3031)
+        self.assertEqual(
+            sorted(NotificationEvent.objects.values_list('service_request', flat=True)), [r.pk for r in requests]
+        )
+        self.assertEqual(Job.objects.filter(task=DIGEST_TASK).count(), 1)
+        self.assertEqual(
+            sorted(DailyRequestStats.objects.values_list('service', 'requests', 'hours', 'revenue')),
+            [(self.pipes.id, 1, 3, Decimal('60.00')), (self.paint.id, 1, 1, Decimal('15.00'))],
+        )
+        self.assertEqual(self.client.get(reverse('cart')).context['items'], [])
+
+    def test_batch_buckets_match_backfill(self):
+        """Test batched bucket updates agree with rebuilding from raw requests"""
+        cart.checkout(self.customer, 'Street', [(self.pipes, 2), (self.paint, 1)])
+        cart.checkout(self.customer, 'Street', [(self.pipes, 1)])
+        before = sorted(DailyRequestStats.objects.values_list('service', 'requests', 'hours', 'revenue'))
+        DailyRequestStats.objects.all().delete()
+        call_command('backfill_request_stats', stdout=StringIO())
+        self.assertEqual(before, sorted(DailyRequestStats.objects.values_list('service', 'requests', 'hours', 'revenue')))
+
+    def test_empty_cart_and_company_users(self):
+        """Test an empty cart can't be checked out and companies have no cart"""
+        response = self.client.post(reverse('cart'), {'address': 'Street'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ServiceRequest.objects.exists())
+        self.client.login(username='company1', password='testpass123')
+        self.assertContains(self.client.get(reverse('cart')), 'Only customers can request services.')
+
+
+class RequestEventLogTests(TestCase):
+    """Test the append-only request event log and its readers"""
+
+    def setUp(self):
+        company_user = User.objects.create_user(
+            username='company1', email='company@test.com', password='testpass123', is_company=True
+        )
+        company = Company.objects.create(user=company_user, field_of_work='All in One')
+        self.pipes = Service.objects.create(
+            company=company, name='Pipes', description='Test', price_hour=Decimal('20.00'), field='Plumbing'
+        )
+        self.paint = Service.objects.create(
+            company=company, name='Paint', description='Test', price_hour=Decimal('15.00'), field='Painting'
+        )
+        customer_user = User.objects.create_user(
+            username='customer1', email='customer@test.com', password='testpass123', is_customer=True
+        )
+        self.customer = Customer.objects.create(user=customer_user, date_of_birth='1990-01-01')
+        User.objects.create_user(username='staff', email='staff@test.com', password='testpass123', is_staff=True)
+
+    def request_service(self, service, hours):
+        self.client.login(username='customer1', password='testpass123')
+        self.client.post(reverse('request_service', args=[service.id]), {'address': 'Street', 'hours_needed': hours})
+
+    def test_request_appends_event(self):
+        """Test a submitted request is logged with a snapshot of its details"""
+        self.request_service(self.pipes, 2)
+        event = RequestEvent.objects.get()
+        service_request = ServiceRequest.objects.get()
+        self.assertEqual((event.kind, event.request_id), (RequestEvent.CREATED, service_request.id))
+        self.assertEqual(event.payload['customer'], 'customer1')
+        self.assertEqual(
+            (event.payload['field'], event.payload['hours'], event.payload['cost']), ('Plumbing', 2, '40.00')
+        )
+
+    def test_failed_request_logs_nothing(self):
+        """Test the event rolls back with its request"""
+        with patch.object(analytics, 'record_request', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.request_service(self.pipes, 2)
+        self.assertFalse(RequestEvent.objects.exists())
+        self.assertFalse(ServiceRequest.objects.exists())
+
+    def test_checkout_appends_batch_in_order(self):
+        """Test a cart checkout logs every request in one insert, in request order"""
+        with CaptureQueriesContext(connection) as queries:
+            requests = cart.checkout(self.customer, 'Street', [(self.pipes, 1), (self.paint, 2)])
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "services_requestevent"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual([event.request_id for event in event_log.read()], [r.id for r in requests])
+
+    def test_log_is_append_only(self):
+        """Test logged events can't be rewritten"""
+        self.request_service(self.pipes, 2)
+        event = RequestEvent.objects.get()
+        event.payload = {}
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_endpoint_pages_after_cursor(self):
+        """Test the endpoint resumes strictly after the given sequence number"""
+        cart.checkout(self.customer, 'Street', [(self.pipes, 1), (self.paint, 2), (self.pipes, 3)])
+        self.client.login(username='staff', password='testpass123')
+        first = self.client.get(reverse('request_events'), {'limit': 2}).json()
+        self.assertEqual([event['request']['hours'] for event in first['events']], [1, 2])
+        self.assertTrue(first['more'])
+        rest = self.client.get(reverse('request_events'), {'after': first['next_after'], 'limit': 2}).json()
+        self.assertEqual([event['request']['hours'] for event in rest['events']], [3])
+        self.assertFalse(rest['more'])
+        self.assertEqual(self.client.get(reverse('request_events'), {'limit': 0}).status_code, 400)
+
+    def test_endpoint_access(self):
+        """Test only staff or a client with the configured token can read events"""
+        url = reverse('request_events')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with self.settings(EVENT_LOG_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.client.login(username='customer1', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_tail_command(self):
+        """Test the command writes events after --after as JSON lines"""
+        cart.checkout(self.customer, 'Street', [(self.pipes, 1), (self.paint, 2)])
+        first = event_log.read()[0].seq
+        out = StringIO()
+        call_command('tail_request_events', '--after', str(first), stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(line['seq'], line['request']['service']) for line in lines], [(first + 1, 'Paint')])
+
+
+class StaticPageTests(TransactionTestCase):
+    """Pre-rendered category and service pages, rewritten by queued jobs after writes"""
+    serialized_rollback = True  # Restores the migrated categories after each flush
+
+    def setUp(self):
+        cache.clear()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings_override = self.settings(STATIC_PAGES=True, STATIC_PAGES_ROOT=root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        def make_service(username, name, field):
+            user = User.objects.create_user(username=username, email=f'{username}@test.com', password='testpass123',
+                                            is_company=True)
+            company = Company.objects.create(user=user, field_of_work='All in One')
+            return Service.objects.create(company=company, name=name, description='d', field=field,
+                                          price_hour=Decimal('20'))
+
+        self.plumbing = [make_service(f'pipeco{number}', f'Pipes {number}', 'Plumbing') for number in range(6)]
+        self.paint = make_service('paintco', 'Walls', 'Painting')
+        User.objects.create_user(username='viewer', email='viewer@test.com', password='testpass123', is_customer=True)
+        call_command('prerender_pages', stdout=StringIO())
+        Job.objects.all().delete()  # The setup writes' jobs - the full build covered them
+        jobs.autodiscover()
+
+    def drain(self):
+        """Runs the queued page jobs, fan-outs included"""
+        return jobs.run_pending(limit=10 ** 6)
+
+    def page(self, path):
+        with open(static_pages.file_for(path)) as handle:
+            return handle.read()
+
+    def mark(self, path):
+        """Tags a page file, so a test can tell whether it was rewritten"""
+        static_pages.write(path, self.page(path).encode() + b'<!--old-->')
+
+    def test_anonymous_visitors_get_the_file(self):
+        """The middleware answers anonymous GETs from disk without running the view"""
+        path = prerender.service_path(self.paint.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response['X-Static-Page'], 'HIT')
+        self.assertContains(response, 'Walls')
+        self.assertFalse([q for q in queries if 'FROM "services_service"' in q['sql']])
+        self.assertEqual(self.client.get('/services/plumbing/')['X-Static-Page'], 'HIT')
+        self.assertFalse(self.client.get('/services/plumbing/', {'page': 2}).has_header('X-Static-Page'))
+
+        self.client.login(username='viewer', password='testpass123')
+        response = self.client.get(path)
+        self.assertFalse(response.has_header('X-Static-Page'))
+        self.assertContains(response, 'Request This Service')
+
+    def test_edit_rewrites_only_affected_pages(self):
+        """Editing an older service rewrites its page and category, not the rest of the category"""
+        oldest, other = self.plumbing[0], self.plumbing[3]
+        for path in (prerender.service_path(oldest.pk), '/services/plumbing/', prerender.service_path(other.pk)):
+            self.mark(path)
+        oldest.name = 'Pipes Deluxe'
+        oldest.save()
+        self.assertIn('<!--old-->', self.page(prerender.service_path(oldest.pk)))  # Not in the writing request
+        self.drain()
+        self.assertIn('Pipes Deluxe', self.page(prerender.service_path(oldest.pk)))
+        self.assertIn('Pipes Deluxe', self.page('/services/plumbing/'))
+        self.assertIn('<!--old-->', self.page(prerender.service_path(other.pk)))
+
+    def test_new_service_rewrites_its_category(self):
+        """A new service is listed as related on every page of its category, and only there"""
+        self.mark(prerender.service_path(self.plumbing[0].pk))
+        self.mark(prerender.service_path(self.paint.pk))
+        Service.objects.create(company=self.plumbing[1].company, name='Drain Unblock', description='d',
+                               field='Plumbing', price_hour=Decimal('25'))
+        self.drain()
+        self.assertIn('Drain Unblock', self.page(prerender.service_path(self.plumbing[0].pk)))
+        self.assertIn('<!--old-->', self.page(prerender.service_path(self.paint.pk)))
+
+    def test_move_and_delete(self):
+        """A moved service leaves its old category page; a deleted one loses its file"""
+        service = self.plumbing[2]
+        service.field = 'Painting'
+        service.save()
+        self.drain()
+        self.assertNotIn('Pipes 2', self.page('/services/plumbing/'))
+        self.assertIn('Pipes 2', self.page('/services/painting/'))
+        path = prerender.service_path(service.pk)
+        service.delete()
+        self.assertFalse(os.path.exists(static_pages.file_for(path)))
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_rating_change_rewrites_company_pages(self):
+        """Service pages show the company rating, which changes without a save signal"""
+        reviews.apply_rating_delta(self.paint.company_id, 5, 1)
+        self.drain()
+        self.assertIn('5/5', self.page(prerender.service_path(self.paint.pk)))
+
+    def test_repeated_writes_queue_each_page_once(self):
+        """Jobs for a page still waiting to run aren't queued again"""
+        for price in (21, 22, 23):
+            self.paint.price_hour = Decimal(price)
+            self.paint.save()
+        page_jobs = Job.objects.filter(task=prerender.PAGE_TASK, payload={'page': 'service', 'id': self.paint.pk})
+        self.assertEqual(page_jobs.count(), 1)
+        self.drain()
+        self.assertIn('$23', self.page(prerender.service_path(self.paint.pk)))
+
+    def test_category_rename_drops_old_page(self):
+        """A renamed category's old slug stops being served; the new one is rendered"""
+        category = Category.objects.get(slug='painting')
+        category.slug = 'decorating'
+        category.save()
+        self.assertFalse(os.path.exists(static_pages.file_for('/services/painting/')))
+        self.drain()
+        self.assertIn('Walls', self.page('/services/decorating/'))
+
+    def test_paths_stay_inside_root(self):
+        self.assertIsNone(static_pages.file_for('/../../etc/passwd/'))
+
+    def test_command_requires_mode(self):
+        with self.settings(STATIC_PAGES=False):
+            with self.assertRaises(CommandError):
+                call_command('prerender_pages', stdout=StringIO())
@@ -1,11 +1,22 @@
+from django.conf import settings
 from django.urls import path
 from . import views as v
 
+# Read-only pages switch to their coroutine versions under ASGI
+_async = settings.ASYNC_READ_VIEWS
+
 urlpatterns = [
-    path('', v.service_list, name='services_list'),
-    path('most-requested/', v.most_requested_services, name='most_requested_services'),
+    path('', v.service_list_async if _async else v.service_list, name='services_list'),
+    path('most-requested/', v.most_requested_services_async if _async else v.most_requested_services, name='most_requested_services'),
     path('create/', v.create, name='services_create'),
-    path('<int:id>', v.index, name='index'),
+    path('autocomplete/', v.service_autocomplete, name='services_autocomplete'),
+    path('events/', v.request_events, name='request_events'),
+    path('<int:id>', v.index_async if _async else v.index, name='index'),
     path('<int:id>/request_service/', v.request_service, name='request_service'),
-    path('<slug:field>/', v.service_field, name='services_field'),
+    path('cart/', v.cart_view, name='cart'),
+    path('cart/add/<int:id>/', v.cart_add, name='cart_add'),
+    path('cart/remove/<int:id>/', v.cart_remove, name='cart_remove'),
+    path('requests/<int:id>/complete/', v.complete_request, name='complete_request'),
+    path('requests/<int:id>/review/', v.review_request, name='review_request'),
+    path('<slug:field>/', v.service_field_async if _async else v.service_field, name='services_field'),
 ]
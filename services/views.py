@@ -1,16 +1,39 @@
+import math
+
 from users.models import Company
+from netfix import geo, page_cache
+from netfix.async_utils import async_read_view
+from netfix.streaming import Rows
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.utils.crypto import constant_time_compare
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Count
-from .models import Service, ServiceRequest
-from .forms import CreateNewService, RequestServiceForm
+from .models import Category, Review, Service, ServiceRequest
+from .forms import CartCheckoutForm, CreateNewService, RequestServiceForm, ReviewForm
+from .notifications import record_request_event
+from . import analytics, autocomplete, booking, cart, event_log, facets, reviews
+
+NEAR_DEFAULT_RADIUS_KM = 25  # "Services near me" search radius
+NEAR_MAX_RADIUS_KM = 500
+NEAR_FALLBACK_COMPANIES = 3  # Closest companies shown when none are within the radius
+AUTOCOMPLETE_DEFAULT_LIMIT = 8  # Suggestions per keystroke
+AUTOCOMPLETE_MAX_LIMIT = 20
+
 
 def index(request, id):
     """
     Individual Service Page - Displays name, description, field, price per hour, date created, company name
     """
     service = get_object_or_404(Service, id=id)  # Individual service page access
+    return render(request, "services/single_service.html", service_page_context(service))
 
+
+def service_page_context(service):
+    """Context for a service's page - shared with the pre-rendered copies (prerender.py)"""
     # Get other services from the same company (excluding current service)
     other_services = Service.objects.filter(
         company=service.company
@@ -18,17 +41,15 @@ def index(request, id):
 
     # Get related services in the same category (excluding current service)
     related_services = Service.objects.filter(
-        field=service.field
+        category_id=service.category_id
     ).exclude(id=service.id).order_by('-date_created')[:3]
 
-    context = {
+    return {
         'service': service,  # Service with all required info
         'other_services': other_services,
         'related_services': related_services,
     }
 
-    return render(request, "services/single_service.html", context)
-
 @login_required
 def create(request):
     # Check if user is authenticated and is a company
@@ -48,7 +69,8 @@ def create(request):
         if form.is_valid():
             service = form.save(commit=False)
             service.company = company
-            service.save()
+            with transaction.atomic():  # Follow-up jobs enqueued here commit together with the service
+                service.save()
             return redirect("services_list")
     else:
         form = CreateNewService(company=company)
@@ -57,9 +79,79 @@ def create(request):
 
 # Added missing function to get the service list
 def service_list(request):
-    """All Services Page - Shows every service created by every company"""
-    services = Service.objects.all().order_by("-date_created")  # All services page
-    return render(request, "services/list.html", {"services": services})
+    """
+    All Services Page - Shows every service created by every company
+    ?field=&price=&rating= narrow it by facet, each option showing how many services it would leave
+    ?sort=rating lists the best-rated companies' services first (indexed rating columns, no review aggregation)
+    ?near=<city or "lat,lon">&radius=<km> narrows it to companies nearby, nearest first
+    """
+    selection = facets.parse_selection(request.GET)
+    sort = "rating" if request.GET.get("sort") == "rating" else "newest"
+    context = {
+        "facets": facets.facet_links(selection, request.GET),  # Counts from the cached facet cube
+        "selection": selection,
+        "sort": sort,
+    }
+    services = facets.apply(Service.objects.all(), selection)
+
+    near = request.GET.get("near", "").strip()
+    if not near:
+        ordering = ["-date_created"]  # All services page
+        if sort == "rating":
+            ordering = ["-company__rating_average", "-company__rating_count", "-date_created"]
+        services = services.select_related("company__user").order_by(*ordering)
+        context.update({"services": services, "has_services": services.exists})  # Only queried on a cache miss
+        # One cached body for every visitor; on a miss the cards stream from a chunked cursor
+        return page_cache.render_shared(
+            request, "services/list.html", "services/partials/list_body.html", context,
+            key=page_cache.body_key("services_list", dict(selection, sort=sort)),
+            services=Rows(services.iterator(chunk_size=settings.STREAM_CHUNK_SIZE),
+                          "services/partials/service_cards.html"),
+        )
+
+    try:
+        radius = float(request.GET.get("radius", NEAR_DEFAULT_RADIUS_KM))
+        if not math.isfinite(radius):
+            raise ValueError("radius must be a number")
+        radius = min(max(radius, 1), NEAR_MAX_RADIUS_KM)
+    except ValueError:
+        radius = NEAR_DEFAULT_RADIUS_KM
+    context.update({"near": near, "radius": int(radius), "services": [], "has_services": False})
+
+    coordinates = geo.geocode(near)
+    if coordinates is None:
+        context["near_error"] = f"We don't know where '{near}' is yet. Try a nearby city."
+        return page_cache.render_shared(request, "services/list.html", "services/partials/list_body.html", context)
+
+    # Geohash cells around the point select the candidate companies; only those get distances.
+    # Only companies offering a service that matches the facets count, so "in range" means results
+    offering = Company.objects.filter(pk__in=services.values("company_id"))
+    nearby = geo.within_radius(offering, coordinates[0], coordinates[1], radius)
+    if not nearby:
+        # Nothing in range - offer the closest companies with matching services rather than an empty page
+        nearby = geo.nearest(offering, coordinates[0], coordinates[1], NEAR_FALLBACK_COMPANIES)
+        context["near_fallback"] = bool(nearby)
+    distances = {company.pk: distance for distance, company in nearby}
+    services = list(services.filter(company_id__in=distances).select_related("company__user"))
+    for service in services:
+        service.distance_km = distances[service.company_id]
+    services.sort(key=lambda service: (service.distance_km, -service.date_created.timestamp()))
+    context.update({"services": services, "has_services": bool(services)})
+    return page_cache.render_shared(request, "services/list.html", "services/partials/list_body.html", context)
+
+
+def service_autocomplete(request):
+    """Search Suggestions - ?q=<prefix> returns matching services from the in-process prefix index as JSON"""
+    try:
+        limit = min(max(int(request.GET.get("limit", AUTOCOMPLETE_DEFAULT_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_DEFAULT_LIMIT
+    query = request.GET.get("q", "")
+    results = [
+        {"id": service_id, "name": name, "field": field, "url": f"/services/{service_id}"}
+        for service_id, name, field in autocomplete.index.suggest(query, limit)
+    ]
+    return JsonResponse({"query": query, "results": results})
 
 
 def most_requested_services(request):
@@ -68,17 +160,35 @@ def most_requested_services(request):
         request_count=Count('servicerequest')
     ).order_by('-request_count', '-date_created')  # Most requested ordering
 
-    return render(request, "services/most_requested.html", {
+    context = {
         "services": services,  # Updated list with request counts
         "page_title": "Most Requested Services"
-    })
+    }
+    return page_cache.render_shared(
+        request, "services/most_requested.html", "services/partials/most_requested_body.html", context,
+        key=page_cache.body_key("most_requested_services", {}),  # Same body for every visitor
+    )
 
 
 def service_field(request, field):
     """Service Type Pages - Has page for every type of service displaying services of that type"""
-    field = field.replace("-", " ").title()  # Convert slug format back to readable text
-    services = Service.objects.filter(field=field)  # Services by specific type
-    return render(request, "services/field.html", {"services": services, "field": field})
+    category = Category.by_slug(field)  # Cached slug lookup; unknown slugs are a 404, not an empty query
+    if category is None or category.company_only:
+        raise Http404(f"No service category '{field}'")
+    return render(request, "services/field.html", field_page_context(category))
+
+
+def field_page_context(category):
+    """Context for a category's page - shared with the pre-rendered copies (prerender.py)"""
+    services = Service.objects.filter(category=category)  # Services by specific type
+    return {"services": services, "field": category.name, "category": category}
+
+
+# Async versions of the read-only catalog views, routed when serving through netfix/asgi.py
+index_async = async_read_view(index)
+service_list_async = async_read_view(service_list)
+most_requested_services_async = async_read_view(most_requested_services)
+service_field_async = async_read_view(service_field)
 
 
 @login_required
@@ -98,10 +208,136 @@ def request_service(request, id):
             request_instance = form.save(commit=False)
             request_instance.customer = request.user.customer  # ✅ Ensured only customers can request services
             request_instance.service = service
-            request_instance.save()
-            # Redirect to customer profile with the username parameter
-            return redirect(f'/customer/{request.user.username}')
+            try:
+                with transaction.atomic():  # Follow-up jobs enqueued here commit together with the request
+                    request_instance.save()
+                    if form.cleaned_data.get('scheduled_start'):
+                        booking.book(request_instance, form.cleaned_data['scheduled_start'])  # Capacity check
+                    record_request_event(request_instance)  # Company hears about it in the next digest
+                    analytics.record_request(request_instance)  # Daily request/revenue bucket
+                    event_log.append([request_instance])  # Downstream feed (billing, warehouse)
+            except ValidationError as error:
+                form.add_error('scheduled_start', error)  # Slot unavailable - nothing was saved
+            else:
+                # Redirect to customer profile with the username parameter
+                return redirect(f'/customer/{request.user.username}')
     else:
         form = RequestServiceForm()
 
     return render(request, "services/request_service.html", {"form": form, "service": service})
+
+
+@login_required
+def cart_add(request, id):
+    """Cart - Adds the service with the hours from its request form to the customer's cart"""
+    service = get_object_or_404(Service, id=id)
+    if not request.user.is_customer:
+        return render(request, 'users/error.html', {'message': 'Only customers can request services.'})
+    if request.method != "POST":
+        return redirect('request_service', id=id)
+
+    form = RequestServiceForm(request.POST)
+    form.is_valid()
+    form.errors.pop('address', None)  # Given once, at checkout
+    form.errors.pop('scheduled_start', None)
+    if not form.has_error('hours_needed'):
+        if cart.add(request, service, form.cleaned_data['hours_needed']):
+            return redirect('cart')
+        form.add_error(None, f'Your cart holds at most {cart.MAX_LINES} services - check it out first.')
+    return render(request, "services/request_service.html", {"form": form, "service": service})
+
+
+@login_required
+def cart_remove(request, id):
+    """Cart - Takes a service back out of the cart"""
+    if request.method == "POST":
+        cart.remove(request, id)
+    return redirect('cart')
+
+
+@login_required
+def cart_view(request):
+    """Cart - Lists the services picked so far and submits them all as one batch of requests"""
+    if not request.user.is_customer:
+        return render(request, 'users/error.html', {'message': 'Only customers can request services.'})
+
+    lines = cart.lines(request)
+    if request.method == "POST":
+        form = CartCheckoutForm(request.POST)
+        if not lines:
+            form.add_error(None, 'Your cart is empty.')
+        if form.is_valid():
+            cart.checkout(request.user.customer, form.cleaned_data['address'], lines)
+            cart.clear(request)
+            return redirect(f'/customer/{request.user.username}')
+    else:
+        form = CartCheckoutForm()
+
+    items = [{"service": service, "hours": hours, "cost": service.price_hour * hours} for service, hours in lines]
+    return render(request, "services/cart.html", {
+        "form": form,
+        "items": items,
+        "total": sum(item["cost"] for item in items),
+    })
+
+
+@login_required
+def complete_request(request, id):
+    """Request Completion - The company that received a request marks it done, opening it to a review"""
+    service_request = get_object_or_404(ServiceRequest, id=id, service__company__user=request.user)
+    if request.method == "POST":
+        reviews.complete(service_request)
+    return redirect(f'/company/{request.user.username}')
+
+
+@login_required
+def review_request(request, id):
+    """Customer Reviews - The customer who made a completed request rates it (or edits their rating)"""
+    service_request = get_object_or_404(
+        ServiceRequest.objects.select_related('service__company__user'), id=id, customer__user=request.user
+    )
+    if service_request.completed_at is None:
+        return render(request, 'users/error.html', {
+            'message': 'You can review this request once the company has marked it complete.'
+        })
+
+    existing = Review.objects.filter(service_request=service_request).first()
+    if request.method == "POST":
+        form = ReviewForm(request.POST, instance=existing)
+        if form.is_valid():
+            reviews.submit(service_request, form.cleaned_data['stars'], form.cleaned_data['comment'])
+            return redirect(f'/customer/{request.user.username}')
+    else:
+        form = ReviewForm(instance=existing)
+
+    return render(request, "services/review.html", {
+        "form": form,
+        "service_request": service_request,
+        "editing": existing is not None,
+    })
+
+
+def request_events(request):
+    """
+    Request Event Log - JSON page of new-request events after a sequence number, oldest first
+    Query: after=<seq> (default 0), limit (1-1000, default 100). Staff, or a client sending
+    "Authorization: Bearer <EVENT_LOG_TOKEN>"; resume with the returned next_after.
+    """
+    token = settings.EVENT_LOG_TOKEN
+    authorized = bool(token) and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    if not (authorized or request.user.is_staff):
+        return JsonResponse({'error': 'Not allowed to read the event log'}, status=403)
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = int(request.GET.get('limit', 100))
+        if after < 0 or not 1 <= limit <= event_log.MAX_BATCH:
+            raise ValueError(f'after must be >= 0 and limit between 1 and {event_log.MAX_BATCH}')
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    events = event_log.read(after, limit)
+    return JsonResponse({
+        'events': [event_log.as_dict(event) for event in events],
+        'next_after': events[-1].seq if events else after,
+        'more': len(events) == limit,
+    })
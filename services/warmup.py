@@ -0,0 +1,22 @@
+from main.warmup import register_step
+from . import autocomplete, facets
+from .models import Category
+
+
+@register_step("categories")
+def load_categories():
+    """Fills the per-process category cache every page's facets and links read"""
+    return len(Category.cached(refresh=True))
+
+
+@register_step("facets")
+def build_facets():
+    """Builds (or fetches) the shared facet cube the catalog counts come from"""
+    return len(facets.get_cube())
+
+
+@register_step("autocomplete")
+def load_autocomplete():
+    """Loads this process's autocomplete prefix index"""
+    autocomplete.index.rebuild()
+    return len(autocomplete.index)
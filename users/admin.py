@@ -1,18 +1,38 @@
 from django.contrib import admin
 
+from netfix.pagination import EstimatedCountPaginator
 from .models import User, Customer, Company
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ("id", "username", "email")
+    search_fields = ("^username", "=email")  # Both unique, so indexed
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
-    list_display = ("user", "field_of_work", "rating")
+    list_display = ("user", "category", "rating")
+    list_select_related = ("user", "category")
+    list_filter = ("category",)  # Indexed foreign key
+    search_fields = ("^user__username",)  # Backs the service company autocomplete
+    autocomplete_fields = ("user",)
+    # Kept by services/reviews.py with in-place deltas; saving the form would write back stale totals
+    readonly_fields = ("rating_sum", "rating_count", "rating_average", "rating")
+    ordering = ("-pk",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ("user", "date_of_birth")
+    list_select_related = ("user",)
+    search_fields = ("^user__username", "=user__email")  # Backs the request customer autocomplete
+    autocomplete_fields = ("user",)
+    ordering = ("-pk",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -3,6 +3,7 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from users.models import User, Company, Customer
+from services.models import Category
 
 
 class DateInput(forms.DateInput):
@@ -58,14 +59,20 @@ class CustomerSignUpForm(UserCreationForm):
         return user
 
 
+def company_category_choices():
+    """(name, name) pairs for every category, including the "All in One" company type"""
+    return [(category.name, category.name) for category in Category.cached().values()]
+
+
 class CompanySignUpForm(UserCreationForm):
     """
     Company Registration Form - Requests username, email, password, password confirmation, field of work
     Field of work restricted to exact 12 predefined values
     Implements username and email uniqueness validation
     """
-    field_of_work = forms.ChoiceField(choices=Company.FIELD_CHOICES)  # Field of work with restrictions
+    field_of_work = forms.ChoiceField(choices=company_category_choices)  # Field of work with restrictions
     email = forms.EmailField()  # Email field
+    location = forms.CharField(max_length=100, required=False)  # Optional service area for "near me" search
 
     class Meta:
         model = User
@@ -91,7 +98,11 @@ class CompanySignUpForm(UserCreationForm):
         user.is_company = True  # Company user type
         if commit:
             user.save()
-            Company.objects.create(user=user, field_of_work=self.cleaned_data["field_of_work"])  # Store field of work
+            Company.objects.create(
+                user=user,
+                field_of_work=self.cleaned_data["field_of_work"],  # Store field of work
+                location=self.cleaned_data.get("location", ""),
+            )
         return user
 
 
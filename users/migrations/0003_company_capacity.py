@@ -0,0 +1,19 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:24
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_auto_20261019_1422'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='capacity',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
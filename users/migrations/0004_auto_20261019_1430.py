@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_company_capacity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['field_of_work'], name='users_compa_field_o_34f01e_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0013_auto_20261019_1435'),
+        ('users', '0004_auto_20261019_1430'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='services.category'),
+        ),
+    ]
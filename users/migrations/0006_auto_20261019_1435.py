@@ -0,0 +1,44 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:35
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+
+def forwards(apps, schema_editor):
+    """Sets Company.category from field_of_work one primary-key range at a time"""
+    Company = apps.get_model("users", "Company")
+    category_ids = dict(apps.get_model("services", "Category").objects.values_list("name", "id"))
+    last = None
+    while True:
+        pending = Company.objects.order_by("pk")
+        if last is not None:
+            pending = pending.filter(pk__gt=last)
+        batch = list(pending.values_list("pk", flat=True)[:BATCH_SIZE])
+        if not batch:
+            return
+        with transaction.atomic():
+            for name, category_id in category_ids.items():
+                Company.objects.filter(
+                    pk__gte=batch[0], pk__lte=batch[-1], category__isnull=True, field_of_work=name
+                ).update(category_id=category_id)
+        last = batch[-1]
+
+
+def backwards(apps, schema_editor):
+    Company = apps.get_model("users", "Company")
+    for category in apps.get_model("services", "Category").objects.all():
+        Company.objects.filter(category=category).update(field_of_work=category.name)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Each backfill batch commits on its own
+
+    dependencies = [
+        ('users', '0005_company_category'),
+        ('services', '0014_auto_20261019_1435'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0015_auto_20261019_1436'),
+        ('users', '0006_auto_20261019_1435'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='company',
+            name='users_compa_field_o_34f01e_idx',
+        ),
+        # A default lets the text column be re-added (then refilled) if this is reversed
+        migrations.AlterField(
+            model_name='company',
+            name='field_of_work',
+            field=models.CharField(default='', max_length=70),
+        ),
+        migrations.RemoveField(
+            model_name='company',
+            name='field_of_work',
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='services.category'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.14 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_auto_20261019_1436'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='rating_average',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(fields=['-rating_average', '-rating_count'], name='users_compa_rating__a27669_idx'),
+        ),
+    ]
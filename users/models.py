@@ -2,6 +2,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from netfix import geo
+
 class User(AbstractUser):
     """
     User Registration System - Supports both Customer and Company registration
@@ -23,22 +25,35 @@ class Company(models.Model):
     Company Registration - Requires username, email, password, password confirmation, field of work
     Field of work restricted to exact 12 predefined values
     """
-    FIELD_CHOICES = [
-        # Exact field restrictions as specified
-        ("Air Conditioner", "Air Conditioner"),
-        ("All in One", "All in One"),  # Special company type - can create any service type
-        ("Carpentry", "Carpentry"),
-        ("Electricity", "Electricity"),
-        ("Gardening", "Gardening"),
-        ("Home Machines", "Home Machines"),
-        ("Housekeeping", "Housekeeping"),
-        ("Interior Design", "Interior Design"),
-        ("Locks", "Locks"),
-        ("Painting", "Painting"),
-        ("Plumbing", "Plumbing"),
-        ("Water Heaters", "Water Heaters"),
-    ]
-
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
-    field_of_work = models.CharField(max_length=70, choices=FIELD_CHOICES)  # Required field of work
+    category = models.ForeignKey('services.Category', on_delete=models.PROTECT)  # Required field of work
     rating = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(5)], default=0)  # Company rating system
+    rating_sum = models.PositiveIntegerField(default=0)  # Total stars across reviews - running, never re-aggregated
+    rating_count = models.PositiveIntegerField(default=0)  # Number of reviews
+    rating_average = models.DecimalField(max_digits=3, decimal_places=2, default=0)  # rating_sum / rating_count
+    capacity = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])  # Jobs the company can run at once
+    location = models.CharField(max_length=100, blank=True)  # Optional service area (city or "lat,lon")
+    latitude = models.FloatField(null=True, blank=True)  # Geocoded from location
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)  # Nearby-company lookups
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-rating_average", "-rating_count"]),  # Best-rated first
+        ]
+
+    @property
+    def field_of_work(self):
+        """Category name, from the per-process category cache (no query)"""
+        if not self.category_id:
+            return None
+        return self._meta.get_field("category").related_model.get_cached(self.category_id).name
+
+    @field_of_work.setter
+    def field_of_work(self, name):
+        self.category = self._meta.get_field("category").related_model.by_name(name)
+
+    def save(self, *args, **kwargs):
+        """Geocode the service area from the offline gazetteer"""
+        geo.locate(self, self.location)
+        super().save(*args, **kwargs)
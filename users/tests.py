@@ -1,7 +1,10 @@
+from decimal import Decimal
+
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from services.models import Service, ServiceRequest
 from .models import User, Customer, Company
 from .forms import CustomerSignUpForm, CompanySignUpForm
 
@@ -284,3 +287,92 @@ class UserViewTests(TestCase):
         response = self.client.get(reverse('company_profile', args=['company1']))
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'company1')
+
+class ProfilePaginationTests(TestCase):
+    """Test profile pages render one bounded page and load the rest by cursor"""
+
+    def setUp(self):
+        self.company_user = User.objects.create_user(
+            username='company1', email='company@test.com', password='testpass123', is_company=True
+        )
+        self.company = Company.objects.create(user=self.company_user, field_of_work='Electricity')
+        self.customer_user = User.objects.create_user(
+            username='customer1', email='customer@test.com', password='testpass123', is_customer=True
+        )
+        self.customer = Customer.objects.create(user=self.customer_user, date_of_birth='1990-01-01')
+
+        self.services = [
+            Service.objects.create(
+                company=self.company, name=f'Service {i}', description='Test',
+                price_hour=Decimal('10.50'), field='Electricity'
+            )
+            for i in range(15)
+        ]
+        for i in range(25):
+            ServiceRequest.objects.create(
+                customer=self.customer, service=self.services[i % 15], address=f'{i} Street', hours_needed=2
+            )
+
+    def test_company_profile_first_page_and_totals(self):
+        """Test totals cover every request while only the first page is rendered"""
+        self.client.login(username='company1', password='testpass123')
+        response = self.client.get(reverse('company_profile', args=['company1']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['service_count'], 15)
+        self.assertEqual(len(response.context['services']), 12)
+        self.assertEqual(response.context['total_requests'], 25)
+        self.assertEqual(response.context['total_revenue'], Decimal('525.00'))  # 25 × 2h × 10.50
+        self.assertEqual(len(response.context['service_requests']), 20)
+        self.assertContains(response, 'load-more')
+
+    def test_company_profile_streams_lists(self):
+        """Test the streamed profile matches the buffered one, load-more buttons included"""
+        self.client.login(username='company1', password='testpass123')
+        streamed = self.client.get(reverse('company_profile', args=['company1']))
+        self.assertTrue(streamed.streaming)
+        self.assertIn('csrftoken', streamed.cookies)  # Mark Complete forms are streamed after the headers
+        body = b''.join(streamed.streaming_content).decode()
+        buffered = self.client.get(reverse('company_profile', args=['company1']), {'stream': '0'})
+        self.assertEqual(body.count('class="service-card"'), 12)
+        self.assertEqual(body.count('class="request-card"'), 20)
+        self.assertEqual(body.count('load-more'), buffered.content.decode().count('load-more'))
+
+    def test_load_more_pages_are_disjoint_and_complete(self):
+        """Test following cursors returns every request exactly once, newest first"""
+        self.client.login(username='company1', password='testpass123')
+        first = self.client.get(reverse('company_profile', args=['company1']))
+        seen = [r.id for r in first.context['service_requests']]
+
+        response = self.client.get(first.context['requests_next_url'])
+        self.assertEqual(response.status_code, 200)
+        seen += [r.id for r in response.context['rows']]
+        self.assertIsNone(response.context['next_url'])
+        self.assertEqual(seen, list(
+            ServiceRequest.objects.order_by('-request_date', '-id').values_list('id', flat=True)
+        ))
+
+        services = self.client.get(first.context['services_next_url'])
+        self.assertEqual(len(services.context['rows']), 3)
+
+    def test_company_requests_page_is_private(self):
+        """Test other users cannot page through a company's requests"""
+        self.client.login(username='customer1', password='testpass123')
+        response = self.client.get(reverse('company_profile', args=['company1']))
+        self.assertEqual(response.context['service_requests'], [])
+        response = self.client.get(reverse('company_requests_page', args=['company1']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_customer_profile_pages(self):
+        """Test customer profile totals and request pages"""
+        response = self.client.get(reverse('customer_profile', args=['customer1']))
+        self.assertEqual(response.context['total_requests'], 25)
+        self.assertEqual(response.context['total_spent'], Decimal('525.00'))
+        self.assertEqual(len(response.context['service_requests']), 20)
+
+        response = self.client.get(response.context['requests_next_url'])
+        self.assertEqual(len(response.context['rows']), 5)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected with 400"""
+        response = self.client.get(reverse('customer_requests_page', args=['customer1']) + '?after=!!!')
+        self.assertEqual(response.status_code, 400)